@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+原子写入
+
+多个 Skill 共用的文件写入工具，读者只会看到完整的旧文件或新文件，不会读到写了一半的内容：
+- 写入同目录下的临时文件 → fsync → rename 覆盖 → fsync 目录
+- 写者之间用 flock 互斥，锁加在旁路文件 .<文件名>.lock 上（rename 换了 inode 也不影响锁）
+- 加锁写入后代号（generation）加一，记录在锁文件中；轮询的读者比较代号和 stat，
+  没有变化时直接用上次解析的结果
+
+用法（在 Skill 目录中）：
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from atomic_io import atomic_open, update_json, JsonReader
+"""
+
+import os
+import json
+import fcntl
+import tempfile
+import contextlib
+from pathlib import Path
+
+# 锁文件中代号的格式：定长，原地覆盖写，读者不会读到截断的数字
+GENERATION_FORMAT = "{:020d}\n"
+
+
+def lock_path(path):
+    path = Path(path)
+    return path.with_name(f".{path.name}.lock")
+
+
+@contextlib.contextmanager
+def locked(path, shared=False):
+    """对 path 加建议锁，返回锁文件描述符；写者独占，读者需要时可加共享锁"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield fd
+    finally:
+        # 关闭描述符即释放锁
+        os.close(fd)
+
+
+def _read_generation(fd):
+    try:
+        return int(os.pread(fd, 32, 0) or 0)
+    except ValueError:
+        return 0
+
+
+def _bump_generation(fd):
+    os.pwrite(fd, GENERATION_FORMAT.format(_read_generation(fd) + 1).encode(), 0)
+
+
+def generation(path):
+    """文件当前的代号；从未加锁写入过时为 0"""
+    try:
+        fd = os.open(lock_path(path), os.O_RDONLY)
+    except OSError:
+        return 0
+    try:
+        return _read_generation(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_open(path, binary=True, mode=None, lock=False, encoding="utf-8"):
+    """以写方式打开 path 的临时文件，with 块正常结束后落盘并替换原文件，出错时原文件不变
+
+    mode 为新文件权限，默认沿用原文件（不存在时 0o644）；
+    lock=True 时整个写入过程持有 flock，替换后代号加一
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            mode = 0o644
+    with locked(path) if lock else contextlib.nullcontext() as lock_fd:
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb" if binary else "w", encoding=None if binary else encoding) as f:
+                yield f
+                f.flush()
+                os.fchmod(f.fileno(), mode)
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+        _fsync_dir(path.parent)
+        if lock_fd is not None:
+            _bump_generation(lock_fd)
+
+
+def atomic_write(path, data, mode=None, lock=True):
+    """原子写入 bytes 或 str"""
+    binary = isinstance(data, bytes)
+    with atomic_open(path, binary=binary, mode=mode, lock=lock) as f:
+        f.write(data)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def update_json(path, update, indent=2, ensure_ascii=True, create=False):
+    """加锁读取 JSON → update(data) 修改 → 原子写回，返回写入的数据
+
+    update 可以原地修改并返回 None，也可以返回新的对象；
+    文件不存在时 create=True 从 {} 开始，否则抛出 FileNotFoundError
+    """
+    with locked(path) as lock_fd:
+        try:
+            data = read_json(path)
+        except FileNotFoundError:
+            if not create:
+                raise
+            data = {}
+        result = update(data)
+        if result is not None:
+            data = result
+        # 读和写要在同一把锁内完成，这里已持有锁，写入时不再加锁
+        atomic_write(path, json.dumps(data, indent=indent, ensure_ascii=ensure_ascii), lock=False)
+        _bump_generation(lock_fd)
+    return data
+
+
+class JsonReader:
+    """反复读取同一个 JSON 文件：代号和 stat 都没变时返回缓存，不重新解析
+
+    文件总是整体替换，所以不需要重试；其他程序不经本模块直接改写时靠 stat 发现变化
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._key = None
+        self._data = None
+
+    def load(self):
+        st = os.stat(self.path)
+        key = (generation(self.path), st.st_ino, st.st_size, st.st_mtime_ns)
+        if key != self._key:
+            self._data = read_json(self.path)
+            self._key = key
+        return self._data
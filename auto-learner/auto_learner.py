@@ -6,18 +6,38 @@ Auto-Learner - 自动学习器 v2
 """
 
 import os
+import sys
 import json
-import time
+import argparse
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
-import requests
+
+# 共享的 Skill 清单在 skills 根目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from skill_inventory import SkillInventory
+
+from github_crawler import GitHubCrawler
+from learning_store import LearningStore
+from scheduler import Scheduler, query
 
 # 配置
 WORKSPACE = Path.home() / ".openclaw" / "workspace"
-GITHUB_API = "https://api.github.com"
 LEARNING_TOPICS = ["openclaw", "n8n", "dify", "automation", "ai-agent", 
                    "claude-code", "gemini-cli", "cursor", "langflow", "browser-use"]
+# 同时进行的搜索数
+SEARCH_WORKERS = 4
+# 学习记录库：ETag 缓存、各主题上榜项目、Star 历史
+STORE_FILE = WORKSPACE / "learning" / "learning.db"
+# 旧版 ETag 缓存文件，首次打开记录库时导入
+HTTP_CACHE_FILE = WORKSPACE / "learning" / "http_cache.json"
+
+# 调度器控制接口
+CONTROL_SOCKET = WORKSPACE / "learning" / "auto_learner.sock"
+
+_store = None
+_crawler = None
+_inventory = None
 
 def log(msg):
     print(f"\n[{datetime.now().strftime('%H:%M:%S')}] {msg}")
@@ -28,39 +48,28 @@ def log(msg):
         f.write(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}\n")
 
 def check_existing_skills():
-    """自检现有skills"""
-    skills_dir = Path.home() / ".openclaw" / "skills"
-    skills = []
-    for d in skills_dir.iterdir():
-        if d.is_dir() and not d.name.startswith('.') and not d.is_symlink():
-            skill_file = d / "SKILL.md"
-            if skill_file.exists():
-                skills.append({"name": d.name, "path": str(d)})
+    """自检现有skills（清单跨轮复用，inotify 可用时只重新检查有变化的 Skill）"""
+    global _inventory
+    if _inventory is None:
+        _inventory = SkillInventory(Path.home() / ".openclaw" / "skills", watch=True)
+    skills = [{"name": s["name"], "path": s["path"]}
+              for s in _inventory.refresh() if not s["symlink"] and s["has_skill_md"]]
     log(f"🔍 自检: 发现 {len(skills)} 个Skills")
     return skills
 
-def search_github(topic, per_page=10):
-    """搜索GitHub"""
-    try:
-        url = f"{GITHUB_API}/search/repositories"
-        params = {"q": topic, "sort": "stars", "order": "desc", "per_page": per_page}
-        resp = requests.get(url, params=params, timeout=15)
-        if resp.status_code == 200:
-            data = resp.json()
-            items = []
-            for item in data.get("items", [])[:5]:
-                items.append({
-                    "name": item.get("full_name", ""),
-                    "desc": item.get("description", "")[:100],
-                    "stars": item.get("stargazers_count", 0),
-                    "url": item.get("html_url", ""),
-                    "lang": item.get("language", "")
-                })
-            log(f"   📦 {topic}: {len(items)} 个项目")
-            return items
-    except Exception as e:
-        log(f"   ❌ {topic} 搜索失败: {e}")
-    return []
+def get_store():
+    global _store
+    if _store is None:
+        _store = LearningStore(STORE_FILE)
+        _store.import_json_cache(HTTP_CACHE_FILE)
+    return _store
+
+def get_crawler():
+    """各轮学习共用一个爬虫（连接池和 ETag 缓存跨轮复用）"""
+    global _crawler
+    if _crawler is None:
+        _crawler = GitHubCrawler(get_store(), workers=SEARCH_WORKERS, log=log)
+    return _crawler
 
 def learning_cycle(cycle_num):
     """单次学习循环"""
@@ -69,47 +78,73 @@ def learning_cycle(cycle_num):
     # 1. 自检
     skills = check_existing_skills()
     
-    # 2. 学习GitHub
-    all_results = {}
-    for topic in LEARNING_TOPICS:
-        results = search_github(topic)
-        if results:
-            all_results[topic] = results
-        time.sleep(1.5)  # 避免API限流
+    # 2. 学习GitHub（并发搜索，按 API 额度限速，结果未变化时走 304 缓存）
+    all_results = get_crawler().search_topics(LEARNING_TOPICS)
     
-    # 3. 生成报告
-    report = generate_report(skills, all_results, cycle_num)
+    # 3. 与上一轮比较
+    store = get_store()
+    delta = store.record_results(all_results)
+    names = [s["name"] for s in skills]
+    previous = store.get_state("skills")
+    store.set_state("skills", names)
+    if previous is not None:
+        delta["skills_added"] = sorted(set(names) - set(previous))
+        delta["skills_removed"] = sorted(set(previous) - set(names))
+    else:
+        delta["skills_added"], delta["skills_removed"] = names, []
     
-    # 4. 保存报告
-    save_report(report, cycle_num)
+    # 4. 只有发生变化时才生成并保存报告
+    report = generate_report(delta, cycle_num)
+    filename = save_report(report, cycle_num) if report else None
+    if not report:
+        log("💤 与上一轮相比没有变化，不生成报告")
+    store.record_cycle(delta, filename)
     
     log(f"✅ 第{cycle_num}轮学习完成")
     return True
 
-def generate_report(skills, github_data, cycle_num):
-    """生成学习报告"""
+def generate_report(delta, cycle_num):
+    """生成变化报告：新上榜、Star 快速增长、跌出榜单的项目和 Skills 增减；没有变化时返回 None"""
+    sections = []
+    
+    if delta["skills_added"] or delta["skills_removed"]:
+        lines = [f"- ➕ {name}" for name in delta["skills_added"]]
+        lines += [f"- ➖ {name}" for name in delta["skills_removed"]]
+        sections.append("## Skills 变化\n\n" + "\n".join(lines) + "\n")
+    
+    if delta["new"]:
+        text = "## 新上榜项目\n\n"
+        topic = None
+        for t, item in delta["new"]:
+            if t != topic:
+                topic = t
+                text += f"### {topic}\n\n"
+            text += f"- **{item['name']}** ⭐{item['stars']}\n"
+            text += f"  - {item['desc']}\n"
+            text += f"  - [链接]({item['url']})\n\n"
+        sections.append(text)
+    
+    if delta["jumps"]:
+        lines = [f"- **{item['name']}** ({t}) ⭐{old} → {item['stars']} (+{item['stars'] - old})"
+                 for t, item, old in delta["jumps"]]
+        sections.append("## Star 快速增长\n\n" + "\n".join(lines) + "\n")
+    
+    if delta["dropped"]:
+        lines = [f"- {name} ({t})" + (f" ⭐{stars}" if stars is not None else "")
+                 for t, name, stars in delta["dropped"]]
+        sections.append("## 跌出榜单\n\n" + "\n".join(lines) + "\n")
+    
+    if not sections:
+        return None
+    
     report = f"""# 自动学习报告 - 第{cycle_num}轮
 
 **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ---
 
-## 现有Skills ({len(skills)}个)
-
 """
-    for s in skills:
-        report += f"- {s['name']}\n"
-    
-    report += "\n## GitHub 学习成果\n\n"
-    
-    for topic, items in github_data.items():
-        report += f"### {topic}\n\n"
-        for item in items:
-            report += f"- **{item['name']}** ⭐{item['stars']}\n"
-            report += f"  - {item['desc']}\n"
-            report += f"  - [链接]({item['url']})\n\n"
-    
-    return report
+    return report + "\n".join(sections)
 
 def save_report(report, cycle_num):
     """保存报告"""
@@ -119,53 +154,71 @@ def save_report(report, cycle_num):
     filename = report_dir / f"report_cycle{cycle_num}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
     filename.write_text(report)
     log(f"📄 报告已保存: {filename}")
+    return filename
 
-def auto_learn(hours=1):
-    """自动学习主循环"""
+def auto_learn(hours=1, interval=300, cron=None, jitter=0):
+    """自动学习主循环：按固定频率或 cron 表达式触发，hours 为 0 时一直运行"""
     start_time = datetime.now()
-    end_time = start_time + timedelta(hours=hours)
+    end_time = start_time + timedelta(hours=hours) if hours > 0 else None
     
     log(f"🚀 开始自动学习")
     log(f"   开始: {start_time.strftime('%H:%M:%S')}")
-    log(f"   结束: {end_time.strftime('%H:%M:%S')}")
-    
-    cycle_num = 1
-    while datetime.now() < end_time:
-        learning_cycle(cycle_num)
-        cycle_num += 1
-        
-        # 检查是否还有时间
-        remaining = (end_time - datetime.now()).total_seconds()
-        if remaining > 600:  # 还有10分钟以上
-            log(f"⏳ 等待5分钟后继续...")
-            time.sleep(300)  # 5分钟
-        elif remaining > 60:
-            log(f"⏳ 等待1分钟后继续...")
-            time.sleep(60)
-        else:
-            break
-    
-    log(f"🎉 全部学习完成! 共{cycle_num-1}轮")
+    log(f"   结束: {end_time.strftime('%H:%M:%S') if end_time else '不限'}")
+    log(f"   节奏: {f'cron {cron}' if cron else f'每 {interval} 秒'}" + (f"，抖动 {jitter} 秒" if jitter else ""))
+    
+    scheduler = Scheduler(
+        learning_cycle,
+        interval=None if cron else interval,
+        cron=cron,
+        jitter=jitter,
+        end_time=end_time,
+        socket_path=CONTROL_SOCKET,
+        log=log,
+    )
+    try:
+        cycles = scheduler.run()
+    except RuntimeError as e:
+        log(f"❌ {e}")
+        return
+    
+    log(f"🎉 全部学习完成! 共{cycles}轮")
+
+def control(cmd):
+    """向运行中的自动学习发送控制命令"""
+    response = query(CONTROL_SOCKET, cmd)
+    if response is None:
+        print("自动学习未在运行")
+        return 1
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get("ok") else 1
 
 def main():
-    import sys
+    parser = argparse.ArgumentParser(description="Auto-Learner 自动学习器")
+    parser.add_argument("hours", nargs="?", default="1",
+                        help="学习时长（小时，0 表示一直运行）；或控制命令 status / trigger / skip / stop")
+    parser.add_argument("--interval", type=float, default=5, help="每轮间隔（分钟，按开始时间计），默认 5")
+    parser.add_argument("--cron", help="cron 表达式（分 时 日 月 周），如 '0 */2 * * *'，指定后忽略 --interval")
+    parser.add_argument("--jitter", type=float, default=0, help="每次触发随机推迟的最大秒数")
+    args = parser.parse_args()
+    
+    if args.hours in ("status", "trigger", "skip", "stop"):
+        sys.exit(control(args.hours))
     
     hours = 1.0
-    if len(sys.argv) > 1:
-        try:
-            hours = float(sys.argv[1])
-        except:
-            pass
+    try:
+        hours = float(args.hours)
+    except ValueError:
+        pass
     
     print(f"""
 🔧 Auto-Learner v2 - 自动学习器
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-学习时长: {hours}小时
+学习时长: {f'{hours}小时' if hours > 0 else '不限'}
 学习主题: {len(LEARNING_TOPICS)}个
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     """)
     
-    auto_learn(hours)
+    auto_learn(hours, interval=args.interval * 60, cron=args.cron, jitter=args.jitter)
 
 if __name__ == "__main__":
     main()
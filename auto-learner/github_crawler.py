@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+GitHub 主题搜索爬虫
+
+- 所有请求共用一个 requests.Session，连接池复用 TCP/TLS 连接
+- 多个主题在线程池中并发搜索，由 RateLimiter 按响应头 X-RateLimit-* 控制节奏：
+  剩余额度用完时等到重置时间，403/429 时按 Retry-After 退避
+- 响应的 ETag 缓存到本地（缓存对象提供 get / put / touch / save，见 learning_store.py），
+  下次带 If-None-Match 请求，结果没变时 GitHub 返回 304，直接使用缓存结果（带 token 认证时 304 不计入额度）
+- 设置环境变量 GITHUB_TOKEN 可提高额度（搜索接口：未认证 10 次/分钟，认证 30 次/分钟）
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GITHUB_API = "https://api.github.com"
+
+# 等待额度重置超过该秒数时放弃本次请求，使用缓存结果
+MAX_WAIT = 120
+
+
+class RateLimiter:
+    """按 GitHub 返回的额度信息限速，多线程共用"""
+
+    def __init__(self, min_interval=0.0, reserve=0):
+        self.min_interval = min_interval
+        self.reserve = reserve
+        self.remaining = None  # 未知时不限制
+        self.reset_at = 0.0
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=MAX_WAIT):
+        """取得一次请求额度；需要等待超过 max_wait 秒时返回 False"""
+        deadline = time.time() + max_wait
+        while True:
+            with self._lock:
+                now = time.time()
+                if self.remaining is not None and self.remaining <= self.reserve and now < self.reset_at:
+                    wait = self.reset_at - now + 1
+                elif now < self.next_at:
+                    wait = self.next_at - now
+                else:
+                    self.next_at = now + self.min_interval
+                    if self.remaining is not None:
+                        # 预扣一次，响应回来后以服务端的数字为准
+                        self.remaining -= 1
+                    return True
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def update(self, resp):
+        """根据响应头更新额度"""
+        headers = resp.headers
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                remaining = int(headers["X-RateLimit-Remaining"])
+                reset_at = float(headers.get("X-RateLimit-Reset", 0))
+                if reset_at == self.reset_at and self.remaining is not None:
+                    # 并发请求的响应可能乱序到达，同一额度窗口内取最小值
+                    remaining = min(remaining, self.remaining)
+                self.remaining, self.reset_at = remaining, max(reset_at, self.reset_at)
+            if resp.status_code in (403, 429) and (
+                    "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"):
+                retry_after = float(headers.get("Retry-After", 0))
+                self.remaining = 0
+                self.reset_at = max(self.reset_at, time.time() + retry_after)
+
+
+def summarize(item):
+    return {
+        "name": item.get("full_name", ""),
+        "desc": (item.get("description") or "")[:100],
+        "stars": item.get("stargazers_count", 0),
+        "url": item.get("html_url", ""),
+        "lang": item.get("language") or "",
+    }
+
+
+class GitHubCrawler:
+    def __init__(self, cache, workers=4, token=None, log=print):
+        self.cache = cache
+        self.workers = workers
+        self.log = log
+        self.limiter = RateLimiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "openclaw-auto-learner",
+        })
+        token = token or os.environ.get("GITHUB_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def search(self, topic, per_page=10, limit=5):
+        """搜索一个主题，返回 (项目列表, 来源)；来源为 fresh / cached / stale / error"""
+        params = {"q": topic, "sort": "stars", "order": "desc", "per_page": per_page}
+        key = "search/repositories?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        cached = self.cache.get(key)
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+
+        if not self.limiter.acquire():
+            self.log(f"   ⏸️ {topic}: 额度用尽，使用缓存结果")
+            return (cached["data"][:limit], "stale") if cached else ([], "error")
+        try:
+            resp = self.session.get(f"{GITHUB_API}/search/repositories",
+                                    params=params, headers=headers, timeout=15)
+        except requests.RequestException as e:
+            self.log(f"   ❌ {topic} 搜索失败: {e}")
+            return (cached["data"][:limit], "stale") if cached else ([], "error")
+        self.limiter.update(resp)
+
+        if resp.status_code == 304 and cached:
+            self.cache.touch(key)
+            return cached["data"][:limit], "cached"
+        if resp.status_code == 200:
+            items = [summarize(item) for item in resp.json().get("items", [])]
+            self.cache.put(key, resp.headers.get("ETag"), items)
+            return items[:limit], "fresh"
+        self.log(f"   ❌ {topic} 搜索失败: HTTP {resp.status_code}")
+        return (cached["data"][:limit], "stale") if cached else ([], "error")
+
+    def search_topics(self, topics, per_page=10, limit=5):
+        """并发搜索多个主题，返回 {主题: 项目列表}（按 topics 顺序）"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda t: self.search(t, per_page, limit), topics))
+        self.cache.save()
+        output = {}
+        for topic, (items, source) in zip(topics, results):
+            if source != "error":
+                mark = {"fresh": "", "cached": "（未变化）", "stale": "（缓存）"}[source]
+                self.log(f"   📦 {topic}: {len(items)} 个项目{mark}")
+            if items:
+                output[topic] = items
+        return output
+
+    def close(self):
+        self.session.close()
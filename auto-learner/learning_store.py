@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+学习记录库（SQLite）
+
+- http_cache：GitHub 响应的 ETag 和结果，供 github_crawler 发条件请求
+- repos / topic_repos：每个主题上榜过的项目，present 表示上一轮是否仍在榜
+- stars：Star 数历史，只在数值变化时追加一行
+- cycles：每轮的变化统计和报告文件
+- state：其他跨轮状态（如上一轮的 Skills 列表）
+
+每轮只比较本轮结果与库中状态，得出新上榜、Star 快速增长、跌出榜单三类变化。
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+# Star 增长达到该数量且不低于原值的 STAR_JUMP_RATIO 时算快速增长
+STAR_JUMP_MIN = 50
+STAR_JUMP_RATIO = 0.01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repos (
+    name TEXT PRIMARY KEY,
+    url TEXT,
+    desc TEXT,
+    lang TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topic_repos (
+    topic TEXT NOT NULL,
+    name TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    present INTEGER NOT NULL DEFAULT 1,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (topic, name)
+);
+CREATE TABLE IF NOT EXISTS stars (
+    name TEXT NOT NULL,
+    time REAL NOT NULL,
+    stars INTEGER NOT NULL,
+    PRIMARY KEY (name, time)
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    new INTEGER NOT NULL,
+    jumps INTEGER NOT NULL,
+    dropped INTEGER NOT NULL,
+    report TEXT
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def is_star_jump(old, new):
+    return new - old >= max(STAR_JUMP_MIN, old * STAR_JUMP_RATIO)
+
+
+class LearningStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 爬虫线程也会读写缓存，所有访问都经过同一把锁
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.db.commit()
+
+    def close(self):
+        with self._lock:
+            self.db.commit()
+            self.db.close()
+
+    # ---------- HTTP 缓存（github_crawler 使用） ----------
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT etag, data FROM http_cache WHERE key = ?", (key,)).fetchone()
+        return {"etag": row[0], "data": json.loads(row[1])} if row else None
+
+    def put(self, key, etag, data):
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO http_cache (key, etag, data, fetched_at) VALUES (?, ?, ?, ?)",
+                (key, etag, json.dumps(data, ensure_ascii=False), time.time()),
+            )
+
+    def touch(self, key):
+        with self._lock:
+            self.db.execute("UPDATE http_cache SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    def save(self):
+        with self._lock:
+            self.db.commit()
+
+    def import_json_cache(self, path):
+        """导入旧版 http_cache.json，导入后删除该文件"""
+        path = Path(path)
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return 0
+        with self._lock:
+            for key, entry in entries.items():
+                self.db.execute(
+                    "INSERT OR IGNORE INTO http_cache (key, etag, data, fetched_at) VALUES (?, ?, ?, ?)",
+                    (key, entry.get("etag"), json.dumps(entry["data"], ensure_ascii=False), entry["time"]),
+                )
+            self.db.commit()
+        path.unlink()
+        return len(entries)
+
+    # ---------- 跨轮状态 ----------
+
+    def get_state(self, key, default=None):
+        with self._lock:
+            row = self.db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                            (key, json.dumps(value, ensure_ascii=False)))
+
+    # ---------- 每轮结果 ----------
+
+    def _last_stars(self, name):
+        row = self.db.execute(
+            "SELECT stars FROM stars WHERE name = ? ORDER BY time DESC LIMIT 1", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_results(self, results):
+        """写入本轮 {主题: 项目列表}，返回变化：
+        {"new": [(主题, 项目)], "jumps": [(主题, 项目, 原 Star 数)], "dropped": [(主题, 名称, Star 数)]}
+
+        没有出现在 results 中的主题（本轮搜索失败）保持原状，不算跌出
+        """
+        now = time.time()
+        delta = {"new": [], "jumps": [], "dropped": []}
+        with self._lock:
+            for topic, items in results.items():
+                before = {row[0] for row in self.db.execute(
+                    "SELECT name FROM topic_repos WHERE topic = ? AND present = 1", (topic,))}
+                for rank, item in enumerate(items):
+                    name = item["name"]
+                    self.db.execute(
+                        "INSERT INTO repos (name, url, desc, lang, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET url = excluded.url, desc = excluded.desc, "
+                        "lang = excluded.lang, last_seen = excluded.last_seen",
+                        (name, item["url"], item["desc"], item["lang"], now, now),
+                    )
+                    last = self._last_stars(name)
+                    if last != item["stars"]:
+                        self.db.execute("INSERT OR REPLACE INTO stars (name, time, stars) VALUES (?, ?, ?)",
+                                        (name, now, item["stars"]))
+                    if name not in before:
+                        delta["new"].append((topic, item))
+                    elif last is not None and is_star_jump(last, item["stars"]):
+                        delta["jumps"].append((topic, item, last))
+                    self.db.execute(
+                        "INSERT INTO topic_repos (topic, name, rank, present, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, 1, ?, ?) ON CONFLICT(topic, name) DO UPDATE SET "
+                        "rank = excluded.rank, present = 1, last_seen = excluded.last_seen",
+                        (topic, name, rank, now, now),
+                    )
+                current = {item["name"] for item in items}
+                for name in sorted(before - current):
+                    self.db.execute("UPDATE topic_repos SET present = 0 WHERE topic = ? AND name = ?",
+                                    (topic, name))
+                    delta["dropped"].append((topic, name, self._last_stars(name)))
+            self.db.commit()
+        return delta
+
+    def record_cycle(self, delta, report=None):
+        with self._lock:
+            self.db.execute(
+                "INSERT INTO cycles (time, new, jumps, dropped, report) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), len(delta["new"]), len(delta["jumps"]), len(delta["dropped"]),
+                 str(report) if report else None),
+            )
+            self.db.commit()
+
+    def star_history(self, name):
+        """[(时间戳, Star 数)]"""
+        with self._lock:
+            return self.db.execute("SELECT time, stars FROM stars WHERE name = ? ORDER BY time",
+                                   (name,)).fetchall()
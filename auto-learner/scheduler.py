@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+学习任务调度器
+
+- 固定频率（按开始时间对齐，慢的一轮不会推迟之后的轮次）或 cron 表达式两种节奏
+- 每次触发时间可加随机抖动，避免多个实例同时请求 GitHub
+- 同一时间只运行一轮：到点时上一轮还没结束，本次跳过
+- SIGTERM / SIGINT 后不再开始新的一轮，等当前一轮结束后退出；再次收到信号立即退出
+- Unix socket 控制接口（每行一个 JSON 请求）：status / trigger / skip / stop / ping
+
+主循环用 selectors 等待信号、控制连接和任务结束通知，空闲时不占 CPU。
+"""
+
+import os
+import json
+import random
+import signal
+import socket
+import selectors
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+# ---------- cron 表达式 ----------
+
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),  # 0 为周日，7 也视为周日
+)
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"步长必须大于 0: {text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if high == 6 and end == 7:
+            # 星期字段允许 7 表示周日
+            values.add(0)
+            end = 6
+            if start == 7:
+                continue
+        if not (low <= start <= end <= high):
+            raise ValueError(f"超出范围 {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpr:
+    """五段式 cron 表达式：分 时 日 月 周，支持 * , - /"""
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expr}")
+        self.expr = expr
+        parsed = [_parse_field(f, low, high) for f, (_, low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        # 日和周都有限制时满足其一即可（与 cron 相同）
+        self.day_any = fields[2] == "*"
+        self.weekday_any = fields[4] == "*"
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self.day_any or self.weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt):
+        """dt 之后（不含）第一个匹配的时间"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"cron 表达式没有可用的时间: {self.expr}")
+
+
+# ---------- 调度器 ----------
+
+class Scheduler:
+    def __init__(self, job, interval=None, cron=None, jitter=0, end_time=None,
+                 socket_path=None, log=print):
+        """job(轮次) 在后台线程中执行；interval 秒或 cron 表达式二选一，end_time 之后不再开始新的一轮"""
+        if (interval is None) == (cron is None):
+            raise ValueError("interval 和 cron 需要且只能指定一个")
+        self.job = job
+        self.interval = interval
+        self.cron = CronExpr(cron) if cron else None
+        self.jitter = jitter
+        self.end_time = end_time
+        self.socket_path = Path(socket_path) if socket_path else None
+        self.log = log
+
+        self.cycle = 0
+        self.skipped = 0
+        self.running_since = None
+        self.last_run = None  # {"cycle", "start", "end", "ok"}
+        self.skip_next = False
+        self.trigger = False
+        self.stopping = False
+        self.next_slot = None  # 下一个计划时间（不含抖动）
+        self.next_due = None   # 加上抖动后的实际触发时间
+
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._done_r, self._done_w = os.pipe()
+        for fd in (self._wakeup_r, self._wakeup_w, self._done_r, self._done_w):
+            os.set_blocking(fd, False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, "signal")
+        self.selector.register(self._done_r, selectors.EVENT_READ, "done")
+        self._thread = None
+        self._server = None
+
+    # ---------- 计划时间 ----------
+
+    def _schedule(self, after):
+        """计算 after 之后的下一个计划时间"""
+        if self.cron:
+            slot = self.cron.next_after(after)
+        elif self.next_slot is None:
+            slot = after
+        else:
+            # 按第一次的时间对齐，错过的时间点直接跳过
+            slot = self.next_slot + timedelta(seconds=self.interval)
+            if slot <= after:
+                missed = int((after - slot).total_seconds() // self.interval) + 1
+                slot += timedelta(seconds=self.interval * missed)
+        self.next_slot = slot
+        self.next_due = slot + timedelta(seconds=random.uniform(0, self.jitter)) if self.jitter else slot
+        if self.end_time and self.next_due > self.end_time:
+            self.next_due = None
+
+    # ---------- 执行 ----------
+
+    def _start_run(self, reason):
+        self.cycle += 1
+        cycle = self.cycle
+        self.running_since = datetime.now()
+
+        def target():
+            ok = False
+            try:
+                self.job(cycle)
+                ok = True
+            except Exception as e:
+                self.log(f"❌ 第{cycle}轮执行失败: {e}")
+            finally:
+                self.last_run = {"cycle": cycle, "start": self.running_since.isoformat(timespec="seconds"),
+                                 "end": datetime.now().isoformat(timespec="seconds"), "ok": ok,
+                                 "reason": reason}
+                os.write(self._done_w, b"x")
+
+        self._thread = threading.Thread(target=target, name=f"cycle-{cycle}", daemon=True)
+        self._thread.start()
+
+    def _on_due(self):
+        now = datetime.now()
+        if self.skip_next:
+            self.skip_next = False
+            self.skipped += 1
+            self.log("⏭️ 按请求跳过本轮")
+        elif self.running_since:
+            self.skipped += 1
+            self.log(f"⏭️ 第{self.cycle}轮仍在运行，跳过本次计划")
+        else:
+            self._start_run("schedule")
+        self._schedule(now)
+
+    # ---------- 控制接口 ----------
+
+    def status(self):
+        return {
+            "cycle": self.cycle,
+            "running": self.running_since.isoformat(timespec="seconds") if self.running_since else None,
+            "next": self.next_due.isoformat(timespec="seconds") if self.next_due else None,
+            "end": self.end_time.isoformat(timespec="seconds") if self.end_time else None,
+            "mode": f"cron {self.cron.expr}" if self.cron else f"every {self.interval}s",
+            "skip_next": self.skip_next,
+            "skipped": self.skipped,
+            "stopping": self.stopping,
+            "last": self.last_run,
+        }
+
+    def handle(self, cmd):
+        if cmd == "status":
+            return {"ok": True, **self.status()}
+        if cmd == "ping":
+            return {"ok": True}
+        if cmd == "trigger":
+            if self.running_since:
+                return {"ok": False, "error": f"第{self.cycle}轮正在运行"}
+            if self.stopping:
+                return {"ok": False, "error": "正在停止"}
+            self.trigger = True
+            return {"ok": True}
+        if cmd == "skip":
+            self.skip_next = True
+            return {"ok": True, "next": self.next_due.isoformat(timespec="seconds") if self.next_due else None}
+        if cmd == "stop":
+            self.stop("控制命令")
+            return {"ok": True}
+        return {"ok": False, "error": f"未知命令: {cmd}"}
+
+    def _open_socket(self):
+        if self.socket_path.exists():
+            if query(self.socket_path, "ping") is not None:
+                raise RuntimeError(f"已有调度器在运行: {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        server.listen(8)
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, "accept")
+        self._server = server
+
+    def _serve_client(self):
+        try:
+            conn, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        with conn:
+            # 请求只有一行，短超时读取，慢客户端不会卡住调度
+            conn.settimeout(1)
+            try:
+                data = b""
+                while not data.endswith(b"\n") and len(data) < 65536:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+                try:
+                    cmd = json.loads(data or b"{}").get("cmd", "status")
+                except ValueError:
+                    cmd = None
+                response = self.handle(cmd) if cmd else {"ok": False, "error": "请求格式错误"}
+                conn.sendall(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            except OSError:
+                pass
+
+    # ---------- 信号 ----------
+
+    def stop(self, reason):
+        if not self.stopping:
+            self.stopping = True
+            self.next_due = None
+            suffix = "，等待当前一轮结束" if self.running_since else ""
+            self.log(f"🛑 收到停止请求（{reason}）{suffix}")
+
+    def _on_signal(self, signum, frame):
+        if self.stopping:
+            # 第二次信号：不再等待，立即退出
+            raise KeyboardInterrupt
+        self.stop(signal.Signals(signum).name)
+
+    def _drain(self, fd):
+        try:
+            while os.read(fd, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    # ---------- 主循环 ----------
+
+    def run(self):
+        if self.socket_path:
+            self._open_socket()
+        previous = {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        old_wakeup = signal.set_wakeup_fd(self._wakeup_w)
+        try:
+            self._schedule(datetime.now())
+            while not (self.stopping and not self.running_since):
+                if not self.stopping:
+                    if self.trigger:
+                        self.trigger = False
+                        if not self.running_since:
+                            self._start_run("trigger")
+                    elif self.next_due and datetime.now() >= self.next_due:
+                        self._on_due()
+                    if not self.next_due and not self.running_since:
+                        self.log("⏰ 已到结束时间")
+                        break
+                timeout = None
+                if self.next_due and not self.stopping:
+                    timeout = max(0.0, (self.next_due - datetime.now()).total_seconds())
+                for key, _ in self.selector.select(timeout):
+                    if key.data == "accept":
+                        self._serve_client()
+                    elif key.data == "done":
+                        self._drain(self._done_r)
+                        self._thread.join()
+                        self._thread = None
+                        self.running_since = None
+                    else:
+                        self._drain(self._wakeup_r)
+        finally:
+            signal.set_wakeup_fd(old_wakeup)
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            if self._server:
+                self.selector.unregister(self._server)
+                self._server.close()
+                try:
+                    self.socket_path.unlink()
+                except FileNotFoundError:
+                    pass
+            self.selector.close()
+            for fd in (self._wakeup_r, self._wakeup_w, self._done_r, self._done_w):
+                os.close(fd)
+        return self.cycle
+
+
+def query(path, cmd="status", timeout=2):
+    """向调度器发送控制命令，未运行时返回 None"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps({"cmd": cmd}).encode() + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
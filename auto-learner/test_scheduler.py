@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""scheduler 测试：cron 表达式的星期字段"""
+
+import unittest
+from datetime import datetime
+
+from scheduler import CronExpr
+
+
+class CronWeekdayTest(unittest.TestCase):
+    def test_seven_is_sunday(self):
+        cron = CronExpr("* * * * 7")
+        self.assertEqual(cron.weekdays, {0})
+        # 2026-10-17 是周六，下一个匹配时间是周日 0 点
+        self.assertEqual(cron.next_after(datetime(2026, 10, 17, 12, 0)), datetime(2026, 10, 18, 0, 0))
+
+    def test_range_ending_at_seven(self):
+        self.assertEqual(CronExpr("* * * * 5-7").weekdays, {5, 6, 0})
+
+    def test_midnight_on_seven(self):
+        self.assertEqual(CronExpr("0 0 * * 7").weekdays, {0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,20 +11,39 @@
 用途：
 - 修改底层逻辑前先备份
 - 出问题时快速恢复
+
+备份范围由 config.json 的 sources 决定（见 scope.py），
+清单中的文件路径相对 ~/.openclaw，如 workspace/MEMORY.md
 """
 
 import os
+import sys
 import json
 import shutil
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+# 共用的原子写入模块在 skills 根目录
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from atomic_io import atomic_open, lock_path
+
+from line_diff import LineIndex, merge3, section_diff, unified_diff
+from retention import DEFAULT_RETENTION, select_retained
+from scope import fast_copy, load_sources, matches
+from snapshot_store import STORE_DIRS, SnapshotStore
+from stat_index import StatIndex
+
 # 配置
-BACKUP_DIR = Path("~/.openclaw/backup").expanduser()
-SKILLS_DIR = Path("~/.openclaw/skills")
+CONFIG_FILE = Path(__file__).parent / "config.json"
+OPENCLAW_DIR = Path("~/.openclaw").expanduser()
+BACKUP_DIR = OPENCLAW_DIR / "backup"
 
-# 需要备份的核心文件
+# 清单格式版本：2 起文件路径相对 ~/.openclaw，之前只有 workspace 下的文件名
+MANIFEST_VERSION = 2
+
+# 未配置 sources 时备份的核心文件
 CORE_FILES = [
     "MEMORY.md",
     "AGENTS.md", 
@@ -34,115 +53,402 @@ CORE_FILES = [
     "IDENTITY.md",
 ]
 
+# 文件状态索引 (path, size, mtime_ns, inode, hash)
+INDEX_FILE = BACKUP_DIR / "index.json"
+
+DEFAULT_CONFIG = {
+    "sources": [{"root": "workspace", "include": CORE_FILES}],
+    "workers": 4,
+    "retention": DEFAULT_RETENTION,
+    "auto_prune": True
+}
+
+def load_config():
+    """加载配置，缺失的键使用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    if CONFIG_FILE.exists():
+        try:
+            config.update(json.loads(CONFIG_FILE.read_text(encoding="utf-8")))
+        except ValueError as e:
+            print(f"⚠️ 配置文件解析失败，使用默认配置: {e}")
+    return config
+
+def get_store():
+    return SnapshotStore(BACKUP_DIR)
+
+def get_index():
+    return StatIndex(INDEX_FILE)
+
+def legacy_backup(name):
+    """旧格式备份目录（每次完整复制文件）"""
+    path = BACKUP_DIR / name
+    if name in STORE_DIRS or not path.is_dir():
+        return None
+    return path
+
+def backup_files(store, name):
+    """备份中的文件 {相对 ~/.openclaw 的路径: 清单条目或旧格式文件路径}，备份不存在时返回 None"""
+    manifest = store.load_manifest(name)
+    if manifest:
+        files = manifest["files"]
+        if manifest.get("version", 1) < 2:
+            # 早期清单只记录 workspace 下的文件名
+            files = {f"workspace/{f}": entry for f, entry in files.items()}
+        return files
+    legacy = legacy_backup(name)
+    if legacy:
+        return {
+            f"workspace/{p.name}": p for p in sorted(legacy.iterdir())
+            if p.is_file() and p.name != "meta.json"
+        }
+    return None
+
+def open_backup_entry(store, entry):
+    """以二进制只读方式打开备份中的文件"""
+    if isinstance(entry, Path):
+        return open(entry, "rb")
+    return store.open_entry(entry)
+
+def source_path(key):
+    """清单路径对应的当前文件（~/.openclaw 之外的来源记录的是绝对路径）"""
+    return OPENCLAW_DIR / key
+
+def scan_sources(config):
+    """按备份范围遍历当前文件，返回 {清单路径: (绝对路径, stat)}"""
+    found = {}
+    for source in load_sources(config, OPENCLAW_DIR, CORE_FILES, skip=[BACKUP_DIR]):
+        for rel, path, st in source.walk():
+            try:
+                key = Path(path).relative_to(OPENCLAW_DIR).as_posix()
+            except ValueError:
+                key = path
+            found.setdefault(key, (path, st))
+    return found
+
+def select(files, patterns):
+    """按 --path 通配规则筛选文件"""
+    if not patterns:
+        return files
+    return {k: v for k, v in files.items() if matches(k, patterns)}
+
 def create_backup(name=None):
-    """创建备份"""
+    """创建备份：文件分块存入对象库，备份本身只是一份清单"""
     BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    store = get_store()
+    config = load_config()
     
+    pinned = bool(name)
     if not name:
         name = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    backup_path = BACKUP_DIR / name
-    backup_path.mkdir(parents=True, exist_ok=True)
+    # stat 与索引一致的文件直接复用已存的分块，不重新读取
+    index = get_index()
+    found = scan_sources(config)
     
-    # 复制核心文件
-    copied = []
-    for f in CORE_FILES:
-        src = Path(f"~/.openclaw/workspace/{f}").expanduser()
-        if src.exists():
-            dst = backup_path / f
-            shutil.copy2(src, dst)
-            copied.append(f)
+    files = {}
+    written = 0
+    reused = 0
+    pending = {}
+    # 变化的文件在线程池中读取、哈希、压缩，新增分块写入同一个 pack
+    with store.packing(), ThreadPoolExecutor(max_workers=config.get("workers") or 1) as pool:
+        for key, (path, st) in sorted(found.items()):
+            known = index.lookup(path, st)
+            if known and known.get("chunks") and all(store.has_object(c) for c in known["chunks"]):
+                files[key] = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "mode": st.st_mode & 0o7777,
+                    "hash": known["hash"],
+                    "chunks": known["chunks"],
+                }
+                reused += 1
+                continue
+            pending[key] = (pool.submit(store.store_file, path), path, st)
+        for key, (future, path, st) in pending.items():
+            try:
+                files[key], size = future.result()
+            except OSError as e:
+                # 遍历之后被删除或无权限读取
+                print(f"  ⚠️ 跳过 {key}: {e}")
+                continue
+            index.update(path, st, files[key]["hash"], files[key]["chunks"])
+            written += size
+    index.save()
     
-    # 保存备份元信息
-    meta = {
+    # 保存备份清单；手动命名的备份不参与自动清理
+    manifest = {
         "name": name,
+        "version": MANIFEST_VERSION,
         "created": datetime.now().isoformat(),
-        "files": copied
+        "pinned": pinned,
+        "files": dict(sorted(files.items()))
     }
-    (backup_path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+    store.save_manifest(manifest)
     
     print(f"✅ 备份创建成功: {name}")
-    print(f"   文件: {', '.join(copied)}")
+    print(f"   文件: {len(files)} 个，{format_size(sum(e['size'] for e in files.values()))}")
+    print(f"   新增或修改 {len(files) - reused} 个，新写入 {format_size(written)}，未变化 {reused} 个")
+    
+    if config.get("auto_prune", True):
+        prune_backups(config, quiet=True)
     return name
 
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def prune_backups(config=None, quiet=False):
+    """按 GFS 策略清理过期备份，并回收不再引用的数据"""
+    config = config or load_config()
+    store = get_store()
+    snapshots = {k: v for k, v in store.catalog().items() if not v.get("legacy")}
+    keep = select_retained(snapshots, config.get("retention"))
+    expired = sorted(set(snapshots) - keep)
+    if not expired:
+        if not quiet:
+            print("✅ 没有需要清理的备份")
+        return []
+    store.delete_manifests(expired)
+    freed = store.gc()
+    print(f"🧹 已清理 {len(expired)} 份过期备份，释放 {freed / 1024 / 1024:.1f} MB")
+    if not quiet:
+        for name in expired:
+            print(f"   - {name}")
+    return expired
+
+def migrate_legacy():
+    """把旧格式的完整复制目录导入对象库，导入后删除原目录"""
+    store = get_store()
+    catalog = store.catalog()
+    legacy = [name for name, info in catalog.items() if info.get("legacy") and legacy_backup(name)]
+    if not legacy:
+        print("✅ 没有旧格式备份")
+        return
+    with store.packing():
+        for name in legacy:
+            path = legacy_backup(name)
+            files = {}
+            for key, src in backup_files(store, name).items():
+                files[key], _ = store.store_file(src)
+            store.save_manifest({
+                "name": name,
+                "version": MANIFEST_VERSION,
+                "created": catalog[name]["created"],
+                "pinned": True,
+                "files": files
+            })
+    for name in legacy:
+        shutil.rmtree(legacy_backup(name))
+        print(f"   📦 {name}")
+    print(f"✅ 已导入 {len(legacy)} 份旧格式备份")
+
 def list_backups():
-    """列出所有备份"""
+    """列出所有备份（只读取 catalog.json）"""
     if not BACKUP_DIR.exists():
         print("暂无备份")
         return
     
+    backups = get_store().catalog()
+    if not backups:
+        print("暂无备份")
+        return
+    
     print("\n📦 可用备份：")
     print("-" * 40)
     
-    backups = sorted(BACKUP_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True)
-    
-    for b in backups:
-        if b.is_dir():
-            meta_file = b / "meta.json"
-            if meta_file.exists():
-                meta = json.loads(meta_file.read_text())
-                print(f"  {b.name}")
-                print(f"    时间: {meta['created'][:19]}")
-                print(f"    文件: {', '.join(meta['files'])}")
-                print()
-            else:
-                print(f"  {b.name} (无元信息)")
+    for name, info in sorted(backups.items(), key=lambda b: b[1]["created"], reverse=True):
+        note = " (旧格式)" if info.get("legacy") else " 📌" if info.get("pinned") else ""
+        print(f"  {name}{note}")
+        print(f"    时间: {info['created'][:19]}")
+        count = info.get("count", len(info.get("files", [])))
+        size = f"，{format_size(info['size'])}" if "size" in info else ""
+        names = f"（{', '.join(info['files'])}）" if info.get("files") else ""
+        print(f"    文件: {count} 个{size}{names}")
+        print()
+
+def merge_restore(name, base=None, patterns=None):
+    """三方合并恢复：保留 base 之后在当前文件上的修改，同时应用备份相对 base 的差异"""
+    store = get_store()
+    files = backup_files(store, name)
+    if files is None:
+        print(f"❌ 备份不存在: {name}")
+        return False
+    
+    if not base:
+        latest = store.latest()
+        base = latest["name"] if latest else None
+    base_files = backup_files(store, base) if base else None
+    if base_files is None:
+        print(f"❌ 找不到合并基准备份，请用 --base <名称> 指定")
+        return False
+    if base == name:
+        print(f"ℹ️ '{name}' 就是最新备份，当前文件已包含其后的所有修改，无需合并")
+        return True
+    
+    print(f"🔀 三方合并恢复: {name}（基准: {base}）")
+    total_conflicts = 0
+    for f, entry in select(files, patterns).items():
+        dst = source_path(f)
+        if f in base_files and not isinstance(entry, Path) and not isinstance(base_files[f], Path) \
+                and entry["hash"] == base_files[f]["hash"]:
+            # 备份相对基准没有改动，当前文件保持不变
+            continue
+        with open_backup_entry(store, entry) as theirs:
+            if not dst.exists() or f not in base_files:
+                # 当前没有该文件或基准中没有，无从合并，按备份内容恢复
+                if dst.exists():
+                    print(f"  ⏭️ {f}: 基准备份中没有该文件，跳过")
+                    continue
+                with atomic_open(dst) as out:
+                    shutil.copyfileobj(theirs, out)
+                print(f"  + {f}: 已恢复")
+                continue
+            with open_backup_entry(store, base_files[f]) as base_file, open(dst, "rb") as ours_file:
+                ours = LineIndex(ours_file, f"当前/{f}")
+                with atomic_open(dst, lock=lock_path(dst).exists()) as out:
+                    conflicts = merge3(
+                        LineIndex(base_file, f"{base}/{f}"), ours, LineIndex(theirs, f"{name}/{f}"), out
+                    )
+        total_conflicts += conflicts
+        if conflicts:
+            print(f"  ⚠️ {f}: {conflicts} 处冲突，已写入 <<<<<<< / >>>>>>> 标记")
+        else:
+            print(f"  ✅ {f}: 已合并")
+    
+    if total_conflicts:
+        print(f"⚠️ 合并完成，共 {total_conflicts} 处冲突需要手动处理")
+    else:
+        print(f"✅ 合并恢复成功: {name}")
+    return True
 
-def restore_backup(name):
+def restore_backup(name, patterns=None):
     """恢复备份"""
-    backup_path = BACKUP_DIR / name
+    store = get_store()
+    files = backup_files(store, name)
     
-    if not backup_path.exists():
+    if files is None:
         print(f"❌ 备份不存在: {name}")
         return False
     
+    files = select(files, patterns)
+    
+    def restore(item):
+        # 写入临时文件后原子替换，正在读取的程序不会看到写了一半的文件；
+        # 其他工具加锁维护的文件（如 openclaw.json）同样加锁写入
+        key, entry = item
+        dst = source_path(key)
+        lock = lock_path(dst).exists()
+        if isinstance(entry, Path):
+            # 旧格式备份是完整文件，直接在内核中复制
+            with atomic_open(dst, mode=entry.stat().st_mode & 0o7777, lock=lock) as out:
+                fast_copy(entry, out)
+            shutil.copystat(entry, dst)
+        else:
+            with atomic_open(dst, mode=entry.get("mode", 0o644), lock=lock) as out:
+                store.write_entry(entry, out)
+            os.utime(dst, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return key
+    
     # 复制文件回去
-    restored = []
-    for f in CORE_FILES:
-        src = backup_path / f
-        if src.exists():
-            dst = Path(f"~/.openclaw/workspace/{f}").expanduser()
-            shutil.copy2(src, dst)
-            restored.append(f)
+    index = get_index()
+    workers = load_config().get("workers") or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key in pool.map(restore, files.items()):
+            entry = files[key]
+            if not isinstance(entry, Path):
+                dst = source_path(key)
+                index.update(dst, dst.stat(), entry["hash"], entry["chunks"])
+    
+    index.save()
     
     print(f"✅ 恢复成功: {name}")
-    print(f"   恢复文件: {', '.join(restored)}")
+    print(f"   恢复文件: {len(files)} 个" + (f"（{', '.join(files)}）" if len(files) <= 8 else ""))
     return True
 
-def diff_backup(name):
+def show_file_diff(store, name, f, entry, sections=False, context=3):
+    """输出单个文件的行级差异（备份 → 当前）"""
+    with open_backup_entry(store, entry) as backup_file, open(source_path(f), "rb") as current_file:
+        print(f"\n📄 {f}")
+        if b"\0" in backup_file.read(8192) or b"\0" in current_file.read(8192):
+            print("  （二进制文件，不显示内容差异）")
+            return
+        old = LineIndex(backup_file, f"{name}/{f}")
+        new = LineIndex(current_file, f"当前/{f}")
+        if not sections:
+            for line in unified_diff(old, new, context):
+                print(line)
+            return
+        marks = {"added": "+", "removed": "-", "changed": "~"}
+        labels = {"added": "当前新增", "removed": "当前已删除", "changed": "有修改"}
+        for key, status, lines in section_diff(old, new, context):
+            print(f"\n  {marks[status]} {key} ({labels[status]})")
+            for line in lines:
+                print(f"    {marks[status] if status != 'changed' else ''}{line}")
+
+def diff_backup(name, brief=False, sections=False, context=3, patterns=None):
     """比较当前与备份的差异"""
-    backup_path = BACKUP_DIR / name
+    store = get_store()
+    files = backup_files(store, name)
     
-    if not backup_path.exists():
+    if files is None:
         print(f"❌ 备份不存在: {name}")
         return
     
     print(f"\n🔍 比较当前与备份 '{name}' 的差异：")
     print("-" * 40)
     
-    for f in CORE_FILES:
-        src = Path(f"~/.openclaw/workspace/{f}").expanduser()
-        dst = backup_path / f
+    # 当前范围内的文件与备份中的文件取并集
+    current = scan_sources(load_config())
+    files, current = select(files, patterns), select(current, patterns)
+    
+    # 大小不同直接判定有差异；大小相同时比较哈希，stat 未变化的文件哈希取自索引
+    index = get_index()
+    changed = []
+    same = 0
+    
+    for f in sorted(set(files) | set(current)):
+        src = Path(current[f][0]) if f in current else source_path(f)
+        entry = files.get(f)
         
-        if not src.exists() and not dst.exists():
+        if not src.exists() and entry is None:
             continue
         
         if not src.exists():
             print(f"  + {f} (备份有，当前无)")
-        elif not dst.exists():
+        elif entry is None:
             print(f"  - {f} (当前有，备份无)")
         else:
-            src_content = src.read_text()
-            dst_content = dst.read_text()
-            if src_content != dst_content:
+            if isinstance(entry, Path):
+                equal = entry.stat().st_size == src.stat().st_size and index.hash(entry) == index.hash(src)
+            else:
+                equal = entry["size"] == src.stat().st_size and entry["hash"] == index.hash(src)
+            if not equal:
                 print(f"  ~ {f} (有差异)")
+                changed.append(f)
             else:
-                print(f"  = {f} (相同)")
+                same += 1
+    
+    print(f"  = {same} 个文件相同")
+    index.save()
+    
+    if not brief:
+        for f in changed:
+            show_file_diff(store, name, f, files[f], sections, context)
 
 def main():
     parser = argparse.ArgumentParser(description="底层逻辑备份管理器")
-    parser.add_argument("action", choices=["backup", "restore", "list", "diff"], help="操作")
+    parser.add_argument("action", choices=["backup", "restore", "list", "diff", "prune", "migrate"], help="操作")
     parser.add_argument("--name", "-n", help="备份名称")
+    parser.add_argument("--brief", action="store_true", help="diff 只列出有差异的文件")
+    parser.add_argument("--sections", action="store_true", help="diff 按 markdown 标题分节比较")
+    parser.add_argument("--context", "-U", type=int, default=3, help="diff 上下文行数")
+    parser.add_argument("--merge", action="store_true", help="restore 时三方合并，保留备份之后的修改")
+    parser.add_argument("--base", help="三方合并的基准备份（默认最新备份）")
+    parser.add_argument("--path", "-p", action="append",
+                        help="restore / diff 只处理匹配的文件，如 'workspace/memory/**'（可重复）")
     
     args = parser.parse_args()
     
@@ -150,16 +456,22 @@ def main():
         create_backup(args.name)
     elif args.action == "list":
         list_backups()
+    elif args.action == "prune":
+        prune_backups()
+    elif args.action == "migrate":
+        migrate_legacy()
     elif args.action == "restore":
         if not args.name:
             print("请指定备份名称: --name <名称>")
+        elif args.merge:
+            merge_restore(args.name, args.base, args.path)
         else:
-            restore_backup(args.name)
+            restore_backup(args.name, args.path)
     elif args.action == "diff":
         if not args.name:
             print("请指定备份名称: --name <名称>")
         else:
-            diff_backup(args.name)
+            diff_backup(args.name, args.brief, args.sections, args.context, args.path)
 
 if __name__ == "__main__":
     main()
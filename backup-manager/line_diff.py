@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+行级差异与三方合并
+
+大文件不整体读入内存：每个文件只扫描一遍，记录每行的 8 字节哈希和起始偏移，
+difflib 在哈希列表上做匹配，输出时再按偏移回读需要的行。
+
+- unified_diff：与 difflib.unified_diff 格式一致的差异输出
+- section_diff：按 markdown 标题分节比较，只输出有变化的小节
+- merge3：三方合并（base / 当前 / 备份），双方都改了同一处时写入冲突标记
+"""
+
+import re
+import hashlib
+from array import array
+from difflib import SequenceMatcher
+
+HEADING = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+FENCE = re.compile(rb"^(```|~~~)")
+
+
+def _line_hash(line):
+    # 行尾换行不参与比较，最后一行没有换行时也能与其他版本对齐
+    return int.from_bytes(hashlib.blake2b(line.rstrip(b"\r\n"), digest_size=8).digest(), "little")
+
+
+class LineIndex:
+    """一个文件的行索引：每行的哈希、起始偏移，以及 markdown 标题位置"""
+
+    def __init__(self, fileobj, label):
+        self.f = fileobj
+        self.label = label
+        self.hashes = array("Q")
+        self.offsets = array("Q")
+        self.headings = []  # [(行号, 级别, 标题)]
+        self._scan()
+
+    def _scan(self):
+        self.f.seek(0)
+        offset = 0
+        in_fence = False
+        for i, line in enumerate(iter(self.f.readline, b"")):
+            self.hashes.append(_line_hash(line))
+            self.offsets.append(offset)
+            offset += len(line)
+            if FENCE.match(line):
+                in_fence = not in_fence
+            elif not in_fence:
+                m = HEADING.match(line.rstrip(b"\r\n"))
+                if m:
+                    self.headings.append((i, len(m.group(1)), m.group(2).decode("utf-8", errors="replace")))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lines(self, start, end):
+        """按顺序读出第 start 到 end-1 行（原始字节）"""
+        if start >= end:
+            return
+        self.f.seek(self.offsets[start])
+        for _ in range(start, end):
+            yield self.f.readline()
+
+    def text(self, start, end):
+        for line in self.lines(start, end):
+            yield line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def sections(self):
+        """按标题分节，返回 {节名: (起始行, 结束行)}；节名为各级标题路径，重名时加序号"""
+        bounds = [(0, 0, "（开头）")] + self.headings
+        result = {}
+        path = []
+        for n, (start, level, title) in enumerate(bounds):
+            end = bounds[n + 1][0] if n + 1 < len(bounds) else len(self)
+            if n == 0:
+                key = title
+                if start == end:
+                    continue
+            else:
+                path = [p for p in path if p[0] < level] + [(level, title)]
+                key = " > ".join(f"{'#' * lv} {t}" for lv, t in path)
+            unique, seq = key, 2
+            while unique in result:
+                unique = f"{key} ({seq})"
+                seq += 1
+            result[unique] = (start, end)
+        return result
+
+
+def _range(start, length):
+    # 与 difflib 相同的 hunk 范围格式
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def unified_diff(a, b, n=3, a_range=None, b_range=None):
+    """逐行产出 unified diff；a_range / b_range 限定比较的行区间"""
+    a_start, a_end = a_range or (0, len(a))
+    b_start, b_end = b_range or (0, len(b))
+    matcher = SequenceMatcher(None, a.hashes[a_start:a_end], b.hashes[b_start:b_end], autojunk=False)
+    started = False
+    for group in matcher.get_grouped_opcodes(n):
+        if not started:
+            started = True
+            yield f"--- {a.label}"
+            yield f"+++ {b.label}"
+        first, last = group[0], group[-1]
+        yield (f"@@ -{_range(a_start + first[1], last[2] - first[1])} "
+               f"+{_range(b_start + first[3], last[4] - first[3])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a.text(a_start + i1, a_start + i2):
+                    yield " " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in a.text(a_start + i1, a_start + i2):
+                    yield "-" + line
+            if tag in ("replace", "insert"):
+                for line in b.text(b_start + j1, b_start + j2):
+                    yield "+" + line
+
+
+def section_diff(a, b, n=3):
+    """按 markdown 小节比较，返回 [(节名, 状态, diff 行迭代器)]；状态为 added / removed / changed"""
+    sa, sb = a.sections(), b.sections()
+    result = []
+    for key in list(sa) + [k for k in sb if k not in sa]:
+        if key not in sb:
+            result.append((key, "removed", a.text(*sa[key])))
+        elif key not in sa:
+            result.append((key, "added", b.text(*sb[key])))
+        else:
+            (a1, a2), (b1, b2) = sa[key], sb[key]
+            if a.hashes[a1:a2] != b.hashes[b1:b2]:
+                result.append((key, "changed", unified_diff(a, b, n, sa[key], sb[key])))
+    return result
+
+
+def _sync_regions(base, ours, theirs):
+    """两组匹配块在 base 上的交集：三方内容都相同的区域"""
+    ma = SequenceMatcher(None, base, ours, autojunk=False).get_matching_blocks()
+    mb = SequenceMatcher(None, base, theirs, autojunk=False).get_matching_blocks()
+    ia = ib = 0
+    regions = []
+    while ia < len(ma) and ib < len(mb):
+        a_base, a_match, a_len = ma[ia]
+        b_base, b_match, b_len = mb[ib]
+        start = max(a_base, b_base)
+        end = min(a_base + a_len, b_base + b_len)
+        if start < end:
+            regions.append((start, end, a_match + start - a_base, b_match + start - b_base))
+        if a_base + a_len < b_base + b_len:
+            ia += 1
+        else:
+            ib += 1
+    regions.append((len(base), len(base), len(ours), len(theirs)))
+    return regions
+
+
+def merge3(base, ours, theirs, out):
+    """三方合并写入二进制文件对象 out，返回冲突数"""
+    bh, oh, th = base.hashes, ours.hashes, theirs.hashes
+    conflicts = 0
+    zb = zo = zt = 0
+    for sb, eb, so, st in _sync_regions(bh, oh, th):
+        base_part, ours_part, theirs_part = bh[zb:sb], oh[zo:so], th[zt:st]
+        if ours_part == base_part:
+            # 只有备份一方改动
+            out.writelines(theirs.lines(zt, st))
+        elif theirs_part == base_part or ours_part == theirs_part:
+            # 只有当前一方改动，或双方改得一样
+            out.writelines(ours.lines(zo, so))
+        else:
+            conflicts += 1
+            out.write(f"<<<<<<< {ours.label}\n".encode())
+            out.writelines(_terminated(ours.lines(zo, so)))
+            out.write(f"||||||| {base.label}\n".encode())
+            out.writelines(_terminated(base.lines(zb, sb)))
+            out.write(b"=======\n")
+            out.writelines(_terminated(theirs.lines(zt, st)))
+            out.write(f">>>>>>> {theirs.label}\n".encode())
+        # 三方相同的区域
+        out.writelines(ours.lines(so, so + eb - sb))
+        zb, zo, zt = eb, so + eb - sb, st + eb - sb
+    return conflicts
+
+
+def _terminated(lines):
+    """冲突块内的行补齐换行，保证标记独占一行"""
+    for line in lines:
+        yield line if line.endswith(b"\n") else line + b"\n"
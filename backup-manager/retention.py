@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+GFS 备份保留策略
+
+- keep_last：最近 N 份无条件保留
+- hourly / daily / weekly：最近 N 个小时 / 天 / 周，每个时间段保留该时段最新的一份
+- 手动命名（pinned）的备份不参与清理
+"""
+
+from datetime import datetime
+
+DEFAULT_RETENTION = {
+    "keep_last": 10,
+    "hourly": 24,
+    "daily": 7,
+    "weekly": 4,
+}
+
+BUCKETS = {
+    "hourly": lambda t: t.strftime("%Y-%m-%d %H"),
+    "daily": lambda t: t.strftime("%Y-%m-%d"),
+    "weekly": lambda t: "%d-W%02d" % t.isocalendar()[:2],
+}
+
+
+def select_retained(snapshots, policy=None):
+    """snapshots 为 {名称: {"created", "pinned"}}，返回需要保留的名称集合"""
+    policy = {**DEFAULT_RETENTION, **(policy or {})}
+    ordered = sorted(snapshots, key=lambda n: snapshots[n]["created"], reverse=True)
+
+    keep = {n for n in ordered if snapshots[n].get("pinned")}
+    keep.update(ordered[:max(0, policy["keep_last"])])
+
+    for kind, bucket_of in BUCKETS.items():
+        limit = policy.get(kind, 0)
+        seen = set()
+        for name in ordered:
+            if len(seen) >= limit:
+                break
+            bucket = bucket_of(datetime.fromisoformat(snapshots[name]["created"]))
+            if bucket not in seen:
+                # 从新到旧遍历，每个时段第一次遇到的就是该时段最新的一份
+                seen.add(bucket)
+                keep.add(name)
+    return keep
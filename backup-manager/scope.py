@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+备份范围
+
+config.json 的 sources 列出要备份的目录，每个目录用 include / exclude 通配规则筛选文件：
+- `*` 不跨目录，`**` 匹配任意层级目录，`?` 匹配单个字符
+- 目录命中 exclude 时整棵子树不再遍历
+- 只进入 include 规则可能匹配到的目录：如 `["*.md", "memory/**"]` 只看根目录和 memory/ 下
+遍历使用 os.scandir，一次系统调用拿到目录项类型和 stat，不跟随符号链接
+"""
+
+import os
+import re
+import stat
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=None)
+def compile_glob(pattern):
+    """把通配规则转换为正则（匹配相对路径，分隔符为 /）"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def matches(path, patterns):
+    return any(compile_glob(p).match(path) for p in patterns)
+
+
+def split_pattern(pattern):
+    """拆成 (不含通配符的前导目录, 其余各段)，如 memory/**/*.md → (["memory"], ["**", "*.md"])"""
+    parts = pattern.split("/")
+    literal = 0
+    while literal < len(parts) - 1 and not any(c in parts[literal] for c in "*?"):
+        literal += 1
+    return parts[:literal], parts[literal:]
+
+
+class Source:
+    def __init__(self, root, include=("**",), exclude=(), skip=()):
+        self.root = Path(root)
+        self.include = list(include)
+        self.exclude = list(exclude)
+        # 不进入的目录（绝对路径），如备份目录本身
+        self.skip = {str(Path(p)) for p in skip}
+        # 目录剪枝：去掉 exclude 规则末尾的 /** 后匹配目录本身
+        self.dir_exclude = [p[:-3] for p in self.exclude if p.endswith("/**")]
+        # 目录剪枝：只进入 include 规则的前导目录及其下可能匹配的层级
+        self.dir_rules = [split_pattern(p) for p in self.include]
+
+    def may_descend(self, rel):
+        """rel 目录下是否可能有 include 规则匹配的文件"""
+        parts = rel.split("/")
+        for prefix, rest in self.dir_rules:
+            if len(parts) <= len(prefix):
+                # 还在前导目录的路径上
+                if parts == prefix[:len(parts)]:
+                    return True
+            elif parts[:len(prefix)] == prefix:
+                # 已在前导目录之下：有 ** 时任意层级，否则最多到规则中的目录层数
+                if "**" in "/".join(rest) or len(parts) - len(prefix) <= len(rest) - 1:
+                    return True
+        return False
+
+    def walk(self):
+        """遍历匹配的普通文件，产出 (相对 root 的路径, 绝对路径, stat)"""
+        stack = [(str(self.root), "")]
+        while stack:
+            directory, prefix = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{prefix}{entry.name}"
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    if (entry.path not in self.skip and not matches(rel, self.dir_exclude)
+                            and self.may_descend(rel)):
+                        stack.append((entry.path, rel + "/"))
+                elif stat.S_ISREG(st.st_mode):
+                    if matches(rel, self.include) and not matches(rel, self.exclude):
+                        yield rel, entry.path, st
+
+
+def load_sources(config, base, default_files, skip=()):
+    """按配置生成 Source 列表；未配置 sources 时只备份 workspace 下的核心文件"""
+    entries = config.get("sources") or [{"root": "workspace", "include": default_files}]
+    sources = []
+    for entry in entries:
+        root = Path(os.path.expanduser(entry["root"]))
+        if not root.is_absolute():
+            root = base / root
+        sources.append(Source(root, entry.get("include", ["**"]), entry.get("exclude", []), skip))
+    return sources
+
+
+def fast_copy(src, fdst):
+    """把 src 的内容复制到已打开的二进制文件 fdst：优先 copy_file_range
+    （同一文件系统内可走 reflink / 服务端复制），不支持时退回 sendfile，再不行用普通读写"""
+    with open(src, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        fdst.flush()
+        copied = 0
+        for method in ("copy_file_range", "sendfile"):
+            func = getattr(os, method, None)
+            if func is None:
+                continue
+            try:
+                while copied < size:
+                    if method == "copy_file_range":
+                        n = func(fsrc.fileno(), fdst.fileno(), size - copied)
+                    else:
+                        n = func(fdst.fileno(), fsrc.fileno(), copied, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+                return copied
+            except OSError:
+                # 跨文件系统或不支持的文件类型：从头用下一种方式复制
+                copied = 0
+                fdst.seek(0)
+                fdst.truncate()
+                fsrc.seek(0)
+        while True:
+            data = fsrc.read(1024 * 1024)
+            if not data:
+                return copied
+            fdst.write(data)
+            copied += len(data)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+内容寻址快照存储
+
+- 文件按固定大小分块，每块以 SHA-256 标识，相同内容只存一份
+- 每次备份新增的分块用 xz 压缩后追加到一个 pack 文件（packs/），
+  pack 末尾带索引，可直接定位读取单个分块
+- 每次备份只是 snapshots/ 下的一个清单（文件 → 分块哈希列表），几 KB 大小
+- catalog.json 汇总所有备份，list 只读这一个文件
+- 早期版本的散列对象（objects/）仍可读取
+"""
+
+import io
+import os
+import json
+import lzma
+import struct
+import hashlib
+import threading
+import contextlib
+from datetime import datetime
+from pathlib import Path
+
+# 分块大小：MEMORY.md 这类追加写的文件只有最后一块会变化
+CHUNK_SIZE = 1024 * 1024
+
+PACK_MAGIC = b"OCPK\x01"
+# 文件尾：索引偏移、索引长度、魔数
+PACK_FOOTER = struct.Struct("<QI4s")
+FOOTER_MAGIC = b"OCPI"
+XZ_PRESET = 6
+
+# 有效分块占比低于该值的 pack 在清理时重新打包
+REPACK_RATIO = 0.5
+
+# 存储自身使用的目录，其余子目录是旧格式备份
+STORE_DIRS = ("objects", "packs", "snapshots")
+
+
+class PackWriter:
+    """写一个新的 pack：分块逐个压缩追加，最后写入索引和文件尾"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.directory / f".pack-{os.getpid()}-{id(self)}.tmp"
+        self.f = open(self.tmp, "wb")
+        self.f.write(PACK_MAGIC)
+        self.index = {}  # 哈希 -> [偏移, 压缩后长度, 原始长度]
+        self._lock = threading.Lock()
+
+    def add(self, digest, data):
+        # 压缩不持锁（lzma 会释放 GIL），多个线程可以同时压缩
+        self.add_raw(digest, lzma.compress(data, preset=XZ_PRESET), len(data))
+        return len(data)
+
+    def add_raw(self, digest, blob, size):
+        """写入已压缩的分块（重新打包时直接搬运，不解压）"""
+        with self._lock:
+            self.index[digest] = [self.f.tell(), len(blob), size]
+            self.f.write(blob)
+
+    def finish(self):
+        """写入索引，落盘后改名为正式 pack；没有内容时返回 None"""
+        if not self.index:
+            self.abort()
+            return None
+        data = json.dumps(self.index, separators=(",", ":")).encode()
+        offset = self.f.tell()
+        self.f.write(data)
+        self.f.write(PACK_FOOTER.pack(offset, len(data), FOOTER_MAGIC))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        path = self.directory / f"pack-{hashlib.sha1(data).hexdigest()[:16]}.pack"
+        os.replace(self.tmp, path)
+        return path
+
+    def abort(self):
+        self.f.close()
+        with contextlib.suppress(OSError):
+            os.unlink(self.tmp)
+
+
+class Pack:
+    """只读打开一个 pack，按哈希随机读取分块"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            f.seek(-PACK_FOOTER.size, os.SEEK_END)
+            offset, length, magic = PACK_FOOTER.unpack(f.read(PACK_FOOTER.size))
+            if magic != FOOTER_MAGIC:
+                raise ValueError(f"pack 文件损坏: {self.path.name}")
+            f.seek(offset)
+            self.index = json.loads(f.read(length))
+
+    def read_raw(self, digest):
+        offset, length, _ = self.index[digest]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def read(self, digest):
+        return lzma.decompress(self.read_raw(digest))
+
+
+class SnapshotStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.packs = self.root / "packs"
+        self.snapshots = self.root / "snapshots"
+        self.catalog_path = self.root / "catalog.json"
+        self._pack_map = None  # 哈希 -> Pack
+        self._writer = None
+        # 多线程写入时保证同一分块只写一次
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    # ---------- 分块对象 ----------
+
+    def object_path(self, digest):
+        return self.objects / digest[:2] / digest[2:]
+
+    def _packs(self):
+        if self._pack_map is None:
+            self._pack_map = {}
+            for path in sorted(self.packs.glob("pack-*.pack")) if self.packs.exists() else []:
+                try:
+                    pack = Pack(path)
+                except (OSError, ValueError):
+                    continue
+                for digest in pack.index:
+                    self._pack_map[digest] = pack
+        return self._pack_map
+
+    def has_object(self, digest):
+        if self._writer and digest in self._writer.index:
+            return True
+        with self._lock:
+            packs = self._packs()
+        return digest in packs or self.object_path(digest).exists()
+
+    @contextlib.contextmanager
+    def packing(self):
+        """在此期间新写入的分块全部进入同一个 pack"""
+        self._writer = PackWriter(self.packs)
+        try:
+            yield
+        except BaseException:
+            self._writer.abort()
+            raise
+        else:
+            path = self._writer.finish()
+            if path and self._pack_map is not None:
+                pack = Pack(path)
+                for digest in pack.index:
+                    self._pack_map[digest] = pack
+        finally:
+            self._writer = None
+
+    def put_chunk(self, data):
+        """写入一个分块，已存在则跳过；返回 (哈希, 是否新写入)。可在多个线程中同时调用"""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.has_object(digest):
+            return digest, False
+        with self._lock:
+            if digest in self._pending:
+                return digest, False
+            self._pending.add(digest)
+        try:
+            if self._writer:
+                self._writer.add(digest, data)
+                return digest, True
+            path = self.object_path(digest)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            return digest, True
+        finally:
+            with self._lock:
+                self._pending.discard(digest)
+
+    def read_chunk(self, digest):
+        with self._lock:
+            pack = self._packs().get(digest)
+        if pack:
+            return pack.read(digest)
+        with open(self.object_path(digest), "rb") as f:
+            return f.read()
+
+    def read_chunks(self, chunks):
+        """按顺序读出分块内容"""
+        for digest in chunks:
+            yield self.read_chunk(digest)
+
+    def open_entry(self, entry):
+        """以只读、可 seek 的二进制文件对象打开清单中的文件"""
+        return io.BufferedReader(ChunkedReader(self, entry))
+
+    def store_file(self, path):
+        """分块存储一个文件，返回 (清单条目, 新写入的字节数)"""
+        st = os.stat(path)
+        whole = hashlib.sha256()
+        chunks = []
+        written = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                whole.update(data)
+                digest, new = self.put_chunk(data)
+                chunks.append(digest)
+                if new:
+                    written += len(data)
+        entry = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "mode": st.st_mode & 0o7777,
+            "hash": whole.hexdigest(),
+            "chunks": chunks,
+        }
+        return entry, written
+
+    def write_entry(self, entry, out):
+        """把清单条目的内容写入已打开的二进制文件"""
+        for data in self.read_chunks(entry["chunks"]):
+            out.write(data)
+
+    # ---------- 快照清单与目录 ----------
+
+    def manifest_path(self, name):
+        return self.snapshots / f"{name}.json"
+
+    def load_manifest(self, name):
+        try:
+            return json.loads(self.manifest_path(name).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def catalog(self):
+        """{备份名称: {"created", "count", "files", "size", "pinned", "legacy"}}；目录文件缺失时从清单重建"""
+        try:
+            return json.loads(self.catalog_path.read_text())["snapshots"]
+        except (OSError, ValueError, KeyError):
+            pass
+        snapshots = {}
+        for path in self.snapshots.glob("*.json") if self.snapshots.exists() else []:
+            try:
+                manifest = json.loads(path.read_text())
+            except ValueError:
+                continue
+            snapshots[manifest["name"]] = catalog_entry(manifest)
+        # 旧格式的完整复制目录也登记进来（只在重建时扫描一次）
+        for path in self.root.iterdir() if self.root.exists() else []:
+            if not path.is_dir() or path.name in STORE_DIRS or path.name in snapshots:
+                continue
+            try:
+                meta = json.loads((path / "meta.json").read_text())
+                created, files = meta["created"], meta["files"]
+            except (OSError, ValueError, KeyError):
+                created, files = datetime.fromtimestamp(path.stat().st_mtime).isoformat(), []
+            snapshots[path.name] = {"created": created, "files": files, "pinned": True, "legacy": True}
+        self.save_catalog(snapshots)
+        return snapshots
+
+    def save_catalog(self, snapshots):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.catalog_path.with_name(f".{self.catalog_path.name}.tmp")
+        tmp.write_text(json.dumps({"version": 1, "snapshots": snapshots}, ensure_ascii=False, indent=2))
+        os.replace(tmp, self.catalog_path)
+
+    def save_manifest(self, manifest):
+        self.snapshots.mkdir(parents=True, exist_ok=True)
+        path = self.manifest_path(manifest["name"])
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+        os.replace(tmp, path)
+        snapshots = self.catalog()
+        snapshots[manifest["name"]] = catalog_entry(manifest)
+        self.save_catalog(snapshots)
+
+    def delete_manifests(self, names):
+        snapshots = self.catalog()
+        for name in names:
+            snapshots.pop(name, None)
+            with contextlib.suppress(OSError):
+                os.unlink(self.manifest_path(name))
+        self.save_catalog(snapshots)
+
+    def latest(self):
+        """最新一份快照清单"""
+        snapshots = {k: v for k, v in self.catalog().items() if not v.get("legacy")}
+        if not snapshots:
+            return None
+        return self.load_manifest(max(snapshots, key=lambda k: snapshots[k]["created"]))
+
+    # ---------- 清理 ----------
+
+    def gc(self):
+        """删除不再被任何清单引用的分块；有效占比低的 pack 重新打包，返回释放的字节数"""
+        live = set()
+        for name, info in self.catalog().items():
+            if info.get("legacy"):
+                continue
+            manifest = self.load_manifest(name)
+            for entry in (manifest or {}).get("files", {}).values():
+                live.update(entry["chunks"])
+
+        freed = 0
+        packs = {pack.path: pack for pack in self._packs().values()}
+        for path, pack in packs.items():
+            keep = [d for d in pack.index if d in live]
+            if len(keep) >= len(pack.index) * REPACK_RATIO:
+                continue
+            size = path.stat().st_size
+            if keep:
+                writer = PackWriter(self.packs)
+                for digest in keep:
+                    writer.add_raw(digest, pack.read_raw(digest), pack.index[digest][2])
+                writer.finish()
+            os.unlink(path)
+            freed += size
+
+        if self.objects.exists():
+            for path in self.objects.glob("*/*"):
+                if path.parent.name + path.name not in live:
+                    freed += path.stat().st_size
+                    path.unlink()
+        self._pack_map = None
+        return freed
+
+
+# 文件数不超过该值时目录中记录文件名，否则只记录数量
+CATALOG_MAX_NAMES = 8
+
+
+def catalog_entry(manifest):
+    files = manifest["files"]
+    entry = {
+        "created": manifest["created"],
+        "count": len(files),
+        "size": sum(e["size"] for e in files.values()),
+        "pinned": manifest.get("pinned", False),
+    }
+    if len(files) <= CATALOG_MAX_NAMES:
+        entry["files"] = list(files)
+    return entry
+
+
+class ChunkedReader(io.RawIOBase):
+    """把分块列表拼成一个可随机读取的文件，只缓存当前所在的分块"""
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.chunks = entry["chunks"]
+        self.size = entry["size"]
+        self.pos = 0
+        self._cached = (None, b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readinto(self, buffer):
+        if self.pos >= self.size:
+            return 0
+        index, start = divmod(self.pos, CHUNK_SIZE)
+        if self._cached[0] != index:
+            self._cached = (index, self.store.read_chunk(self.chunks[index]))
+        data = self._cached[1][start:start + len(buffer)]
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+def file_hash(path):
+    """流式计算文件 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(data)
+    return h.hexdigest()
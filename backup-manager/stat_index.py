@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+文件状态索引
+
+记录每个文件的 (size, mtime_ns, inode) 和内容哈希、分块列表，持久化到 index.json。
+备份和比较时先比对 stat，只有元数据变化的文件才需要重新读取和计算哈希。
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+
+from snapshot_store import file_hash
+
+# 修改时间距今不足该值的文件不写入索引：同一时间粒度内可能还有写入，
+# 下次仍需重新计算哈希（与 git 处理 racily clean 的方式相同）
+RACY_NS = 2 * 10**9
+
+
+class StatIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+        try:
+            self.entries = json.loads(self.path.read_text()).get("files", {})
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(path):
+        return str(Path(path).absolute())
+
+    def lookup(self, path, st=None):
+        """stat 与索引一致时返回索引条目，否则返回 None"""
+        entry = self.entries.get(self._key(path))
+        if entry is None:
+            return None
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+        if (entry["size"], entry["mtime_ns"], entry["ino"]) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None
+        return entry
+
+    def update(self, path, st, digest, chunks=None):
+        """记录文件的 stat 和哈希"""
+        key = self._key(path)
+        if time.time_ns() - st.st_mtime_ns < RACY_NS:
+            if self.entries.pop(key, None) is not None:
+                self.dirty = True
+            return
+        self.entries[key] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "ino": st.st_ino,
+            "hash": digest,
+            "chunks": chunks,
+        }
+        self.dirty = True
+
+    def hash(self, path):
+        """文件内容哈希：stat 未变化时直接用索引，否则重新计算并更新索引"""
+        st = os.stat(path)
+        entry = self.lookup(path, st)
+        if entry:
+            return entry["hash"]
+        digest = file_hash(path)
+        previous = self.entries.get(self._key(path))
+        # 内容没变（例如只是 touch）时保留已知的分块列表
+        chunks = previous["chunks"] if previous and previous["hash"] == digest else None
+        self.update(path, st, digest, chunks)
+        return digest
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        tmp.write_text(json.dumps({"version": 1, "files": self.entries}, ensure_ascii=False))
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -15,6 +15,8 @@ import json
 import subprocess
 from pathlib import Path
 
+from skill_inventory import SkillInventory
+
 # 配置
 SKILLS_DIR = Path("~/.openclaw/skills").expanduser()
 GITHUB_REPO = "jie-2001/openclaw-skills"
@@ -60,8 +62,8 @@ def check_local_skills():
     """检查本地 Skill 目录"""
     print("\n📂 检查本地 Skills...")
     
-    skills = [d for d in SKILLS_DIR.iterdir() 
-             if d.is_dir() and not d.name.startswith('.')]
+    # 目录扫描结果来自共享的 Skill 清单，未变化的 Skill 不重新读取
+    skills = [Path(s["path"]) for s in SkillInventory(SKILLS_DIR).refresh()]
     
     print(f"本地 Skill 数量: {len(skills)}")
     for s in skills:
@@ -5,11 +5,15 @@
 """
 
 import os
-import json
+import sys
 import subprocess
 from pathlib import Path
 from datetime import datetime
 
+# 共享的 Skill 清单在 skills 根目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from skill_inventory import SkillInventory
+
 # 配置
 SKILLS_DIR = Path.home() / ".openclaw/skills"
 WORKSPACE_DIR = Path.home() / ".openclaw/workspace"
@@ -18,44 +22,23 @@ def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 def get_local_skills():
-    """获取本地 Skills"""
+    """获取本地 Skills（来自共享的 Skill 清单，只重新读取有变化的 Skill；
+    SKILL.md 只解析头部，按文件 mtime 缓存，版本以 metadata.json 的 openclaw.version 为准）"""
     skills = []
-    for d in SKILLS_DIR.iterdir():
-        if d.is_dir() and not d.name.startswith('.') and not d.name.startswith('skill-'):
-            skill_file = d / "SKILL.md"
-            metadata_file = d / "metadata.json"
-            
-            version = "未知"
-            description = ""
-            
-            # 读取版本
-            if skill_file.exists():
-                try:
-                    with open(skill_file) as f:
-                        for line in f:
-                            if 'version:' in line.lower():
-                                version = line.split(':')[-1].strip()
-                                break
-                            if 'description:' in line.lower():
-                                description = line.split(':', 1)[-1].strip()
-                except:
-                    pass
-            
-            # 读取 metadata
-            if metadata_file.exists():
-                try:
-                    with open(metadata_file) as f:
-                        meta = json.load(f)
-                        version = meta.get('openclaw', {}).get('version', version)
-                except:
-                    pass
-            
-            skills.append({
-                "name": d.name,
-                "path": str(d),
-                "version": version,
-                "description": description
-            })
+    inventory = SkillInventory(SKILLS_DIR)
+    for s in inventory.refresh():
+        if s["name"].startswith('skill-'):
+            continue
+        skills.append({
+            "name": s["name"],
+            "path": s["path"],
+            "version": s["version"] or "未知",
+            "description": s["description"],
+            "version_conflict": s["version_conflict"],
+            "frontmatter_error": s["frontmatter_error"]
+        })
+    if inventory.frontmatter.parsed:
+        log(f"   重新解析 {inventory.frontmatter.parsed} 个 SKILL.md 头部")
     
     return skills
 
@@ -78,6 +61,16 @@ def generate_report(skills):
         desc = s.get('description', '')[:30]
         report += f"| {s['name']} | {s['version']} | {desc} |\n"
     
+    conflicts = [s for s in skills if s.get('version_conflict')]
+    errors = [s for s in skills if s.get('frontmatter_error')]
+    if conflicts or errors:
+        report += f"\n## ⚠️ 需要检查\n\n"
+        for s in conflicts:
+            sources = "，".join(f"{k}: {v}" for k, v in s['version_conflict'].items())
+            report += f"- {s['name']} 版本不一致（{sources}）\n"
+        for s in errors:
+            report += f"- {s['name']} SKILL.md 头部解析失败: {s['frontmatter_error']}\n"
+    
     return report
 
 def send_to_feishu(message):
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+SKILL.md 头部（YAML frontmatter）解析
+
+- 只读取文件开头两个 --- 之间的部分，读到结束的 --- 就停止，不读正文
+- 支持 Skill 中实际用到的 YAML 子集：嵌套映射、列表、引号字符串、
+  块标量（| 和 >）、多行普通字符串、行内 {...} / [...]（含 JSON 写法）、# 注释
+- FrontmatterCache 按文件 (大小, mtime, inode) 缓存解析结果，文件没变就不再打开
+- skill_metadata 把头部的 version 与 metadata.json 的 openclaw.version 对照，
+  以 metadata.json 为准，不一致时标记出来
+
+用法（在 Skill 目录中）：
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from frontmatter import FrontmatterCache, skill_metadata
+"""
+
+import os
+import re
+import sys
+import json
+from pathlib import Path
+
+from atomic_io import atomic_write
+
+CACHE_FILE = Path("~/.openclaw/cache/frontmatter.json").expanduser()
+CACHE_VERSION = 1
+
+# 头部超过该行数仍没有结束的 --- 时视为没有头部，避免把整篇正文读进来
+MAX_HEADER_LINES = 500
+
+_INT = re.compile(r"[-+]?\d+$")
+_FLOAT = re.compile(r"[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$")
+
+
+class FrontmatterError(ValueError):
+    pass
+
+
+# ---------- 读取头部 ----------
+
+def read_header(path):
+    """返回头部各行（不含两个 ---），没有头部时返回 None"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        first = f.readline().lstrip("﻿")
+        if first.rstrip() != "---":
+            return None
+        lines = []
+        for line in f:
+            if line.rstrip() in ("---", "..."):
+                return lines
+            if len(lines) >= MAX_HEADER_LINES:
+                break
+            lines.append(line.rstrip("\r\n"))
+    return None
+
+
+# ---------- 标量与行内集合 ----------
+
+def _strip_comment(text):
+    """去掉引号外的 # 注释（# 前必须是空白）"""
+    quote = None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "#" and (i == 0 or text[i - 1] in " \t"):
+            return text[:i].rstrip()
+    return text.rstrip()
+
+
+def _plain(text):
+    """普通（不带引号）标量的类型转换"""
+    low = text.lower()
+    if low in ("", "~", "null"):
+        return None
+    if low in ("true", "yes", "on"):
+        return True
+    if low in ("false", "no", "off"):
+        return False
+    if _INT.match(text):
+        return int(text)
+    if _FLOAT.match(text):
+        return float(text)
+    return text
+
+
+class _Flow:
+    """行内 {...} / [...]，值可以不带引号（YAML 写法）"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def parse(self):
+        value = self._value()
+        self._space()
+        if self.pos != len(self.text):
+            raise FrontmatterError(f"行内集合后有多余内容: {self.text}")
+        return value
+
+    def _space(self):
+        while self.pos < len(self.text) and self.text[self.pos] in " \t":
+            self.pos += 1
+
+    def _value(self):
+        self._space()
+        ch = self.text[self.pos:self.pos + 1]
+        if ch == "{":
+            return self._collection("}", {})
+        if ch == "[":
+            return self._collection("]", [])
+        if ch in ("\"", "'"):
+            return self._quoted()
+        start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos] not in ",]}":
+            if self.text[self.pos] == ":" and self.text[self.pos + 1:self.pos + 2] in (" ", ""):
+                break
+            self.pos += 1
+        return _plain(self.text[start:self.pos].strip())
+
+    def _quoted(self):
+        text, value = _split_quoted(self.text[self.pos:])
+        self.pos = len(self.text) - len(text)
+        return value
+
+    def _collection(self, end, result):
+        self.pos += 1
+        while True:
+            self._space()
+            if self.text[self.pos:self.pos + 1] == end:
+                self.pos += 1
+                return result
+            item = self._value()
+            if isinstance(result, dict):
+                self._space()
+                if self.text[self.pos:self.pos + 1] != ":":
+                    raise FrontmatterError(f"行内映射缺少冒号: {self.text}")
+                self.pos += 1
+                result[str(item)] = self._value()
+            else:
+                result.append(item)
+            self._space()
+            ch = self.text[self.pos:self.pos + 1]
+            if ch == ",":
+                self.pos += 1
+            elif ch != end:
+                raise FrontmatterError(f"行内集合未结束: {self.text}")
+
+
+def _split_quoted(text):
+    """解析开头的引号字符串，返回 (剩余文本, 值)"""
+    quote = text[0]
+    i = 1
+    while i < len(text):
+        if quote == "\"" and text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == quote:
+            if quote == "'" and text[i + 1:i + 2] == "'":
+                i += 2
+                continue
+            break
+        i += 1
+    else:
+        raise FrontmatterError(f"引号未闭合: {text}")
+    raw = text[1:i]
+    if quote == "\"":
+        try:
+            value = json.loads(f"\"{raw}\"")
+        except ValueError:
+            value = raw
+    else:
+        value = raw.replace("''", "'")
+    return text[i + 1:], value
+
+
+def parse_scalar(text):
+    """一行中冒号后面的值"""
+    text = _strip_comment(text.strip())
+    if not text:
+        return None
+    if text[0] in "{[":
+        try:
+            return json.loads(text)
+        except ValueError:
+            return _Flow(text).parse()
+    if text[0] in "\"'":
+        rest, value = _split_quoted(text)
+        if rest.strip():
+            raise FrontmatterError(f"引号后有多余内容: {text}")
+        return value
+    return _plain(text)
+
+
+# ---------- 块结构 ----------
+
+def _indent(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def _blank(line):
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+
+def _is_item(text):
+    return text == "-" or text.startswith("- ")
+
+
+def _split_key(text):
+    """'key: value' 拆成 (key, value)；不是映射行时返回 None"""
+    if text[0] in "\"'":
+        rest, key = _split_quoted(text)
+        rest = rest.lstrip()
+        if not rest.startswith(":"):
+            return None
+        return str(key), rest[1:]
+    match = re.match(r"([^:#{}\[\],]*[^\s:#{}\[\],])\s*:(\s|$)", text)
+    if not match:
+        return None
+    return match.group(1), text[match.end(1):].lstrip()[1:]
+
+
+class _Parser:
+    def __init__(self, lines):
+        self.lines = [line.replace("\t", "  ") for line in lines]
+        self.pos = 0
+
+    def _next(self):
+        """跳过空行和注释，返回下一行的缩进，没有时返回 -1"""
+        while self.pos < len(self.lines) and _blank(self.lines[self.pos]):
+            self.pos += 1
+        return _indent(self.lines[self.pos]) if self.pos < len(self.lines) else -1
+
+    def parse(self):
+        if self._next() < 0:
+            return {}
+        value = self._block(self._next())
+        if self._next() >= 0:
+            raise FrontmatterError(f"无法解析的行: {self.lines[self.pos].strip()}")
+        return value
+
+    def _block(self, indent):
+        text = self.lines[self.pos].strip()
+        if _is_item(text):
+            return self._sequence(indent)
+        if _split_key(text) is None:
+            self.pos += 1
+            return self._multiline(parse_scalar(text), indent - 1)
+        return self._mapping(indent)
+
+    def _mapping(self, indent):
+        result = {}
+        while self._next() == indent:
+            text = self.lines[self.pos].strip()
+            if _is_item(text):
+                break
+            pair = _split_key(text)
+            if pair is None:
+                raise FrontmatterError(f"无法解析的行: {text}")
+            key, rest = pair
+            self.pos += 1
+            result[key] = self._value(rest, indent, allow_item=True)
+        return result
+
+    def _sequence(self, indent):
+        result = []
+        while self._next() == indent:
+            text = self.lines[self.pos].strip()
+            if not _is_item(text):
+                break
+            content = text[1:].lstrip()
+            if content and not content.startswith("#") and (
+                    _is_item(content) or _split_key(content) is not None):
+                # "- key: value" / "- - x"：把本行改写为更深一层的块继续解析
+                child = indent + len(text) - len(content)
+                self.lines[self.pos] = " " * child + content
+                result.append(self._block(child))
+                continue
+            self.pos += 1
+            result.append(self._value(content, indent, allow_item=False))
+        return result
+
+    def _value(self, rest, indent, allow_item):
+        """键或列表项后面的值：行内标量、块标量，或下面更深缩进的块"""
+        stripped = _strip_comment(rest.strip())
+        if stripped[:1] in ("|", ">"):
+            return self._block_scalar(stripped, indent)
+        if stripped:
+            value = parse_scalar(stripped)
+            if isinstance(value, str) and stripped[0] not in "\"'{[":
+                value = self._multiline(value, indent)
+            return value
+        child = self._next()
+        if child > indent:
+            return self._block(child)
+        if allow_item and child == indent and _is_item(self.lines[self.pos].strip()):
+            # 列表项与上级键同一缩进（常见写法）
+            return self._sequence(indent)
+        return None
+
+    def _multiline(self, value, indent):
+        """普通字符串延续到更深缩进的后续行，按空格连接"""
+        parts = [value]
+        while self.pos < len(self.lines):
+            line = self.lines[self.pos]
+            if not line.strip():
+                parts.append("\n")
+            elif _indent(line) > indent and not line.lstrip().startswith("#"):
+                parts.append(line.strip())
+            else:
+                break
+            self.pos += 1
+        if len(parts) == 1:
+            return value
+        text = ""
+        for part in parts:
+            if part == "\n":
+                text = text.rstrip(" ") + "\n"
+            else:
+                text += part if not text or text.endswith("\n") else " " + part
+        return text.strip()
+
+    def _block_scalar(self, header, indent):
+        """| 保留换行，> 折叠为空格；- 去掉末尾换行，+ 全部保留"""
+        style, chomp = header[0], ""
+        explicit = None
+        for ch in header[1:]:
+            if ch in "+-":
+                chomp = ch
+            elif ch.isdigit():
+                explicit = int(ch)
+        lines = []
+        block_indent = indent + explicit if explicit else None
+        while self.pos < len(self.lines):
+            line = self.lines[self.pos]
+            if line.strip():
+                if block_indent is None:
+                    block_indent = _indent(line)
+                if _indent(line) < block_indent or block_indent <= indent:
+                    break
+                lines.append(line[block_indent:])
+            else:
+                lines.append("")
+            self.pos += 1
+
+        trailing = 0
+        while lines and not lines[-1]:
+            lines.pop()
+            trailing += 1
+        if style == "|":
+            text = "\n".join(lines)
+        else:
+            text, prev = "", None
+            for line in lines:
+                if prev is None:
+                    text = line
+                elif not line:
+                    text += "\n"
+                elif not prev:
+                    text += line
+                elif line.startswith(" ") or prev.startswith(" "):
+                    # 更深缩进的行保留换行
+                    text += "\n" + line
+                else:
+                    text += " " + line
+                prev = line
+        if not lines:
+            return ""
+        if chomp == "-":
+            return text
+        if chomp == "+":
+            return text + "\n" * (trailing + 1)
+        return text + "\n"
+
+
+def parse_frontmatter(lines):
+    """解析头部各行，返回字典"""
+    value = _Parser(lines).parse()
+    if not isinstance(value, dict):
+        raise FrontmatterError("头部不是映射")
+    return value
+
+
+def load_frontmatter(path):
+    """读取并解析 SKILL.md 头部；没有头部返回 {}，格式错误时抛出 FrontmatterError"""
+    lines = read_header(path)
+    return parse_frontmatter(lines) if lines else {}
+
+
+# ---------- 缓存 ----------
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class FrontmatterCache:
+    """按文件 (大小, mtime, inode) 缓存解析结果；path 为 None 时只在内存中缓存"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path) if path else None
+        self.entries = {}
+        self.dirty = False
+        self.parsed = 0
+        if self.path:
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["entries"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def get(self, path):
+        """返回 {"data": 头部字典, "error": 错误信息或 None}；文件不存在时返回 None"""
+        path = str(path)
+        key = _stat_key(path)
+        if key is None:
+            if self.entries.pop(path, None) is not None:
+                self.dirty = True
+            return None
+        cached = self.entries.get(path)
+        if cached and cached["stat"] == key:
+            return cached
+        try:
+            entry = {"stat": key, "data": load_frontmatter(path), "error": None}
+        except FrontmatterError as e:
+            entry = {"stat": key, "data": {}, "error": str(e)}
+        except OSError:
+            return None
+        self.parsed += 1
+        self.entries[path] = entry
+        self.dirty = True
+        return entry
+
+    def prune(self, keep):
+        """去掉不在 keep 中的文件记录"""
+        keep = {str(p) for p in keep}
+        for path in list(self.entries):
+            if path not in keep:
+                del self.entries[path]
+                self.dirty = True
+
+    def save(self):
+        if self.path and self.dirty:
+            data = {"version": CACHE_VERSION, "entries": self.entries}
+            atomic_write(self.path, json.dumps(data, ensure_ascii=False), lock=False)
+            self.dirty = False
+
+
+# ---------- 版本核对 ----------
+
+def _openclaw_version(meta):
+    if not isinstance(meta, dict):
+        return None
+    openclaw = meta.get("openclaw")
+    if isinstance(openclaw, dict) and openclaw.get("version") is not None:
+        return str(openclaw["version"])
+    return None
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def skill_metadata(skill_dir, cache=None, metadata=None):
+    """汇总一个 Skill 的名称、版本、描述
+
+    版本优先级：metadata.json 的 openclaw.version > 头部 version > 头部 metadata.openclaw.version；
+    各来源不一致时 version_conflict 列出所有来源的值。metadata 可传入已读取的 metadata.json 内容。
+    """
+    skill_dir = Path(skill_dir)
+    skill_md = skill_dir / "SKILL.md"
+    entry = (cache or FrontmatterCache(None)).get(skill_md)
+    front = entry["data"] if entry else {}
+    if metadata is None:
+        try:
+            metadata = json.loads((skill_dir / "metadata.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            metadata = None
+
+    sources = {}
+    if _openclaw_version(metadata):
+        sources["metadata.json"] = _openclaw_version(metadata)
+    if front.get("version") is not None:
+        sources["frontmatter"] = _text(front["version"])
+    if _openclaw_version(front.get("metadata")):
+        sources["frontmatter.metadata"] = _openclaw_version(front["metadata"])
+
+    source = next(iter(sources), None)
+    return {
+        "name": _text(front.get("name")) or skill_dir.name,
+        "version": sources[source] if source else None,
+        "version_source": source,
+        "version_conflict": sources if len(set(sources.values())) > 1 else None,
+        "description": " ".join(_text(front.get("description")).split()),
+        "frontmatter": front,
+        "frontmatter_error": entry["error"] if entry else None,
+    }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="解析 SKILL.md 头部")
+    parser.add_argument("paths", nargs="+", help="SKILL.md 文件或 Skill 目录")
+    args = parser.parse_args()
+
+    status = 0
+    for path in map(Path, args.paths):
+        if path.is_dir():
+            info = skill_metadata(path)
+            print(json.dumps(info, ensure_ascii=False, indent=2))
+            if info["frontmatter_error"]:
+                status = 1
+            continue
+        try:
+            print(json.dumps(load_frontmatter(path), ensure_ascii=False, indent=2))
+        except (OSError, FrontmatterError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
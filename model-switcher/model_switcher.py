@@ -17,21 +17,26 @@
     python model_switcher.py minimax-portal/MiniMax-M2.5
 """
 
-import json
 import sys
 import os
 
+# 共用的原子写入模块在 skills 根目录
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from atomic_io import JsonReader, update_json
+
 # 配置文件路径
 CONFIG_PATH = os.path.expanduser("~/.openclaw/openclaw.json")
 
+# 配置文件只在变化时重新解析
+config_reader = JsonReader(CONFIG_PATH)
+
 # 模型类型判断
 LOCAL_MODEL_PREFIX = "ollama/"
 
 def get_current_model():
     """获取当前使用的模型"""
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
+        config = config_reader.load()
         primary_model = config.get('agents', {}).get('defaults', {}).get('model', {}).get('primary', '')
         return primary_model
     except Exception as e:
@@ -41,8 +46,7 @@ def get_current_model():
 def get_hook_status():
     """获取当前 hook 状态"""
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
+        config = config_reader.load()
         hook_enabled = config.get('hooks', {}).get('internal', {}).get('entries', {}).get('session-memory', {}).get('enabled', False)
         return hook_enabled
     except Exception as e:
@@ -54,11 +58,8 @@ def is_local_model(model_id):
     return model_id.startswith(LOCAL_MODEL_PREFIX)
 
 def update_hook_status(enable_hook):
-    """更新 hook 状态"""
-    try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
-        
+    """更新 hook 状态（加锁读改写，原子替换配置文件，网关不会读到写了一半的配置）"""
+    def apply(config):
         # 设置 hook 状态
         if 'hooks' not in config:
             config['hooks'] = {}
@@ -70,11 +71,9 @@ def update_hook_status(enable_hook):
         config['hooks']['internal']['entries']['session-memory'] = {
             'enabled': enable_hook
         }
-        
-        # 写回配置
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(config, f, indent=2)
-        
+    
+    try:
+        update_json(CONFIG_PATH, apply)
         return True
     except Exception as e:
         print(f"Error updating hook status: {e}")
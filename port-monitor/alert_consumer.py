@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Alert Consumer - 告警队列消费守护进程
+读取 port_checker.py / check_ports.py 追加到 .alert_queue 的告警，批量发送到飞书
+
+- 持久化已确认的字节偏移，重启后从断点继续，不重复不遗漏
+- 优先用 inotify 监听队列文件变化，不可用时退化为轮询
+- 兼容两种行格式：`ISO时间|消息`（port_checker）和 `[时间] 消息`（check_ports）
+- 所有条目确认发送后压缩队列文件，文件不会无限增长
+
+用法：
+    python3 alert_consumer.py           # 常驻运行
+    python3 alert_consumer.py --once    # 处理完当前队列后退出
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import errno
+import select
+import signal
+import struct
+import argparse
+import ctypes
+import ctypes.util
+from datetime import datetime
+from pathlib import Path
+
+from alert_dispatcher import AlertDispatcher, TokenBucket, WebhookSender
+
+SKILL_DIR = Path(__file__).parent
+CONFIG_FILE = SKILL_DIR / "config.json"
+ALERT_QUEUE = SKILL_DIR / ".alert_queue"
+OFFSET_FILE = SKILL_DIR / ".alert_queue.offset"
+
+POLL_INTERVAL = 0.5        # 轮询间隔（秒）
+BATCH_SIZE = 50            # 每条飞书消息最多合并的告警数
+COMPACT_THRESHOLD = 65536  # 已确认部分超过该字节数时压缩队列
+RETRY_MAX_DELAY = 60       # 发送失败后最长等待（秒）
+
+# 两种告警行格式的起始标记
+ISO_LINE = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)\|(.*)$")
+BRACKET_LINE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$")
+
+# inotify 常量
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def parse_entries(text):
+    """把队列文本解析为 [(timestamp, message)]；不带时间标记的行并入上一条"""
+    entries = []
+    for line in text.split("\n"):
+        m = ISO_LINE.match(line)
+        if m:
+            ts = datetime.fromisoformat(m.group(1)).timestamp()
+            entries.append([ts, m.group(2)])
+            continue
+        m = BRACKET_LINE.match(line)
+        if m:
+            ts = datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S").timestamp()
+            entries.append([ts, m.group(2)])
+            continue
+        if entries:
+            entries[-1][1] += "\n" + line
+        elif line.strip():
+            entries.append([time.time(), line])
+    return [(ts, message.strip()) for ts, message in entries]
+
+
+class QueueWatcher:
+    """等待队列文件变化：inotify 优先，失败时轮询"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                if libc.inotify_add_watch(fd, str(self.path.parent).encode(), mask) >= 0:
+                    self.fd = fd
+                else:
+                    os.close(fd)
+        except (OSError, AttributeError):
+            self.fd = None
+
+    @property
+    def mode(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def wait(self, timeout):
+        """等待队列文件有变化或超时"""
+        if self.fd is None:
+            time.sleep(min(timeout, POLL_INTERVAL))
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                readable, _, _ = select.select([self.fd], [], [], remaining)
+            except InterruptedError:
+                return
+            if not readable:
+                return
+            if self._drain():
+                return
+
+    def _drain(self):
+        """读出所有 inotify 事件，返回是否与队列文件相关"""
+        hit = False
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return False
+            raise
+        pos = 0
+        while pos + INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+            name = data[pos + INOTIFY_EVENT.size:pos + INOTIFY_EVENT.size + length].rstrip(b"\0")
+            if name.decode(errors="replace") == self.path.name:
+                hit = True
+            pos += INOTIFY_EVENT.size + length
+        return hit
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class AlertConsumer:
+    def __init__(self, sender, queue_file=ALERT_QUEUE, offset_file=OFFSET_FILE,
+                 rate_per_minute=20, log=print):
+        self.sender = sender
+        self.queue_file = Path(queue_file)
+        self.offset_file = Path(offset_file)
+        self.bucket = TokenBucket(rate_per_minute / 60, 5)
+        self.log = log
+        self.running = True
+        self.offset = 0
+        self.inode = None
+        self._load_offset()
+
+    def _load_offset(self):
+        try:
+            state = json.loads(self.offset_file.read_text())
+            self.offset, self.inode = state.get("offset", 0), state.get("inode")
+        except (OSError, ValueError):
+            self.offset, self.inode = 0, None
+
+    def _save_offset(self):
+        tmp = self.offset_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"offset": self.offset, "inode": self.inode}))
+        os.replace(tmp, self.offset_file)
+
+    def read_pending(self):
+        """读出偏移之后的完整条目，按 BATCH_SIZE 分批，返回 ([(批内条目, 该批结束偏移)], 新偏移)"""
+        try:
+            st = self.queue_file.stat()
+        except FileNotFoundError:
+            return [], self.offset
+        # 文件被替换或截断时从头开始
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode, self.offset = st.st_ino, 0
+        if st.st_size == self.offset:
+            return [], self.offset
+
+        with open(self.queue_file, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        # 只处理以换行结尾的完整部分
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return [], self.offset
+
+        # 按条目切分并记下每条结束的位置，续行属于上一条
+        entries, ends = [], []
+        chunk, pos = [], 0
+        for line in data[:end].splitlines(keepends=True):
+            text = line.decode("utf-8", errors="replace")
+            if chunk and (ISO_LINE.match(text.rstrip("\n")) or BRACKET_LINE.match(text.rstrip("\n"))):
+                for entry in parse_entries("".join(chunk)):
+                    entries.append(entry)
+                    ends.append(self.offset + pos)
+                chunk = []
+            chunk.append(text)
+            pos += len(line)
+        for entry in parse_entries("".join(chunk)):
+            entries.append(entry)
+            ends.append(self.offset + pos)
+
+        batches = []
+        for i in range(0, len(entries), BATCH_SIZE):
+            batch = entries[i:i + BATCH_SIZE]
+            batches.append((batch, ends[i + len(batch) - 1]))
+        return batches, self.offset + end
+
+    def compact(self):
+        """压缩队列：未确认的部分写入临时文件，持锁替换队列文件
+
+        先替换再保存偏移：替换后、保存前崩溃时，记录的 inode 与新文件不同，
+        read_pending 会从新文件开头读，不会跳过或重复条目。
+        """
+        tmp = self.queue_file.with_name(self.queue_file.name + ".tmp")
+        with open(self.queue_file, "rb") as f:
+            # 与 portlib.append_alert 互斥；写入方拿到锁后发现文件已被替换会重新打开
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(self.offset)
+                rest = f.read()
+                with open(tmp, "wb") as out:
+                    out.write(rest)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    inode = os.fstat(out.fileno()).st_ino
+                os.replace(tmp, self.queue_file)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.offset, self.inode = 0, inode
+        self._save_offset()
+
+    def deliver(self, batches):
+        """按批发送，每批成功后立即推进并保存偏移；全部成功返回 True"""
+        for batch, end in batches:
+            self.bucket.acquire()
+            ok, error = self.sender.send(AlertDispatcher.build_digest(batch))
+            if not ok:
+                self.log(f"❌ 飞书通知发送失败: {error}")
+                return False
+            self.log(f"✅ 飞书通知发送成功（{len(batch)} 条告警）")
+            self.offset = end
+            self._save_offset()
+        return True
+
+    def process(self):
+        """处理一次队列，返回 True 表示没有积压"""
+        batches, new_offset = self.read_pending()
+        if new_offset == self.offset:
+            return True
+        if batches and not self.deliver(batches):
+            return False
+        # 末尾的空行等不产生条目的内容也一并确认
+        self.offset = new_offset
+        self._save_offset()
+
+        size = self.queue_file.stat().st_size
+        if self.offset >= COMPACT_THRESHOLD or self.offset == size:
+            self.compact()
+        return True
+
+    def run(self, once=False):
+        watcher = None if once else QueueWatcher(self.queue_file)
+        if watcher:
+            self.log(f"🚀 告警消费启动（{watcher.mode}）: {self.queue_file}")
+        delay = 1
+        try:
+            while self.running:
+                if self.process():
+                    delay = 1
+                    if once:
+                        break
+                    watcher.wait(5)
+                else:
+                    if once:
+                        return False
+                    # 发送失败指数退避，期间不推进偏移
+                    time.sleep(delay)
+                    delay = min(RETRY_MAX_DELAY, delay * 2)
+        finally:
+            if watcher:
+                watcher.close()
+            self.sender.close()
+        return True
+
+    def stop(self):
+        self.running = False
+
+
+def load_webhook_url():
+    """从环境变量或 config.json 读取 webhook 地址"""
+    url = os.environ.get("FEISHU_WEBHOOK_URL", "")
+    if not url and CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                url = json.load(f).get("feishu_webhook", "")
+        except (OSError, ValueError):
+            pass
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert Consumer - 告警队列消费")
+    parser.add_argument("--once", action="store_true", help="处理完当前队列后退出")
+    parser.add_argument("--queue", default=str(ALERT_QUEUE), help="告警队列文件")
+    args = parser.parse_args()
+
+    webhook_url = load_webhook_url()
+    if not webhook_url:
+        print("⚠️ 未配置飞书 Webhook（config.json 的 feishu_webhook 或环境变量 FEISHU_WEBHOOK_URL）")
+        sys.exit(1)
+    try:
+        sender = WebhookSender(webhook_url)
+    except ImportError as e:
+        print(f"⚠️ {e}")
+        sys.exit(1)
+
+    queue_file = Path(args.queue)
+    consumer = AlertConsumer(sender, queue_file, queue_file.with_name(queue_file.name + ".offset"))
+
+    def signal_handler(sig, frame):
+        consumer.stop()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    sys.exit(0 if consumer.run(once=args.once) else 1)
+
+
+if __name__ == "__main__":
+    main()
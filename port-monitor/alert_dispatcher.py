@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Alert Dispatcher - 飞书告警后台发送器
+探测循环只把消息放进有界队列，由后台线程负责：
+- 短时间窗口内的多条告警合并成一条汇总消息
+- 令牌桶限速，避免大面积故障时刷屏
+- 复用同一个 keep-alive 连接，失败后指数退避重试
+"""
+
+import time
+import queue
+import threading
+from datetime import datetime
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+# 默认参数
+DEFAULT_WINDOW = 5          # 合并窗口（秒）
+DEFAULT_QUEUE_SIZE = 1000   # 队列上限
+DEFAULT_RATE = 20           # 每分钟最多发送消息数
+DEFAULT_BURST = 5           # 允许的突发条数
+DEFAULT_RETRIES = 3         # 最大重试次数
+
+_STOP = object()
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, stop_event=None):
+        """取一个令牌，不足时等待；stop_event 置位后立即返回"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            if stop_event is not None and stop_event.wait(wait):
+                return
+            if stop_event is None:
+                time.sleep(wait)
+
+
+class WebhookSender:
+    """飞书机器人 Webhook 发送，连接复用 + 指数退避重试"""
+
+    def __init__(self, webhook_url, max_retries=DEFAULT_RETRIES, timeout=10):
+        if requests is None:
+            raise ImportError("需要安装 requests 库才能发送飞书通知")
+        self.webhook_url = webhook_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+    def send(self, text):
+        """发送文本消息，返回 (是否成功, 错误信息)"""
+        payload = {"msg_type": "text", "content": {"text": text}}
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(30, 2 ** (attempt - 1)))
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+                continue
+            if response.status_code == 200:
+                try:
+                    code = response.json().get("code", 0)
+                except ValueError:
+                    code = 0
+                if code in (0, None):
+                    return True, None
+                error = f"code={code}"
+                # 飞书限流（11232）可重试，其余业务错误重试也无用
+                if code != 11232:
+                    break
+            else:
+                error = f"HTTP {response.status_code}"
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+        return False, error
+
+    def close(self):
+        self.session.close()
+
+
+class AlertDispatcher(threading.Thread):
+    """后台告警发送线程"""
+
+    def __init__(self, sender, log=print, window=DEFAULT_WINDOW, queue_size=DEFAULT_QUEUE_SIZE,
+                 rate_per_minute=DEFAULT_RATE, burst=DEFAULT_BURST):
+        super().__init__(name="alert-dispatcher", daemon=True)
+        self.sender = sender
+        self.log = log
+        self.window = window
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self.dropped = 0
+        self.sent = 0
+        self._stopping = threading.Event()
+
+    def submit(self, message):
+        """提交一条告警，不阻塞；队列满时丢弃并返回 False"""
+        try:
+            self.queue.put_nowait((time.time(), message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def _collect(self, first):
+        """从第一条消息开始，收集合并窗口内的所有消息"""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._stopping.set()
+                break
+            batch.append(item)
+        return batch
+
+    @staticmethod
+    def build_digest(batch):
+        """把一批告警合成一条消息"""
+        if len(batch) == 1:
+            return batch[0][1]
+        lines = [f"📣 告警汇总（{len(batch)} 条）", ""]
+        for ts, message in batch:
+            stamp = datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+            lines.append(f"[{stamp}] {message}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            if item is _STOP:
+                break
+
+            batch = self._collect(item)
+            self.bucket.acquire(self._stopping)
+            ok, error = self.sender.send(self.build_digest(batch))
+            if ok:
+                self.sent += 1
+                self.log(f"✅ 飞书通知发送成功（{len(batch)} 条告警）")
+            else:
+                self.log(f"❌ 飞书通知发送失败: {error}")
+            if self._stopping.is_set() and self.queue.empty():
+                break
+
+        self.sender.close()
+
+    def stop(self, timeout=15):
+        """停止发送线程，尽量发完已排队的告警"""
+        try:
+            self.queue.put(_STOP, timeout=1)
+        except queue.Full:
+            self._stopping.set()
+        self.join(timeout)
@@ -7,30 +7,46 @@
 import subprocess
 import os
 import time
+from pathlib import Path
+
+from listener_inventory import ListenerInventory
+
+# 与 startup-launcher/supervisor.py 共用 pidfile，避免重复启动
+RUN_DIR = Path(__file__).resolve().parent.parent / "startup-launcher" / "run"
+PID_FILE = RUN_DIR / "port_manager.pid"
+SUPERVISOR_PID = RUN_DIR / "supervisor.pid"
 
 def check_port(port):
-    """检查端口是否在监听"""
+    """检查端口是否在监听（读取 /proc/net，端口精确匹配）"""
     try:
-        result = subprocess.run(
-            ["ss", "-tuln"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return f":{port}" in result.stdout
+        return ListenerInventory().is_listening(port)
     except:
         return False
 
+def running_pid(pid_file, marker):
+    """pidfile 记录的进程仍在运行且命令行包含 marker 时返回 pid"""
+    try:
+        pid = int(pid_file.read_text().strip())
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            if marker.encode() in f.read():
+                return pid
+    except (OSError, ValueError):
+        pass
+    return None
+
 def start_service():
     """启动服务"""
     try:
         os.chdir("/home/lhj/.openclaw/workspace/port_manager")
-        subprocess.Popen(
+        proc = subprocess.Popen(
             ["python3", "port_manager.py"],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             start_new_session=True
         )
+        # 记录 pid，服务还在绑定端口时再次检查不会重复启动
+        RUN_DIR.mkdir(parents=True, exist_ok=True)
+        PID_FILE.write_text(f"{proc.pid}\n")
         return True
     except:
         return False
@@ -38,7 +54,14 @@ def start_service():
 def main():
     port = 10086
     
-    if not check_port(port):
+    if running_pid(SUPERVISOR_PID, "supervisor.py"):
+        print(f"✅ Port Manager 由 Supervisor 管理")
+        return
+    
+    pid = running_pid(PID_FILE, "port_manager.py")
+    if pid and not check_port(port):
+        print(f"⏳ Port Manager 正在启动 (PID: {pid})")
+    elif not check_port(port):
         print(f"端口 {port} 未运行，正在启动...")
         if start_service():
             print(f"✅ Port Manager 已启动")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Health Probes - 应用层健康检查
+TCP 能连上不代表服务可用，这里按协议真正发一次请求：
+- http    GET 指定路径，校验状态码，可选正文正则匹配
+- ollama  GET /api/tags，校验返回的模型列表
+- redis   PING，期望 +PONG
+- mysql   读取服务端握手包（协议版本 10）
+
+所有探测运行在 ProbeEngine 的事件循环上，HTTP / Redis 连接按目标复用
+"""
+
+import re
+import ssl
+import json
+import time
+import asyncio
+
+# HTTP 正文最多读取的字节数
+MAX_BODY = 1024 * 1024
+# 空闲连接保留时间（秒）
+IDLE_TTL = 60
+
+USER_AGENT = "openclaw-port-monitor"
+
+
+class ProbeError(Exception):
+    """探测失败（服务有响应但不符合预期）"""
+
+
+class ConnectionPool:
+    """按 (host, port, tls) 复用空闲连接"""
+
+    def __init__(self, idle_ttl=IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._idle = {}
+
+    async def acquire(self, host, port, timeout, tls=False):
+        """取一个连接，返回 (reader, writer, 是否复用)"""
+        key = (host, port, tls)
+        idle = self._idle.get(key, [])
+        now = time.monotonic()
+        while idle:
+            reader, writer, since = idle.pop()
+            if now - since < self.idle_ttl and not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        context = ssl.create_default_context() if tls else None
+        if context:
+            # 健康检查只关心服务是否可用，内网自签证书也接受
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), timeout)
+        return reader, writer, False
+
+    def release(self, host, port, reader, writer, tls=False):
+        """归还可复用的连接"""
+        self._idle.setdefault((host, port, tls), []).append((reader, writer, time.monotonic()))
+
+    async def close(self):
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle = {}
+
+
+async def _read_http_response(reader):
+    """读取一个 HTTP/1.1 响应，返回 (状态码, 正文, 连接是否可复用)"""
+    status_line = await reader.readline()
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ProbeError(f"非 HTTP 响应: {status_line[:40]!r}")
+    status = int(parts[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get("connection", "").lower() != "close" and parts[0] != "HTTP/1.0"
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        size = 0
+        while True:
+            length = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if length == 0:
+                # 跳过 trailer
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunk = await reader.readexactly(length + 2)
+            size += length
+            if size <= MAX_BODY:
+                chunks.append(chunk[:-2])
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read(MAX_BODY)
+        keep_alive = False
+    return status, body[:MAX_BODY], keep_alive
+
+
+async def http_get(pool, host, port, path, timeout, tls=False, host_header=None):
+    """发送 GET 请求，失效的复用连接自动重连一次"""
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host_header or host}\r\n"
+        f"User-Agent: {USER_AGENT}\r\n"
+        f"Accept: */*\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+    for attempt in range(2):
+        reader, writer, reused = await pool.acquire(host, port, timeout, tls)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, body, keep_alive = await asyncio.wait_for(_read_http_response(reader), timeout)
+        except (OSError, asyncio.IncompleteReadError, ValueError, ProbeError):
+            writer.close()
+            if reused and attempt == 0:
+                continue
+            raise
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            pool.release(host, port, reader, writer, tls)
+        else:
+            writer.close()
+        return status, body
+
+
+def _status_ok(status, expect):
+    if expect is None:
+        return 200 <= status < 400
+    if isinstance(expect, list):
+        return status in expect
+    return status == expect
+
+
+async def probe_http(pool, host, port, timeout, options):
+    status, body = await http_get(
+        pool, host, port, options.get("path", "/"), timeout,
+        tls=options.get("tls", False), host_header=options.get("host_header")
+    )
+    if not _status_ok(status, options.get("expect_status")):
+        raise ProbeError(f"HTTP {status}")
+    pattern = options.get("body_regex")
+    if pattern and not re.search(pattern, body.decode("utf-8", errors="replace")):
+        raise ProbeError(f"HTTP {status}，正文不匹配 /{pattern}/")
+    return f"HTTP {status}"
+
+
+async def probe_ollama(pool, host, port, timeout, options):
+    status, body = await http_get(pool, host, port, "/api/tags", timeout, tls=options.get("tls", False))
+    if status != 200:
+        raise ProbeError(f"/api/tags 返回 HTTP {status}")
+    try:
+        models = json.loads(body).get("models")
+    except ValueError:
+        raise ProbeError("/api/tags 返回的不是 JSON")
+    if not isinstance(models, list):
+        raise ProbeError("/api/tags 缺少 models 字段")
+    if options.get("require_models") and not models:
+        raise ProbeError("没有已加载的模型")
+    return f"{len(models)} 个模型"
+
+
+async def probe_redis(pool, host, port, timeout, options):
+    commands = []
+    if options.get("password"):
+        password = str(options["password"]).encode()
+        commands.append(b"*2\r\n$4\r\nAUTH\r\n$%d\r\n%s\r\n" % (len(password), password))
+    commands.append(b"*1\r\n$4\r\nPING\r\n")
+
+    for attempt in range(2):
+        reader, writer, reused = await pool.acquire(host, port, timeout)
+        try:
+            writer.write(b"".join(commands))
+            await writer.drain()
+            replies = [await asyncio.wait_for(reader.readline(), timeout) for _ in commands]
+        except (OSError, asyncio.IncompleteReadError):
+            writer.close()
+            if reused and attempt == 0:
+                continue
+            raise
+        except BaseException:
+            writer.close()
+            raise
+        break
+
+    reply = replies[-1].strip()
+    if reply != b"+PONG" or any(r.startswith(b"-") for r in replies):
+        writer.close()
+        error = next((r for r in replies if r.startswith(b"-")), reply)
+        raise ProbeError(f"Redis 返回 {error.decode(errors='replace').strip() or '空'}")
+    pool.release(host, port, reader, writer)
+    return "PONG"
+
+
+async def probe_mysql(pool, host, port, timeout, options):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        header = await asyncio.wait_for(reader.readexactly(4), timeout)
+        length = int.from_bytes(header[:3], "little")
+        payload = await asyncio.wait_for(reader.readexactly(length), timeout)
+    finally:
+        writer.close()
+    if payload[:1] == b"\xff":
+        message = payload[9:] if payload[3:4] == b"#" else payload[3:]
+        raise ProbeError(f"MySQL 拒绝连接: {message.decode(errors='replace')}")
+    if not payload:
+        raise ProbeError("MySQL 握手包为空")
+    if payload[:1] != b"\x0a":
+        raise ProbeError(f"未知的 MySQL 协议版本: {payload[0]}")
+    version = payload[1:payload.index(b"\0", 1)].decode(errors="replace")
+    return f"MySQL {version}"
+
+
+# 协议 → 探测函数（tcp 由 ProbeEngine.probe_tcp 处理）
+PROBES = {
+    "http": probe_http,
+    "ollama": probe_ollama,
+    "redis": probe_redis,
+    "mysql": probe_mysql,
+}
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Listener Inventory - 本机监听端口清单
+直接解析 /proc/net/tcp{,6} 和 /proc/net/udp{,6}，不依赖 ss / netstat：
+- 一次读取建立 (协议, 端口) 索引，任意多个服务的检查都查同一份清单
+- 端口精确匹配（10086 不会误中 100860）
+- 占用进程按需解析：只在需要时扫描 /proc/*/fd，把 socket inode 对应到 pid
+
+用法：
+  python3 listener_inventory.py list             # 列出所有监听端口及进程
+  python3 listener_inventory.py check 10086 3000  # 检查指定端口，全部在监听时退出码为 0
+  python3 listener_inventory.py ports            # 只输出监听中的 TCP 端口号，一行一个（供 shell 脚本使用）
+"""
+
+import os
+import sys
+import socket
+import argparse
+
+PROC_NET = "/proc/net"
+
+# TCP 状态 0A = LISTEN；UDP 没有连接状态，绑定未连接的套接字为 07
+TCP_LISTEN = "0A"
+UDP_UNCONNECTED = "07"
+
+SOURCES = (
+    ("tcp", "tcp", socket.AF_INET),
+    ("tcp", "tcp6", socket.AF_INET6),
+    ("udp", "udp", socket.AF_INET),
+    ("udp", "udp6", socket.AF_INET6),
+)
+
+
+def decode_address(hex_addr, family):
+    """把 /proc/net 中的十六进制地址（按 32 位小端存储）还原成字符串"""
+    raw = bytes.fromhex(hex_addr)
+    raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    return socket.inet_ntop(family, raw)
+
+
+def parse_proc_net(text, proto, family):
+    """解析一个 /proc/net/{tcp,udp}[6] 文件，返回监听中的套接字"""
+    wanted = TCP_LISTEN if proto == "tcp" else UDP_UNCONNECTED
+    listeners = []
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 10 or fields[3] != wanted:
+            continue
+        addr, _, port = fields[1].partition(":")
+        listeners.append({
+            "proto": proto if family == socket.AF_INET else proto + "6",
+            "addr": decode_address(addr, family),
+            "port": int(port, 16),
+            "inode": int(fields[9]),
+        })
+    return listeners
+
+
+class ListenerInventory:
+    def __init__(self, proc_net=PROC_NET):
+        self.proc_net = proc_net
+        self.listeners = []
+        self._index = {}  # (tcp/udp, 端口) -> [监听项]
+        self._owners = {}  # inode -> {"pid", "name"}
+        self.scan()
+
+    def scan(self):
+        """重新读取 /proc/net，重建索引"""
+        self.listeners = []
+        self._index = {}
+        self._owners = {}
+        for proto, name, family in SOURCES:
+            try:
+                with open(os.path.join(self.proc_net, name), "r") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            for entry in parse_proc_net(text, proto, family):
+                self.listeners.append(entry)
+                self._index.setdefault((proto, entry["port"]), []).append(entry)
+        return self
+
+    def lookup(self, port, proto="tcp"):
+        """返回在该端口监听的所有套接字（IPv4 / IPv6 分别列出）"""
+        return self._index.get((proto, int(port)), [])
+
+    def is_listening(self, port, proto="tcp"):
+        return bool(self.lookup(port, proto))
+
+    def ports(self, proto="tcp"):
+        return sorted({port for p, port in self._index if p == proto})
+
+    def _resolve_owners(self, inodes):
+        """扫描 /proc/*/fd，把 socket inode 对应到进程；找齐即停止"""
+        missing = {i for i in inodes if i not in self._owners}
+        if not missing:
+            return
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            fd_dir = f"/proc/{pid}/fd"
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue  # 进程已退出或无权限
+            for fd in fds:
+                try:
+                    target = os.readlink(f"{fd_dir}/{fd}")
+                except OSError:
+                    continue
+                if not target.startswith("socket:["):
+                    continue
+                inode = int(target[8:-1])
+                if inode in missing:
+                    self._owners[inode] = {"pid": int(pid), "name": _process_name(pid)}
+                    missing.discard(inode)
+            if not missing:
+                return
+
+    def owner(self, entry):
+        """监听该套接字的进程 {"pid", "name"}，无权限查看时返回 None"""
+        self._resolve_owners([entry["inode"]])
+        return self._owners.get(entry["inode"])
+
+    def owners(self, entries):
+        """批量解析进程，只扫描一遍 /proc"""
+        self._resolve_owners([e["inode"] for e in entries])
+        return [self._owners.get(e["inode"]) for e in entries]
+
+
+def _process_name(pid):
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return "?"
+
+
+def _format_owner(owner):
+    return f"{owner['name']}({owner['pid']})" if owner else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本机监听端口清单（解析 /proc/net）")
+    sub = parser.add_subparsers(dest="command")
+
+    p_list = sub.add_parser("list", help="列出所有监听端口及进程")
+    p_list.add_argument("--udp", action="store_true", help="同时列出 UDP")
+
+    p_check = sub.add_parser("check", help="检查指定端口是否在监听")
+    p_check.add_argument("ports", nargs="+", type=int)
+    p_check.add_argument("--udp", action="store_true", help="检查 UDP 端口")
+
+    p_ports = sub.add_parser("ports", help="输出监听中的端口号，一行一个")
+    p_ports.add_argument("--udp", action="store_true", help="输出 UDP 端口")
+
+    args = parser.parse_args()
+    inventory = ListenerInventory()
+
+    if args.command == "ports":
+        for port in inventory.ports("udp" if args.udp else "tcp"):
+            print(port)
+
+    elif args.command == "check":
+        proto = "udp" if args.udp else "tcp"
+        entries = {port: inventory.lookup(port, proto) for port in args.ports}
+        inventory.owners([e for found in entries.values() for e in found])
+        missing = 0
+        for port, found in entries.items():
+            if found:
+                owners = sorted({_format_owner(inventory.owner(e)) for e in found})
+                print(f"✅ {port}/{proto}: {', '.join(owners)}")
+            else:
+                missing += 1
+                print(f"❌ {port}/{proto}: 未监听")
+        sys.exit(1 if missing else 0)
+
+    elif args.command == "list":
+        entries = [e for e in inventory.listeners if args.udp or e["proto"].startswith("tcp")]
+        entries.sort(key=lambda e: (e["proto"].rstrip("6"), e["port"], e["proto"]))
+        owners = inventory.owners(entries)
+        print(f"{'协议':<6} {'地址':<40} {'端口':>6}  进程")
+        for entry, owner in zip(entries, owners):
+            print(f"{entry['proto']:<6} {entry['addr']:<40} {entry['port']:>6}  {_format_owner(owner)}")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
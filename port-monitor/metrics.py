@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Metrics - Prometheus / OpenMetrics 指标导出
+守护进程内嵌的 HTTP 接口（GET /metrics），输出：
+- port_monitor_up                     目标状态（1=UP，0=DOWN）
+- port_monitor_flap_suppressed        目标是否处于抖动抑制
+- port_monitor_probes_total           探测次数（按结果区分）
+- port_monitor_probe_latency_seconds  探测耗时直方图
+- port_monitor_alert_queue_depth      告警发送队列长度
+- port_monitor_alerts_dropped_total   队列满被丢弃的告警数
+
+指标在探测时预先累加，抓取时只拼接文本，不会触发探测；
+文本按需重建并缓存，两次探测之间的重复抓取直接返回缓存
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 耗时直方图分桶（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = {}  # key -> 标签
+        self._up = {}
+        self._suppressed = {}
+        self._probes = {}  # (key, result) -> 次数
+        self._histograms = {}  # key -> [各分桶计数..., 总数, 总和]
+        self._gauges = []  # (名称, 说明, 回调, 类型)
+        self._cache = None
+
+    def register_target(self, target, name):
+        with self._lock:
+            self._targets[target["key"]] = {
+                "target": target["key"],
+                "host": target["host"],
+                "port": target["port"],
+                "protocol": target["protocol"],
+                "service": name,
+            }
+            self._cache = None
+
+    def observe_probe(self, key, up, latency):
+        """记录一次探测"""
+        with self._lock:
+            result = "success" if up else "failure"
+            self._probes[(key, result)] = self._probes.get((key, result), 0) + 1
+            if up and latency is not None:
+                hist = self._histograms.get(key)
+                if hist is None:
+                    hist = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if latency <= bound:
+                        hist[i] += 1
+                hist[-2] += 1
+                hist[-1] += latency
+            self._cache = None
+
+    def set_state(self, key, up, suppressed=False):
+        with self._lock:
+            self._up[key] = 1 if up else 0
+            self._suppressed[key] = 1 if suppressed else 0
+            self._cache = None
+
+    def add_gauge(self, name, help_text, callback, kind="gauge"):
+        """注册抓取时求值的指标（如队列长度）"""
+        self._gauges.append((name, help_text, callback, kind))
+
+    def _render_static(self):
+        lines = []
+
+        lines.append("# HELP port_monitor_up Target status (1 = UP, 0 = DOWN).")
+        lines.append("# TYPE port_monitor_up gauge")
+        for key, value in self._up.items():
+            lines.append(f"port_monitor_up{_labels(self._targets.get(key, {'target': key}))} {value}")
+
+        lines.append("# HELP port_monitor_flap_suppressed Whether alerts for the target are suppressed due to flapping.")
+        lines.append("# TYPE port_monitor_flap_suppressed gauge")
+        for key, value in self._suppressed.items():
+            lines.append(f"port_monitor_flap_suppressed{_labels({'target': key})} {value}")
+
+        lines.append("# HELP port_monitor_probes_total Probes executed, by result.")
+        lines.append("# TYPE port_monitor_probes_total counter")
+        for (key, result), value in self._probes.items():
+            lines.append(f"port_monitor_probes_total{_labels({'target': key, 'result': result})} {value}")
+
+        lines.append("# HELP port_monitor_probe_latency_seconds Latency of successful probes.")
+        lines.append("# TYPE port_monitor_probe_latency_seconds histogram")
+        for key, hist in self._histograms.items():
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                lines.append(f"port_monitor_probe_latency_seconds_bucket{_labels({'target': key, 'le': bound})} {hist[i]}")
+            lines.append(f"port_monitor_probe_latency_seconds_bucket{_labels({'target': key, 'le': '+Inf'})} {hist[-2]}")
+            lines.append(f"port_monitor_probe_latency_seconds_count{_labels({'target': key})} {hist[-2]}")
+            lines.append(f"port_monitor_probe_latency_seconds_sum{_labels({'target': key})} {hist[-1]:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+    def render(self):
+        """输出指标文本"""
+        with self._lock:
+            if self._cache is None:
+                self._cache = self._render_static()
+            text = self._cache
+        for name, help_text, callback, kind in self._gauges:
+            try:
+                value = callback()
+            except Exception:
+                continue
+            text += f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n{name} {value}\n"
+        return text.encode("utf-8")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取很频繁，不写访问日志
+        pass
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics"""
+
+    def __init__(self, registry, host="127.0.0.1", port=10087):
+        self.registry = registry
+        self.address = (host, port)
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer(self.address, _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = self.registry
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Monitor Logger - 监控日志
+- 文件句柄常驻，日志先进内存缓冲，按大小或时间批量写盘
+- 按大小和日期轮转，旧日志 gzip 压缩，只保留最近若干份
+- 支持纯文本和 JSON Lines 两种格式
+- changes 模式只记录状态变化等事件和定期汇总，逐次探测结果不落盘
+"""
+
+import os
+import gzip
+import json
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# 默认参数
+DEFAULT_FLUSH_INTERVAL = 5          # 缓冲最长停留时间（秒）
+DEFAULT_FLUSH_BYTES = 64 * 1024     # 缓冲达到该大小立即写盘
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 7
+
+# 日志类别：probe 为逐次探测结果，event 为其余所有事件
+PROBE = "probe"
+EVENT = "event"
+
+
+class MonitorLogger:
+    def __init__(self, path, mode="changes", fmt="text", echo=True,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, flush_bytes=DEFAULT_FLUSH_BYTES,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT, rotate_daily=True):
+        self.path = Path(path)
+        self.mode = mode
+        self.fmt = fmt
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered = 0
+        self._file = None
+        self._size = 0
+        self._day = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+        self._flusher.start()
+
+    def _format(self, now, message, kind, fields):
+        if self.fmt == "json":
+            record = {"time": now.isoformat(timespec="seconds"), "kind": kind, "message": message}
+            record.update(fields)
+            return json.dumps(record, ensure_ascii=False)
+        return f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+
+    def write(self, message, kind=EVENT, **fields):
+        """记录一条日志；changes 模式下丢弃逐次探测结果"""
+        if self.mode == "changes" and kind == PROBE:
+            return
+        now = datetime.now()
+        if self.echo:
+            print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+        line = self._format(now, message, kind, fields) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line.encode("utf-8"))
+            if self._buffered >= self.flush_bytes:
+                self._flush_locked()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._day = datetime.now().date()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        try:
+            if self._file is None:
+                self._open()
+            size = len(data.encode("utf-8"))
+            if self._size and (self._size + size > self.max_bytes
+                               or (self.rotate_daily and datetime.now().date() != self._day)):
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += size
+        except OSError:
+            pass
+
+    def _rotate(self):
+        """当前日志改名后后台压缩，重新打开新文件"""
+        self._file.close()
+        # 改名或重新打开失败时，下次 flush 会重新打开文件
+        self._file = None
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        rotated = self.path.with_name(f"{self.path.name}.{stamp}")
+        seq = 1
+        while rotated.exists() or Path(f"{rotated}.gz").exists():
+            rotated = self.path.with_name(f"{self.path.name}.{stamp}-{seq}")
+            seq += 1
+        os.replace(self.path, rotated)
+        self._open()
+        threading.Thread(target=self._compress, args=(rotated,), name="log-compress", daemon=True).start()
+
+    def _compress(self, rotated):
+        try:
+            with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            rotated.unlink()
+        except OSError:
+            return
+        # 只保留最近 backup_count 份
+        backups = sorted(self.path.parent.glob(f"{self.path.name}.*.gz"))
+        for old in backups[:-self.backup_count] if self.backup_count else backups:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -7,148 +7,120 @@ Port Monitor - 端口持续监控 + 飞书告警
 import os
 import sys
 import json
-import socket
-import subprocess
 import threading
 import time
 import argparse
 import signal
 from datetime import datetime
-from pathlib import Path
+
+import portlib
+from alert_dispatcher import AlertDispatcher, WebhookSender
+from metrics import MetricsRegistry, MetricsServer
+from monitor_logger import MonitorLogger, PROBE
+from portlib import CONFIG_FILE, SKILL_DIR, load_config
+from probe_engine import ProbeEngine
+from probe_store import ProbeStore
+from state_machine import state_from_config
+from targets import load_targets, TargetScheduler
 
 # 配置路径
-SKILL_DIR = Path(__file__).parent
-CONFIG_FILE = SKILL_DIR / "config.json"
 LOG_FILE = SKILL_DIR / "monitor.log"
 
-# 默认配置
-DEFAULT_CONFIG = {
-    "check_interval": 30,
-    "critical_ports": [8188, 11434, 8080],
-    "notification_enabled": True,
-    "wsl_ip": "auto",
-    "windows_ip": "auto",
-    "notify_on_recover": False  # 端口恢复时是否通知
-}
-
-# 常用服务端口映射
-SERVICE_PORTS = {
-    22: "SSH",
-    80: "HTTP",
-    443: "HTTPS",
-    3000: "Node.js",
-    3306: "MySQL",
-    5432: "PostgreSQL",
-    5678: "N8N",
-    6379: "Redis",
-    8080: "Dify",
-    8188: "ComfyUI",
-    8765: "Dify Upload",
-    11434: "Ollama API",
-    27017: "MongoDB",
-    5000: "Win 进程管理",
-    5003: "ComfyUI/N8N",
-    8000: "Django",
-    8888: "Jupyter",
-    9090: "Prometheus",
-    9200: "Elasticsearch",
-    2375: "Docker",
-    2376: "Docker TLS",
-}
-
 
 class PortMonitor:
     def __init__(self, config):
         self.config = config
         self.running = True
-        self.port_status = {}  # 存储端口状态 {"port": {"status": "UP"/"DOWN", "last_check": time}}
+        self.port_status = {}  # 存储目标状态 {"host:port": {"status": "UP"/"DOWN", "last_check": time}}
+        self.states = {}  # 每个目标的状态机 {"host:port": TargetState}
         self.wsl_ip = None
         self.windows_ip = None
+        self.logger = MonitorLogger(
+            LOG_FILE,
+            mode=self.config.get("log_mode", "changes"),
+            fmt=self.config.get("log_format", "text"),
+            flush_interval=self.config.get("log_flush_interval", 5),
+            max_bytes=self.config.get("log_max_bytes", 10 * 1024 * 1024),
+            backup_count=self.config.get("log_backup_count", 7),
+            rotate_daily=self.config.get("log_rotate_daily", True)
+        )
+        self._summary_at = time.monotonic()
+        self._summary_probes = 0
+        self.engine = ProbeEngine(
+            timeout=self.config.get("probe_timeout", 1),
+            concurrency=self.config.get("max_concurrency", 200)
+        )
         
-        # 初始化所有端口状态为 UNKNOWN
-        for port in self.config.get("critical_ports", []):
-            self.port_status[port] = {"status": "UNKNOWN", "last_check": None}
+        self.targets = load_targets(self.config)
+        self.store = None
+        if self.config.get("history_enabled", True):
+            self.store = ProbeStore(SKILL_DIR / self.config.get("history_dir", "history"))
+        self.dispatcher = None
+        self.status_server = None
+        self.metrics_server = None
+        self.metrics = MetricsRegistry()
+        self.metrics.add_gauge(
+            "port_monitor_alert_queue_depth", "Alerts waiting in the Feishu dispatch queue.",
+            lambda: self.dispatcher.qsize() if self.dispatcher else 0
+        )
+        self.metrics.add_gauge(
+            "port_monitor_alerts_dropped_total", "Alerts dropped because the dispatch queue was full.",
+            lambda: self.dispatcher.dropped if self.dispatcher else 0, kind="counter"
+        )
+        for target in self.targets:
+            self.metrics.register_target(target, self.get_service_name(target["port"], target["name"]))
+
+        # 初始化所有目标状态为 UNKNOWN
+        for target in self.targets:
+            self.port_status[target["key"]] = {"status": "UNKNOWN", "last_check": None}
         
     def get_local_ip(self):
         """获取 WSL IP"""
-        try:
-            result = subprocess.run(
-                ["hostname", "-I"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.stdout:
-                return result.stdout.strip().split()[0]
-        except:
-            pass
-        return "127.0.0.1"
+        return portlib.get_local_ip()
     
     def get_windows_ip(self):
         """获取 Windows IP"""
-        try:
-            result = subprocess.run(
-                ["ip", "route", "show", "default"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.stdout:
-                for line in result.stdout.split('\n'):
-                    if 'default' in line:
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            gw = parts[2]
-                            if self._check_port_reachable(gw, 8188):
-                                return gw
-        except:
-            pass
-        # 备用方法
-        try:
-            with open("/etc/resolv.conf", "r") as f:
-                for line in f:
-                    if "nameserver" in line:
-                        ip = line.split()[1]
-                        if ip != "127.0.0.1" and self._check_port_reachable(ip, 8188):
-                            return ip
-        except:
-            pass
-        return "172.22.16.1"
+        return portlib.get_windows_ip()
     
     def _check_port_reachable(self, ip, port, timeout=1):
         """检查端口是否可达"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((ip, port))
-            sock.close()
-            return result == 0
-        except:
-            return False
+        return portlib.check_port(ip, port, timeout)
     
-    def get_service_name(self, port):
+    def get_service_name(self, port, name=None):
         """获取服务名称"""
-        return SERVICE_PORTS.get(port, f"Port-{port}")
+        return portlib.service_name(port, name)
     
-    def log(self, message):
-        """日志输出"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_msg = f"[{timestamp}] {message}"
-        print(log_msg)
-        
-        # 写入日志文件
-        try:
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(log_msg + "\n")
-        except:
-            pass
+    def log(self, message, kind="event", **fields):
+        """日志输出（缓冲写盘，kind="probe" 的逐次探测结果在 changes 模式下不记录）"""
+        self.logger.write(message, kind, **fields)
     
-    def send_feishu_notification(self, port, status, ip):
+    def log_summary(self):
+        """定期汇总：changes 模式下代替逐次探测日志"""
+        interval = self.config.get("log_summary_interval", 300)
+        if self.logger.mode != "changes" or not interval:
+            return
+        now = time.monotonic()
+        if now - self._summary_at < interval:
+            return
+        counts = {}
+        for state in self.port_status.values():
+            counts[state["status"]] = counts.get(state["status"], 0) + 1
+        down = [k for k, v in self.port_status.items() if v["status"] == "DOWN"]
+        self.log(
+            f"📊 汇总: {len(self.port_status)} 个目标，UP {counts.get('UP', 0)}，DOWN {len(down)}，"
+            f"{now - self._summary_at:.0f} 秒内探测 {self._summary_probes} 次"
+            + (f"（DOWN: {', '.join(down)}）" if down else ""),
+            kind="summary", up=counts.get("UP", 0), down=down, probes=self._summary_probes
+        )
+        self._summary_at = now
+        self._summary_probes = 0
+    
+    def send_feishu_notification(self, port, status, ip, name=None):
         """发送飞书通知"""
         if not self.config.get("notification_enabled", True):
             return
         
-        service_name = self.get_service_name(port)
+        service_name = self.get_service_name(port, name)
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         if status == "DOWN":
@@ -173,58 +145,136 @@ class PortMonitor:
         # 调用飞书 webhook（需要配置）
         self._send_webhook(message)
     
-    def _send_webhook(self, message):
-        """发送飞书机器人消息"""
-        # 从环境变量或配置文件获取 webhook 地址
-        webhook_url = os.environ.get("FEISHU_WEBHOOK_URL", "")
+    def start_dispatcher(self):
+        """启动后台告警发送线程"""
+        if not self.config.get("notification_enabled", True):
+            return
         
+        # 从环境变量或配置文件获取 webhook 地址
+        webhook_url = os.environ.get("FEISHU_WEBHOOK_URL", "") or self.config.get("feishu_webhook", "")
         if not webhook_url:
-            # 尝试从配置文件读取
-            try:
-                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                    config = json.load(f)
-                    webhook_url = config.get("feishu_webhook", "")
-            except:
-                pass
+            self.log("⚠️ 未配置飞书 Webhook，告警将不会发送")
+            return
         
-        if not webhook_url:
+        try:
+            sender = WebhookSender(webhook_url, max_retries=self.config.get("alert_max_retries", 3))
+        except ImportError as e:
+            self.log(f"⚠️ {e}")
+            return
+        
+        self.dispatcher = AlertDispatcher(
+            sender,
+            log=self.log,
+            window=self.config.get("alert_coalesce_window", 5),
+            queue_size=self.config.get("alert_queue_size", 1000),
+            rate_per_minute=self.config.get("alert_rate_per_minute", 20)
+        )
+        self.dispatcher.start()
+    
+    def _send_webhook(self, message):
+        """提交飞书机器人消息到后台发送队列（不阻塞探测循环）"""
+        if not self.dispatcher:
             self.log("⚠️ 未配置飞书 Webhook，跳过通知")
             return
         
-        try:
-            import requests
-            payload = {"msg_type": "text", "content": {"text": message}}
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            if response.status_code == 200:
-                self.log(f"✅ 飞书通知发送成功")
-            else:
-                self.log(f"❌ 飞书通知发送失败: {response.status_code}")
-        except ImportError:
-            self.log("⚠️ 需要安装 requests 库才能发送飞书通知")
-        except Exception as e:
-            self.log(f"❌ 飞书通知发送失败: {e}")
+        if not self.dispatcher.submit(message):
+            self.log("⚠️ 告警队列已满，丢弃一条通知")
     
     def check_port(self, ip, port):
         """检查单个端口状态"""
         is_reachable = self._check_port_reachable(ip, port)
-        status = "UP" if is_reachable else "DOWN"
-        
-        old_status = self.port_status.get(port, {}).get("status", "UNKNOWN")
+        return self._update_status(f"{ip}:{port}", ip, port, "UP" if is_reachable else "DOWN")
+    
+    def check_targets(self, targets):
+        """并发检查一批目标，返回 {key: status}"""
+        probes = [
+            (self.resolve_host(t["host"]), t["port"], t["timeout"], t["protocol"], t["options"])
+            for t in targets
+        ]
+        results = self.engine.sweep(probes)
+        now = time.time()
+        self._summary_probes += len(targets)
+        for t, r in zip(targets, results):
+            self.metrics.observe_probe(t["key"], r["up"], r["latency"])
+            if self.store:
+                self.store.record(t["key"], now, r["up"], r["latency"])
+        return {
+            t["key"]: self._update_status(
+                t["key"], r["host"], t["port"], "UP" if r["up"] else "DOWN", t["name"], r
+            )
+            for t, r in zip(targets, results)
+        }
+    
+    def _update_status(self, key, ip, port, probe_status, name=None, result=None):
+        """把一次探测结果交给状态机，确认的状态变化才告警"""
+        machine = self.states.get(key)
+        if machine is None:
+            machine = self.states[key] = state_from_config(self.config)
+        transition = machine.observe(probe_status == "UP", time.monotonic())
+        old_status, status = transition.old, transition.new
         
         # 状态变化检测
-        if old_status != "UNKNOWN" and old_status != status:
-            self.log(f"⚡ 端口 {port} 状态变化: {old_status} → {status}")
-            # 发送通知（仅在 DOWN 时发送，避免频繁通知）
+        if old_status != "UNKNOWN" and transition.changed:
+            self.log(f"⚡ {key} 状态变化: {old_status} → {status}", kind="change", target=key, old=old_status, new=status)
+            # 发送通知（仅在 DOWN 时发送，避免频繁通知；抖动抑制期间不发）
+            if status == "DOWN" and transition.notify:
+                self.send_feishu_notification(port, status, ip, name)
+        
+        if transition.suppress_started:
+            self.log(f"🔇 {key} 状态频繁抖动，暂停告警（惩罚值 {machine.penalty:.0f}）")
+        if transition.suppress_ended:
+            self.log(f"🔔 {key} 抖动平息，恢复告警")
             if status == "DOWN":
-                self.send_feishu_notification(port, status, ip)
+                self.send_feishu_notification(port, status, ip, name)
         
-        self.port_status[port] = {
+        self.port_status[key] = {
             "status": status,
+            "probe_status": probe_status,
             "last_check": time.time()
         }
+        self.metrics.set_state(key, status == "UP", machine.suppressed)
+        if result:
+            self.port_status[key].update(
+                latency=result["latency"], detail=result["detail"], error=result["error"]
+            )
+        
+        # 状态变化时同步到状态文件，供 Cron 客户端在守护进程不在时使用
+        if transition.changed:
+            portlib.save_status({k: v["status"] for k, v in self.port_status.items() if v["status"] != "UNKNOWN"})
         
         return status
     
+    def snapshot(self):
+        """当前状态快照，供 Unix socket 状态接口返回"""
+        targets = {}
+        for target in self.targets:
+            state = self.port_status.get(target["key"], {})
+            machine = self.states.get(target["key"])
+            targets[target["key"]] = {
+                "host": target["host"],
+                "ip": self.resolve_host(target["host"]),
+                "port": target["port"],
+                "name": self.get_service_name(target["port"], target["name"]),
+                "protocol": target["protocol"],
+                "status": state.get("status", "UNKNOWN"),
+                "probe_status": state.get("probe_status"),
+                "suppressed": machine.suppressed if machine else False,
+                "last_check": state.get("last_check"),
+                "latency": state.get("latency"),
+                "detail": state.get("detail") or state.get("error"),
+            }
+        return {"windows_ip": self.windows_ip, "wsl_ip": self.wsl_ip, "targets": targets}
+    
+    def start_status_server(self):
+        """启动 Unix socket 状态接口"""
+        self.status_server = portlib.StatusServer(self.snapshot)
+        try:
+            self.status_server.start()
+            self.log(f"🔌 状态接口: {self.status_server.path}")
+        except (OSError, RuntimeError) as e:
+            self.log(f"⚠️ 状态接口启动失败: {e}")
+            self.status_server = None
+    
     def init_ips(self):
         """初始化 IP 地址"""
         wsl_ip_config = self.config.get("wsl_ip", "auto")
@@ -236,35 +286,99 @@ class PortMonitor:
         self.log(f"📡 WSL IP: {self.wsl_ip}")
         self.log(f"📡 Windows IP: {self.windows_ip}")
     
+    def refresh_windows_ip(self):
+        """自动检测模式下跟随路由表变化更新 Windows IP（路由表未变时只读缓存）"""
+        if self.config.get("windows_ip", "auto") != "auto":
+            return
+        ip = self.get_windows_ip()
+        if ip != self.windows_ip:
+            self.log(f"📡 Windows IP 变化: {self.windows_ip} → {ip}")
+            self.windows_ip = ip
+    
+    def resolve_host(self, host):
+        """把 host 别名（windows/wsl）解析为实际 IP"""
+        if host == "windows":
+            return self.windows_ip
+        if host == "wsl":
+            return self.wsl_ip
+        return host
+    
+    def _wait(self, seconds):
+        """可被 stop() 打断的等待"""
+        deadline = time.monotonic() + seconds
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(1, remaining))
+    
+    def start_metrics_server(self):
+        """启动 Prometheus 指标接口"""
+        port = self.config.get("metrics_port", 10087)
+        if not port:
+            return
+        host = self.config.get("metrics_host", "127.0.0.1")
+        self.metrics_server = MetricsServer(self.metrics, host, port)
+        try:
+            self.metrics_server.start()
+            self.log(f"📊 指标接口: http://{host}:{port}/metrics")
+        except OSError as e:
+            self.log(f"⚠️ 指标接口启动失败: {e}")
+            self.metrics_server = None
+    
+    def _next_due(self, target, when, now):
+        """下次检测时间：可疑目标快速复测，其余按目标间隔"""
+        machine = self.states.get(target["key"])
+        if machine and machine.needs_reprobe:
+            fast = self.config.get("fast_reprobe_interval", 2)
+            return time.monotonic() + min(fast, target["interval"])
+        return max(when + target["interval"], now)
+    
     def run(self):
         """主监控循环"""
         self.init_ips()
+        self.start_dispatcher()
+        self.start_status_server()
+        self.start_metrics_server()
         self.log("🚀 端口监控服务启动")
-        self.log(f"📋 监控端口: {self.config.get('critical_ports', [])}")
-        self.log(f"⏱️ 检测间隔: {self.config.get('check_interval', 30)}秒")
+        for target in self.targets:
+            self.log(f"📋 监控目标: {target['key']} ({target['protocol']}) 每 {target['interval']:g} 秒")
         
+        scheduler = TargetScheduler(self.targets, time.monotonic())
         while self.running:
             try:
-                critical_ports = self.config.get("critical_ports", [])
+                # 取出所有到期目标并发检查，检查完再按结果排下一次时间
+                now = time.monotonic()
+                due = scheduler.pop_due(now)
+                batch = [target for _, target in due]
+                try:
+                    if batch:
+                        self.refresh_windows_ip()
+                    statuses = self.check_targets(batch) if batch else {}
+                finally:
+                    for when, target in due:
+                        scheduler.schedule(target, self._next_due(target, when, now))
                 
-                for port in critical_ports:
-                    # 判断端口属于 WSL 还是 Windows
-                    # 默认检查 Windows 端口（大多数服务在 Windows 上）
-                    target_ip = self.windows_ip
-                    
-                    # 检查端口状态
-                    status = self.check_port(target_ip, port)
+                for target in batch:
+                    status = statuses[target["key"]]
                     status_icon = "✅" if status == "UP" else "❌"
-                    service = self.get_service_name(port)
-                    self.log(f"{status_icon} 端口 {port} ({service}): {status}")
+                    if self.states[target["key"]].pending:
+                        status_icon = "⚠️"
+                    service = self.get_service_name(target["port"], target["name"])
+                    state = self.port_status[target["key"]]
+                    extra = state.get("detail") or state.get("error")
+                    if state.get("latency") is not None:
+                        extra = f"{extra}, {state['latency'] * 1000:.1f}ms" if extra else f"{state['latency'] * 1000:.1f}ms"
+                    self.log(
+                        f"{status_icon} {target['key']} ({service}): {status}" + (f" [{extra}]" if extra else ""),
+                        PROBE, target=target["key"], status=status, latency=state.get("latency")
+                    )
+                self.log_summary()
+                
+                # 等待下一个目标到期
+                wait = scheduler.seconds_until_next(time.monotonic())
+                self._wait(1 if wait is None else wait)
                 
-                # 等待下一次检测
-                interval = self.config.get("check_interval", 30)
-                for _ in range(interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
-                    
             except KeyboardInterrupt:
                 self.log("🛑 收到中断信号，正在停止...")
                 break
@@ -272,33 +386,23 @@ class PortMonitor:
                 self.log(f"❌ 监控出错: {e}")
                 time.sleep(5)
         
+        self.engine.close()
+        if self.status_server:
+            self.status_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.dispatcher:
+            self.dispatcher.stop()
+        if self.store:
+            self.store.close()
         self.log("👋 端口监控服务已停止")
+        self.logger.close()
     
     def stop(self):
         """停止监控"""
         self.running = False
 
 
-def load_config():
-    """加载配置文件"""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                # 合并默认配置
-                merged = DEFAULT_CONFIG.copy()
-                merged.update(config)
-                return merged
-        except Exception as e:
-            print(f"⚠️ 配置文件读取失败: {e}")
-    
-    # 创建默认配置
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(DEFAULT_CONFIG, f, indent=4, ensure_ascii=False)
-    
-    return DEFAULT_CONFIG
-
-
 def send_to_feishu(message):
     """发送消息到当前飞书会话"""
     try:
@@ -341,6 +445,7 @@ def main():
     if args.critical:
         try:
             config["critical_ports"] = [int(p.strip()) for p in args.critical.split(",")]
+            config["targets"] = []
         except ValueError:
             print("❌ 端口格式错误，请使用逗号分隔的数字")
             sys.exit(1)
@@ -380,7 +485,11 @@ def main():
             os.dup2(f.fileno(), sys.stderr.fileno())
     
     # 创建监控实例
-    monitor = PortMonitor(config)
+    try:
+        monitor = PortMonitor(config)
+    except ValueError as e:
+        print(f"❌ 目标配置错误: {e}")
+        sys.exit(1)
     
     # 信号处理
     def signal_handler(sig, frame):
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Port Lib - 端口监控公共库
+port_monitor.py（常驻守护进程）、port_checker.py / check_ports.py（Cron 客户端）共用：
+- 配置加载与服务端口表
+- WSL / Windows IP 解析（网关按路由表内容缓存）
+- 端口连通性检测
+- 状态文件与告警队列
+- 守护进程的 Unix socket 状态接口
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+import struct
+import hashlib
+import subprocess
+import threading
+import socketserver
+from datetime import datetime
+from pathlib import Path
+
+# 配置路径
+SKILL_DIR = Path(__file__).parent
+CONFIG_FILE = SKILL_DIR / "config.json"
+STATUS_FILE = SKILL_DIR / ".port_status"
+ALERT_QUEUE = SKILL_DIR / ".alert_queue"
+SOCKET_PATH = SKILL_DIR / ".monitor.sock"
+GATEWAY_CACHE = SKILL_DIR / ".gateway_cache"
+
+# 路由表与网关缓存
+ROUTE_FILE = Path("/proc/net/route")
+RESOLV_FILE = Path("/etc/resolv.conf")
+GATEWAY_TTL = 3600  # 路由表不变时缓存有效期（秒）
+RTF_UP = 0x0001
+RTF_GATEWAY = 0x0002
+
+# Windows IP 兜底值
+FALLBACK_WINDOWS_IP = "172.22.16.1"
+
+# 默认配置
+DEFAULT_CONFIG = {
+    "check_interval": 30,
+    "critical_ports": [8188, 11434, 8080],
+    "notification_enabled": True,
+    "wsl_ip": "auto",
+    "windows_ip": "auto",
+    "notify_on_recover": False,  # 端口恢复时是否通知
+    "probe_timeout": 1,  # 单个探测超时（秒）
+    "max_concurrency": 200,  # 并发探测上限
+    "history_enabled": True,  # 记录每次探测结果到时序存储
+    "history_dir": "history",  # 时序存储目录（相对 skill 目录）
+    "alert_coalesce_window": 5,  # 告警合并窗口（秒）
+    "alert_rate_per_minute": 20,  # 每分钟最多发送的飞书消息数
+    "alert_queue_size": 1000,  # 告警队列上限
+    "alert_max_retries": 3,  # 发送失败重试次数
+    "fail_threshold": 2,  # 最近 fail_window 次中失败几次判定 DOWN
+    "fail_window": 3,  # 状态判定窗口（次）
+    "recover_threshold": 2,  # 最近 fail_window 次中成功几次判定恢复
+    "fast_reprobe_interval": 2,  # 可疑目标快速复测间隔（秒）
+    "flap_penalty": 1000,  # 每次状态翻转累加的惩罚值
+    "flap_suppress_limit": 2000,  # 惩罚值超过该值暂停告警
+    "flap_reuse_limit": 750,  # 惩罚值低于该值恢复告警
+    "flap_half_life": 300,  # 惩罚值半衰期（秒）
+    "metrics_host": "127.0.0.1",  # Prometheus 指标接口监听地址
+    "metrics_port": 10087,  # Prometheus 指标接口端口，0 为关闭
+    "log_mode": "changes",  # 日志模式：changes 只记状态变化 + 定期汇总，all 记录每次探测
+    "log_format": "text",  # 日志格式：text 或 json（JSON Lines）
+    "log_summary_interval": 300,  # changes 模式下汇总间隔（秒）
+    "log_flush_interval": 5,  # 日志缓冲最长停留时间（秒）
+    "log_max_bytes": 10485760,  # 单个日志文件上限，超过后轮转
+    "log_rotate_daily": True,  # 跨天时轮转
+    "log_backup_count": 7  # 保留的压缩旧日志份数
+}
+
+# 常用服务端口映射
+SERVICE_PORTS = {
+    22: "SSH",
+    80: "HTTP",
+    443: "HTTPS",
+    3000: "Node.js",
+    3306: "MySQL",
+    5432: "PostgreSQL",
+    5678: "N8N",
+    6379: "Redis",
+    8080: "Dify",
+    8188: "ComfyUI",
+    8765: "Dify Upload",
+    11434: "Ollama API",
+    27017: "MongoDB",
+    5000: "Win 进程管理",
+    5003: "ComfyUI/N8N",
+    8000: "Django",
+    8888: "Jupyter",
+    9090: "Prometheus",
+    9200: "Elasticsearch",
+    2375: "Docker",
+    2376: "Docker TLS",
+}
+
+
+def load_config():
+    """加载配置文件，缺失的项取默认值"""
+    if CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                config = json.load(f)
+                # 合并默认配置
+                merged = DEFAULT_CONFIG.copy()
+                merged.update(config)
+                return merged
+        except Exception as e:
+            print(f"⚠️ 配置文件读取失败: {e}")
+
+    # 创建默认配置
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(DEFAULT_CONFIG, f, indent=4, ensure_ascii=False)
+
+    return DEFAULT_CONFIG.copy()
+
+
+def service_name(port, name=None):
+    """获取服务名称"""
+    return name or SERVICE_PORTS.get(port, f"Port-{port}")
+
+
+def check_port(ip, port, timeout=1):
+    """检查端口是否可达"""
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def get_local_ip():
+    """获取 WSL IP"""
+    try:
+        result = subprocess.run(
+            ["hostname", "-I"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        if result.stdout:
+            return result.stdout.strip().split()[0]
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return "127.0.0.1"
+
+
+def parse_default_gateway(route_table):
+    """从 /proc/net/route 内容中找出 metric 最小的默认网关"""
+    best = None
+    for line in route_table.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 7 or fields[1] != "00000000":
+            continue
+        try:
+            flags = int(fields[3], 16)
+            gateway = int(fields[2], 16)
+            metric = int(fields[6])
+        except ValueError:
+            continue
+        if flags & RTF_UP and flags & RTF_GATEWAY and gateway:
+            if best is None or metric < best[0]:
+                best = (metric, socket.inet_ntoa(struct.pack("<I", gateway)))
+    return best[1] if best else None
+
+
+def _resolv_nameserver():
+    """备用方法：/etc/resolv.conf 中第一个非本机 nameserver（WSL 下即 Windows 主机）"""
+    try:
+        with open(RESOLV_FILE, "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver" and not parts[1].startswith("127."):
+                    return parts[1]
+    except OSError:
+        pass
+    return None
+
+
+def get_windows_ip():
+    """获取 Windows IP（WSL 默认网关）
+
+    读取 /proc/net/route 并按内容哈希缓存到 .gateway_cache：
+    路由表未变化且未超过 TTL 时直接返回缓存，不启动子进程、不做端口探测
+    """
+    try:
+        route_table = ROUTE_FILE.read_bytes()
+    except OSError:
+        route_table = b""
+    route_hash = hashlib.sha1(route_table).hexdigest()
+
+    try:
+        cache = json.loads(GATEWAY_CACHE.read_text())
+        if cache.get("route_hash") == route_hash and time.time() - cache.get("resolved_at", 0) < GATEWAY_TTL:
+            return cache["ip"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    ip = parse_default_gateway(route_table.decode(errors="replace")) or _resolv_nameserver() or FALLBACK_WINDOWS_IP
+    try:
+        tmp = GATEWAY_CACHE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"ip": ip, "route_hash": route_hash, "resolved_at": time.time()}))
+        os.replace(tmp, GATEWAY_CACHE)
+    except OSError:
+        pass
+    return ip
+
+
+def load_status():
+    """加载上次状态 {"host:port": "UP"/"DOWN"}"""
+    try:
+        with open(STATUS_FILE, "r") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # 兼容旧格式：只有端口号的 key 视为 Windows 端口
+    return {(f"windows:{k}" if k.isdigit() else k): v for k, v in status.items()}
+
+
+def save_status(status):
+    """保存状态（先写临时文件再替换，避免读到半截文件）"""
+    STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATUS_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, STATUS_FILE)
+
+
+def append_alert(message):
+    """追加告警到队列文件，由 alert_consumer.py 发送"""
+    while True:
+        with open(ALERT_QUEUE, "a", encoding="utf-8") as f:
+            # 与 alert_consumer 的队列压缩互斥；压缩会用新文件替换队列，拿到锁后文件已被替换则重新打开
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.stat(ALERT_QUEUE).st_ino != os.fstat(f.fileno()).st_ino:
+                    continue
+            except FileNotFoundError:
+                continue
+            f.write(f"{datetime.now().isoformat()}|{message}\n")
+            return
+
+
+class _StatusHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            request = {}
+        cmd = request.get("cmd", "status")
+        if cmd == "status":
+            response = {"ok": True, **self.server.snapshot()}
+        elif cmd == "ping":
+            response = {"ok": True}
+        else:
+            response = {"ok": False, "error": f"未知命令: {cmd}"}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class StatusServer:
+    """守护进程的 Unix socket 状态接口，Cron 客户端直接读取内存中的最新状态"""
+
+    def __init__(self, snapshot, path=SOCKET_PATH):
+        self.path = Path(path)
+        self._server = None
+        self._thread = None
+        self._snapshot = snapshot
+
+    def start(self):
+        # 清理上次异常退出残留的 socket 文件
+        if self.path.exists():
+            if query_daemon("ping", path=self.path) is not None:
+                raise RuntimeError(f"已有守护进程在运行: {self.path}")
+            self.path.unlink()
+        self._server = _UnixServer(str(self.path), _StatusHandler)
+        self._server.snapshot = self._snapshot
+        self._thread = threading.Thread(target=self._server.serve_forever, name="status-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def query_daemon(cmd="status", path=SOCKET_PATH, timeout=0.5):
+    """向守护进程发请求，守护进程未运行时返回 None"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps({"cmd": cmd}).encode() + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
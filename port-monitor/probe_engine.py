@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Probe Engine - 并发端口探测引擎
+基于 asyncio 的非阻塞 connect，每个探测有独立的超时，并通过信号量限制并发数，
+几百个 host:port 目标也能在大约一个超时窗口内扫完
+
+除 TCP 连通性外，还可按协议做应用层健康检查（见 health_probes.py），
+事件循环常驻，HTTP / Redis 连接跨轮次复用
+"""
+
+import asyncio
+import socket
+import time
+
+from health_probes import PROBES, ConnectionPool, ProbeError
+
+# 默认参数
+DEFAULT_TIMEOUT = 1.0
+DEFAULT_CONCURRENCY = 200
+
+
+class ProbeEngine:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY):
+        self.timeout = timeout
+        self.concurrency = max(1, int(concurrency))
+        # 事件循环常驻，避免每轮扫描重复创建，也让连接池可以跨轮次复用
+        self._loop = asyncio.new_event_loop()
+        self.pool = ConnectionPool()
+
+    async def probe_tcp(self, host, port, timeout=None):
+        """非阻塞 TCP connect 探测，返回 {"host", "port", "up", "latency", "error", "detail"}"""
+        timeout = self.timeout if timeout is None else timeout
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        result = {"host": host, "port": port, "up": False, "latency": None, "error": None, "detail": None}
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, (host, port)), timeout)
+            result["up"] = True
+            result["latency"] = time.monotonic() - start
+        except asyncio.TimeoutError:
+            result["error"] = "timeout"
+        except OSError as e:
+            result["error"] = e.strerror or str(e)
+        finally:
+            sock.close()
+        return result
+
+    async def probe(self, host, port, timeout=None, protocol="tcp", options=None):
+        """按协议探测，latency 为整个请求的耗时"""
+        if protocol == "tcp":
+            return await self.probe_tcp(host, port, timeout)
+
+        timeout = self.timeout if timeout is None else timeout
+        result = {"host": host, "port": port, "up": False, "latency": None, "error": None, "detail": None}
+        start = time.monotonic()
+        try:
+            result["detail"] = await asyncio.wait_for(
+                PROBES[protocol](self.pool, host, port, timeout, options or {}), timeout
+            )
+            result["up"] = True
+            result["latency"] = time.monotonic() - start
+        except asyncio.TimeoutError:
+            result["error"] = "timeout"
+        except ProbeError as e:
+            result["error"] = str(e)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            result["error"] = getattr(e, "strerror", None) or str(e) or type(e).__name__
+        except Exception as e:
+            # 探测函数的意外错误只算该目标失败，不中断整轮扫描
+            result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    async def _probe_all(self, targets):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(host, port, timeout=None, protocol="tcp", options=None):
+            async with semaphore:
+                return await self.probe(host, port, timeout, protocol, options)
+
+        return await asyncio.gather(*(run_one(*target) for target in targets))
+
+    def sweep(self, targets):
+        """并发探测一批 (host, port[, timeout[, protocol[, options]]])，按输入顺序返回结果列表"""
+        targets = list(targets)
+        if not targets:
+            return []
+        return self._loop.run_until_complete(self._probe_all(targets))
+
+    def close(self):
+        """关闭事件循环"""
+        if not self._loop.is_closed():
+            self._loop.run_until_complete(self.pool.close())
+            self._loop.close()
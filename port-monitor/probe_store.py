@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Probe Store - 端口探测结果时序存储
+每个目标一个目录，包含三个定长记录的环形文件：
+- raw.ring    每次探测的原始结果（时间、是否可达、连接耗时）
+- minute.ring 按分钟汇总（次数、可达次数、状态翻转次数、耗时直方图）
+- hour.ring   按小时汇总（同上）
+
+查询接口可统计任意时间窗口的可用率、p50/p95/p99 连接耗时和翻转次数
+
+用法：
+    python3 probe_store.py list
+    python3 probe_store.py stats --window 24h
+    python3 probe_store.py stats --target windows:11434 --window 7d
+"""
+
+import sys
+import math
+import time
+import struct
+import argparse
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+SKILL_DIR = Path(__file__).parent
+DEFAULT_DIR = SKILL_DIR / "history"
+
+# 环形文件容量（记录数）
+RAW_CAPACITY = 100000     # 30 秒间隔约 35 天
+MINUTE_CAPACITY = 43200   # 30 天
+HOUR_CAPACITY = 17520     # 2 年
+
+# 耗时直方图分桶上界（毫秒），最后一个桶为溢出桶
+LATENCY_BOUNDS_MS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75,
+                     100, 150, 200, 300, 500, 750, 1000, 2000, 5000)
+NUM_BINS = len(LATENCY_BOUNDS_MS) + 1
+
+# 文件头：magic、记录长度、容量、写入位置、记录数
+HEADER = struct.Struct("<4sIIII")
+HEADER_SIZE = 32
+MAGIC = b"PRB1"
+
+# 原始记录：时间戳、耗时（秒，不可达为 -1）、是否可达
+RAW_RECORD = struct.Struct("<dfB3x")
+# 汇总记录：桶起始时间、次数、可达次数、翻转次数、末次状态、耗时直方图
+ROLLUP_RECORD = struct.Struct(f"<IIIHB1x{NUM_BINS}I")
+
+
+def latency_bin(latency):
+    """耗时（秒）所属的直方图分桶"""
+    ms = latency * 1000
+    for i, bound in enumerate(LATENCY_BOUNDS_MS):
+        if ms <= bound:
+            return i
+    return NUM_BINS - 1
+
+
+def parse_window(text):
+    """解析时间窗口，如 30m / 24h / 7d，返回秒数"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+class RingFile:
+    """定长记录的环形文件，写满后覆盖最旧的记录"""
+
+    def __init__(self, path, record, capacity):
+        self.path = Path(path)
+        self.record = record
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+        self._f = None
+
+    def _open(self):
+        if self._f:
+            return
+        if self.path.exists():
+            self._f = open(self.path, "r+b")
+            self._read_header(self._f)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "w+b")
+            self._write_header()
+
+    def _read_header(self, f):
+        f.seek(0)
+        magic, size, capacity, head, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != self.record.size:
+            raise ValueError(f"环形文件格式不匹配: {self.path}")
+        self.capacity, self.head, self.count = capacity, head, count
+
+    def _write_header(self):
+        self._f.seek(0)
+        header = HEADER.pack(MAGIC, self.record.size, self.capacity, self.head, self.count)
+        self._f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+    def append(self, *values):
+        """追加一条记录"""
+        self._open()
+        self._f.seek(HEADER_SIZE + self.head * self.record.size)
+        self._f.write(self.record.pack(*values))
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._write_header()
+        self._f.flush()
+
+    def read_all(self):
+        """按时间顺序读出所有记录"""
+        if not self.path.exists():
+            return []
+        with open(self.path, "rb") as f:
+            self._read_header(f)
+            f.seek(HEADER_SIZE)
+            data = f.read(self.capacity * self.record.size)
+        size = self.record.size
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            chunk = data[start * size:(start + self.count) * size]
+        else:
+            chunk = data[start * size:] + data[:self.head * size]
+        return list(self.record.iter_unpack(chunk))
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+
+class Rollup:
+    """按固定时间桶汇总探测结果，桶结束时写入环形文件"""
+
+    def __init__(self, ring, span):
+        self.ring = ring
+        self.span = span
+        self.bucket = None
+        self.last_up = None
+
+    def add(self, ts, up, latency):
+        bucket = int(ts // self.span)
+        if self.bucket is not None and bucket != self.bucket["start"]:
+            self.flush()
+        if self.bucket is None:
+            self.bucket = {"start": bucket, "total": 0, "up": 0, "flaps": 0, "bins": [0] * NUM_BINS}
+        b = self.bucket
+        b["total"] += 1
+        if up:
+            b["up"] += 1
+            b["bins"][latency_bin(latency)] += 1
+        if self.last_up is not None and self.last_up != up:
+            b["flaps"] += 1
+        self.last_up = up
+
+    def flush(self):
+        """写出当前未完成的桶"""
+        if self.bucket is None:
+            return
+        b = self.bucket
+        self.ring.append(b["start"], b["total"], b["up"], b["flaps"], int(bool(self.last_up)), *b["bins"])
+        self.bucket = None
+
+
+class ProbeStore:
+    def __init__(self, root=DEFAULT_DIR, raw_capacity=RAW_CAPACITY,
+                 minute_capacity=MINUTE_CAPACITY, hour_capacity=HOUR_CAPACITY):
+        self.root = Path(root)
+        self.raw_capacity = raw_capacity
+        self.minute_capacity = minute_capacity
+        self.hour_capacity = hour_capacity
+        self._series = {}
+
+    def _dir(self, key):
+        return self.root / quote(key, safe="")
+
+    def _rings(self, key):
+        d = self._dir(key)
+        return (
+            RingFile(d / "raw.ring", RAW_RECORD, self.raw_capacity),
+            RingFile(d / "minute.ring", ROLLUP_RECORD, self.minute_capacity),
+            RingFile(d / "hour.ring", ROLLUP_RECORD, self.hour_capacity),
+        )
+
+    def record(self, key, ts, up, latency):
+        """记录一次探测结果"""
+        series = self._series.get(key)
+        if series is None:
+            raw, minute, hour = self._rings(key)
+            series = {"raw": raw, "minute": Rollup(minute, 60), "hour": Rollup(hour, 3600)}
+            self._series[key] = series
+        latency = latency if up and latency is not None else -1.0
+        series["raw"].append(ts, latency, int(bool(up)))
+        series["minute"].add(ts, up, latency)
+        series["hour"].add(ts, up, latency)
+
+    def targets(self):
+        """已有记录的目标列表"""
+        if not self.root.exists():
+            return []
+        return sorted(unquote(d.name) for d in self.root.iterdir() if d.is_dir())
+
+    def query(self, key, since, until=None):
+        """统计 [since, until] 内的可用率、耗时分位数和翻转次数"""
+        until = time.time() if until is None else until
+        raw, minute, hour = self._rings(key)
+        samples = [r for r in raw.read_all() if since <= r[0] <= until]
+        raw_start = samples[0][0] if samples else until
+
+        # 原始记录覆盖不到的部分用汇总桶补齐，优先分钟桶
+        buckets = []
+        for ring, span in ((minute, 60), (hour, 3600)):
+            rows = [r for r in ring.read_all()
+                    if r[0] * span >= since and (r[0] + 1) * span <= raw_start]
+            if rows:
+                buckets = rows
+                break
+
+        total = sum(b[1] for b in buckets) + len(samples)
+        up = sum(b[2] for b in buckets) + sum(r[2] for r in samples)
+        flaps = sum(b[3] for b in buckets)
+        last = buckets[-1][4] if buckets else None
+        for r in samples:
+            if last is not None and r[2] != last:
+                flaps += 1
+            last = r[2]
+
+        latencies = sorted(r[1] for r in samples if r[2])
+        if buckets:
+            bins = [0] * NUM_BINS
+            for b in buckets:
+                for i, n in enumerate(b[5:]):
+                    bins[i] += n
+            for latency in latencies:
+                bins[latency_bin(latency)] += 1
+            percentile = lambda q: _histogram_percentile(bins, q)
+        else:
+            percentile = lambda q: _exact_percentile(latencies, q)
+
+        return {
+            "target": key,
+            "since": since,
+            "until": until,
+            "samples": total,
+            "uptime": up / total * 100 if total else None,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "flaps": flaps,
+            "approximate": bool(buckets),
+        }
+
+    def close(self):
+        """写出未完成的汇总桶并关闭文件"""
+        for series in self._series.values():
+            series["minute"].flush()
+            series["hour"].flush()
+            for ring in (series["raw"], series["minute"].ring, series["hour"].ring):
+                ring.close()
+        self._series = {}
+
+
+def _exact_percentile(values, q):
+    """精确分位数（毫秒）"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index] * 1000
+
+
+def _histogram_percentile(bins, q):
+    """直方图分位数（毫秒），取所在分桶的上界"""
+    total = sum(bins)
+    if not total:
+        return None
+    rank = math.ceil(q * total)
+    seen = 0
+    for i, n in enumerate(bins):
+        seen += n
+        if seen >= rank:
+            return LATENCY_BOUNDS_MS[min(i, len(LATENCY_BOUNDS_MS) - 1)]
+    return LATENCY_BOUNDS_MS[-1]
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe Store - 端口探测历史查询")
+    parser.add_argument("action", choices=["list", "stats"], help="操作")
+    parser.add_argument("--target", "-t", help="目标（host:port），默认全部")
+    parser.add_argument("--window", "-w", default="24h", help="时间窗口，如 30m / 24h / 7d")
+    parser.add_argument("--dir", default=str(DEFAULT_DIR), help="存储目录")
+    args = parser.parse_args()
+
+    store = ProbeStore(args.dir)
+    targets = store.targets()
+
+    if args.action == "list":
+        if not targets:
+            print("暂无探测记录")
+        for key in targets:
+            print(f"  {key}")
+        return
+
+    try:
+        window = parse_window(args.window)
+    except ValueError:
+        print(f"❌ 时间窗口格式错误: {args.window}")
+        sys.exit(1)
+
+    if args.target:
+        if args.target not in targets:
+            print(f"❌ 没有该目标的记录: {args.target}")
+            sys.exit(1)
+        targets = [args.target]
+
+    since = time.time() - window
+    print(f"\n📈 最近 {args.window} 探测统计：")
+    print("-" * 72)
+    print(f"{'目标':<24}{'样本':>8}{'可用率':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'翻转':>6}")
+    approximate = False
+    for key in targets:
+        s = store.query(key, since)
+        approximate = approximate or s["approximate"]
+        uptime = "-" if s["uptime"] is None else f"{s['uptime']:.2f}%"
+        mark = " ≈" if s["approximate"] else ""
+        print(f"{key:<24}{s['samples']:>8}{uptime:>10}{format_ms(s['p50']):>10}"
+              f"{format_ms(s['p95']):>10}{format_ms(s['p99']):>10}{s['flaps']:>6}{mark}")
+    if approximate:
+        print("\n≈ 部分数据来自汇总桶，分位数为直方图近似值")
+
+
+if __name__ == "__main__":
+    main()
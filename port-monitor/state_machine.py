@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+State Machine - 端口状态机（迟滞 + 抖动抑制）
+- N-of-M：最近 M 次探测中失败 N 次才判定 DOWN，成功 N 次才判定恢复，
+  单次 SYN 丢包不会触发告警
+- 可疑目标（结果与当前状态相反但未达阈值）快速复测，不用等满一个检测间隔
+- 抖动抑制：每次状态翻转累加惩罚值，按半衰期指数衰减；
+  超过抑制阈值后暂停告警和快速复测，降到恢复阈值以下再解除
+"""
+
+import math
+from collections import deque
+
+# 默认参数
+DEFAULT_FAIL_THRESHOLD = 2
+DEFAULT_WINDOW = 3
+DEFAULT_RECOVER_THRESHOLD = 2
+DEFAULT_PENALTY = 1000
+DEFAULT_SUPPRESS_LIMIT = 2000
+DEFAULT_REUSE_LIMIT = 750
+DEFAULT_HALF_LIFE = 300
+
+
+class Transition:
+    """一次观测的结果"""
+
+    def __init__(self, old, new, notify=False, suppress_started=False, suppress_ended=False):
+        self.old = old
+        self.new = new
+        self.changed = old != new
+        self.notify = notify
+        self.suppress_started = suppress_started
+        self.suppress_ended = suppress_ended
+
+
+class TargetState:
+    def __init__(self, fail_threshold=DEFAULT_FAIL_THRESHOLD, window=DEFAULT_WINDOW,
+                 recover_threshold=DEFAULT_RECOVER_THRESHOLD, penalty=DEFAULT_PENALTY,
+                 suppress_limit=DEFAULT_SUPPRESS_LIMIT, reuse_limit=DEFAULT_REUSE_LIMIT,
+                 half_life=DEFAULT_HALF_LIFE):
+        self.window = max(1, window)
+        self.fail_threshold = min(max(1, fail_threshold), self.window)
+        self.recover_threshold = min(max(1, recover_threshold), self.window)
+        self.penalty_step = penalty
+        self.suppress_limit = suppress_limit
+        self.reuse_limit = reuse_limit
+        self.half_life = half_life
+
+        self.status = "UNKNOWN"
+        self.history = deque(maxlen=self.window)
+        self.penalty = 0.0
+        self.suppressed = False
+        self._penalty_at = None
+
+    def _decay(self, now):
+        if self._penalty_at is not None and self.half_life > 0:
+            self.penalty *= math.pow(2, -(now - self._penalty_at) / self.half_life)
+        self._penalty_at = now
+
+    @property
+    def pending(self):
+        """最近的结果与当前状态相反、但尚未达到翻转阈值"""
+        if not self.history or self.status == "UNKNOWN":
+            return False
+        return self.history[-1] != (self.status == "UP")
+
+    @property
+    def needs_reprobe(self):
+        """是否需要快速复测（抖动抑制期间不复测）"""
+        return self.pending and not self.suppressed
+
+    def observe(self, up, now):
+        """记录一次探测结果，返回 Transition"""
+        old = self.status
+        self.history.append(bool(up))
+        self._decay(now)
+
+        if old == "UNKNOWN":
+            # 第一次探测直接定状态，不告警
+            self.status = "UP" if up else "DOWN"
+            self.history.clear()
+            return Transition(old, self.status)
+
+        failures = sum(1 for ok in self.history if not ok)
+        successes = len(self.history) - failures
+        if old == "UP" and failures >= self.fail_threshold:
+            self.status = "DOWN"
+        elif old == "DOWN" and successes >= self.recover_threshold:
+            self.status = "UP"
+
+        suppress_started = suppress_ended = False
+        if self.status != old:
+            self.history.clear()
+            self.penalty += self.penalty_step
+            if not self.suppressed and self.penalty >= self.suppress_limit:
+                self.suppressed = suppress_started = True
+        elif self.suppressed and self.penalty < self.reuse_limit:
+            self.suppressed = False
+            suppress_ended = True
+
+        notify = self.status != old and not self.suppressed
+        return Transition(old, self.status, notify, suppress_started, suppress_ended)
+
+
+def state_from_config(config):
+    """按全局配置创建状态机"""
+    return TargetState(
+        fail_threshold=config.get("fail_threshold", DEFAULT_FAIL_THRESHOLD),
+        window=config.get("fail_window", DEFAULT_WINDOW),
+        recover_threshold=config.get("recover_threshold", DEFAULT_RECOVER_THRESHOLD),
+        penalty=config.get("flap_penalty", DEFAULT_PENALTY),
+        suppress_limit=config.get("flap_suppress_limit", DEFAULT_SUPPRESS_LIMIT),
+        reuse_limit=config.get("flap_reuse_limit", DEFAULT_REUSE_LIMIT),
+        half_life=config.get("flap_half_life", DEFAULT_HALF_LIFE),
+    )
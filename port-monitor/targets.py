@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Targets - 监控目标模型与调度器
+每个目标独立配置 host/port/protocol/interval/timeout，
+调度器用最小堆按下次到期时间排序，各目标按自己的节奏检测
+"""
+
+import re
+import heapq
+import itertools
+
+# 支持的探测协议（tcp 为连通性检测，其余为应用层健康检查）
+PROTOCOLS = ("tcp", "http", "ollama", "redis", "mysql")
+
+# 协议探测参数，原样传给 health_probes
+OPTION_KEYS = ("path", "expect_status", "body_regex", "tls", "host_header", "password", "require_models")
+
+
+def normalize_target(entry, config):
+    """把配置中的一条目标补全为完整字典，缺省值取全局配置"""
+    if isinstance(entry, int):
+        entry = {"port": entry}
+    if not isinstance(entry, dict) or "port" not in entry:
+        raise ValueError(f"目标配置缺少 port: {entry}")
+
+    try:
+        port = int(entry["port"])
+    except (TypeError, ValueError):
+        raise ValueError(f"端口格式错误: {entry['port']}")
+    if not 0 < port < 65536:
+        raise ValueError(f"端口超出范围: {port}")
+
+    protocol = str(entry.get("protocol", "tcp")).lower()
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"不支持的协议: {protocol}（可选: {', '.join(PROTOCOLS)}）")
+
+    host = str(entry.get("host", "windows"))
+    interval = float(entry.get("interval", config.get("check_interval", 30)))
+    timeout = float(entry.get("timeout", config.get("probe_timeout", 1)))
+    if interval <= 0 or timeout <= 0:
+        raise ValueError(f"interval/timeout 必须大于 0: {host}:{port}")
+
+    options = {k: entry[k] for k in OPTION_KEYS if k in entry}
+    if "body_regex" in options:
+        try:
+            re.compile(options["body_regex"])
+        except re.error as e:
+            raise ValueError(f"body_regex 无效: {e}")
+
+    target = {
+        "host": host,
+        "port": port,
+        "protocol": protocol,
+        "interval": interval,
+        "timeout": timeout,
+        "name": entry.get("name"),
+        "options": options,
+    }
+    # 同一端口可以同时做 TCP 和应用层检查，用协议区分
+    target["key"] = f"{host}:{port}" if protocol == "tcp" else f"{protocol}://{host}:{port}"
+    return target
+
+
+def load_targets(config):
+    """从配置加载目标列表；未配置 targets 时由 critical_ports 生成（兼容旧配置）"""
+    entries = config.get("targets") or config.get("critical_ports", [])
+    targets = {}
+    for entry in entries:
+        target = normalize_target(entry, config)
+        targets[target["key"]] = target
+    return list(targets.values())
+
+
+class TargetScheduler:
+    """按下次到期时间排序的目标调度器"""
+
+    def __init__(self, targets, now):
+        self._heap = []
+        self._seq = itertools.count()
+        for target in targets:
+            self.schedule(target, now)
+
+    def schedule(self, target, due):
+        """安排目标在 due 时刻检测"""
+        heapq.heappush(self._heap, (due, next(self._seq), target))
+
+    def pop_due(self, now):
+        """取出所有已到期的目标，返回 [(due, target)]"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, target = heapq.heappop(self._heap)
+            due.append((when, target))
+        return due
+
+    def seconds_until_next(self, now):
+        """距离下一个目标到期的秒数"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+
+    def __len__(self):
+        return len(self._heap)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Skill 清单
+
+扫描 ~/.openclaw/skills 下的每个 Skill 目录，记录名称、版本、描述、文件哈希和符号链接目标，
+持久化到 ~/.openclaw/cache/skill_index.json，供 auto-learner、feishu/auto_sync、check_skill.py 共用。
+名称、版本、描述来自 frontmatter.py（只解析 SKILL.md 头部，与 metadata.json 的版本对照）。
+
+增量刷新：
+- skills 目录本身的 mtime 不变时沿用上次的目录列表
+- 每个 Skill 只 stat 记录过的子目录和 SKILL.md / metadata.json，都没变化就直接沿用；
+  有变化时重新遍历该 Skill，文件 (大小, mtime) 没变的沿用原哈希
+- 长时间运行的进程可开启 inotify（watch=True），只重新检查收到事件的 Skill
+原地改写且不改变目录 mtime 的普通文件要用 full=True 才能发现。
+
+用法（在 Skill 目录中）：
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from skill_inventory import SkillInventory
+"""
+
+import os
+import sys
+import json
+import errno
+import ctypes
+import ctypes.util
+import hashlib
+import struct
+from pathlib import Path
+
+from atomic_io import atomic_write
+from frontmatter import FrontmatterCache, skill_metadata, CACHE_FILE as FRONTMATTER_FILE
+
+SKILLS_DIR = Path("~/.openclaw/skills").expanduser()
+INDEX_FILE = Path("~/.openclaw/cache/skill_index.json").expanduser()
+INDEX_VERSION = 2
+
+# 不进入、不计算哈希的目录
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv"}
+
+# inotify 常量
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct("iIII")
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(data)
+    return h.hexdigest()
+
+
+def read_metadata(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class InventoryWatcher:
+    """用 inotify 记录哪些 Skill 有变化；不可用时 available 为 False"""
+
+    def __init__(self, skills_dir):
+        self.skills_dir = str(skills_dir)
+        self.fd = None
+        self.wds = {}  # wd -> {Skill 名称}（skills 目录本身为 {None}；符号链接与目标共用同一个 wd）
+        self.dirty = set()
+        self.top_dirty = False
+        self.overflow = False
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self.fd = fd
+                self._add(self.skills_dir, None)
+        except (OSError, AttributeError):
+            self.fd = None
+
+    @property
+    def available(self):
+        return self.fd is not None
+
+    def _add(self, path, name):
+        wd = self.libc.inotify_add_watch(self.fd, path.encode(), WATCH_MASK)
+        if wd >= 0:
+            self.wds.setdefault(wd, set()).add(name)
+
+    def watch_skill(self, name, dirs):
+        """监听一个 Skill 的所有目录（重复添加同一目录是安全的）"""
+        root = os.path.join(self.skills_dir, name)
+        for rel in dirs:
+            self._add(os.path.join(root, rel) if rel else root, name)
+
+    def poll(self):
+        """读出所有待处理事件"""
+        if self.fd is None:
+            return
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return
+                raise
+            pos = 0
+            while pos + INOTIFY_EVENT.size <= len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+                pos += INOTIFY_EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflow = True
+                    continue
+                for name in self.wds.get(wd, ()):
+                    if name is None:
+                        self.top_dirty = True
+                    else:
+                        self.dirty.add(name)
+
+    def take(self):
+        """取出并清空变化记录：(有变化的 Skill 集合, 目录列表是否变化, 是否溢出)"""
+        self.poll()
+        result = (self.dirty, self.top_dirty, self.overflow)
+        self.dirty, self.top_dirty, self.overflow = set(), False, False
+        return result
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SkillInventory:
+    def __init__(self, skills_dir=SKILLS_DIR, index_file=INDEX_FILE, watch=False,
+                 frontmatter_file=FRONTMATTER_FILE):
+        self.skills_dir = Path(skills_dir)
+        self.index_file = Path(index_file)
+        self.dirty = False
+        self.index = {"version": INDEX_VERSION, "root": str(self.skills_dir), "root_mtime_ns": None, "skills": {}}
+        try:
+            data = json.loads(self.index_file.read_text())
+            if data.get("version") == INDEX_VERSION and data.get("root") == str(self.skills_dir):
+                self.index = data
+        except (OSError, ValueError):
+            pass
+        # SKILL.md 头部按文件 stat 单独缓存，Skill 内其他文件变化时不必重新解析
+        self.frontmatter = FrontmatterCache(frontmatter_file)
+        self.watcher = InventoryWatcher(self.skills_dir) if watch else None
+        self._watched = False
+
+    # ---------- 单个 Skill ----------
+
+    def _is_fresh(self, entry):
+        """记录过的目录和关键文件 stat 都没变"""
+        root = Path(entry["path"])
+        if self._link_target(root) != entry["symlink"]:
+            return False
+        for rel, mtime_ns in entry["dirs"].items():
+            try:
+                if os.stat(root / rel if rel else root).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return (_stat_key(root / "SKILL.md") == entry["skill_md"]
+                and _stat_key(root / "metadata.json") == entry["metadata"])
+
+    @staticmethod
+    def _link_target(path):
+        try:
+            return os.readlink(path)
+        except OSError:
+            return None
+
+    def _scan(self, name, old=None):
+        """遍历一个 Skill 目录，(大小, mtime) 未变的文件沿用原哈希"""
+        root = self.skills_dir / name
+        old_files = (old or {}).get("files", {})
+        dirs, files = {}, {}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            directory = root / rel_dir if rel_dir else root
+            try:
+                dirs[rel_dir] = os.stat(directory).st_mtime_ns
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(rel)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                prev = old_files.get(rel)
+                if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                    files[rel] = prev
+                    continue
+                try:
+                    files[rel] = [st.st_size, st.st_mtime_ns, _file_hash(entry.path)]
+                except OSError:
+                    continue
+
+        skill_md = root / "SKILL.md"
+        meta = read_metadata(root / "metadata.json")
+        info = skill_metadata(root, self.frontmatter, meta)
+        return {
+            "name": name,
+            "path": str(root),
+            "symlink": self._link_target(root),
+            "has_skill_md": skill_md.is_file(),
+            "has_metadata": meta is not None,
+            "version": info["version"],
+            "version_source": info["version_source"],
+            "version_conflict": info["version_conflict"],
+            "description": info["description"],
+            "frontmatter": info["frontmatter"],
+            "frontmatter_error": info["frontmatter_error"],
+            "dirs": dirs,
+            "files": files,
+            "skill_md": _stat_key(skill_md),
+            "metadata": _stat_key(root / "metadata.json"),
+        }
+
+    # ---------- 整体刷新 ----------
+
+    def _names(self, force):
+        """skills 目录下的 Skill 目录名（含指向目录的符号链接），目录 mtime 不变时沿用上次结果"""
+        try:
+            mtime = os.stat(self.skills_dir).st_mtime_ns
+        except OSError:
+            return []
+        if not force and mtime == self.index["root_mtime_ns"]:
+            return list(self.index["skills"])
+        names = []
+        for entry in os.scandir(self.skills_dir):
+            if entry.name.startswith(".") or entry.name in SKIP_DIRS:
+                continue
+            try:
+                if entry.is_dir():
+                    names.append(entry.name)
+            except OSError:
+                continue
+        self.index["root_mtime_ns"] = mtime
+        self.dirty = True
+        return names
+
+    def refresh(self, full=False):
+        """刷新清单，返回按名称排序的 Skill 列表；full=True 时每个文件都重新 stat"""
+        skills = self.index["skills"]
+        check = None  # None 表示逐个检查全部 Skill
+        force_names = full
+        if self.watcher and self.watcher.available and self._watched and not full:
+            changed, top_changed, overflow = self.watcher.take()
+            if not overflow:
+                check = changed
+                force_names = top_changed
+
+        names = self._names(force_names)
+        for name in list(skills):
+            if name not in names:
+                del skills[name]
+                self.dirty = True
+        for name in names:
+            old = skills.get(name)
+            if old is not None and not full:
+                if check is not None and name not in check:
+                    continue
+                if self._is_fresh(old):
+                    continue
+            entry = self._scan(name, old)
+            if entry != old:
+                skills[name] = entry
+                self.dirty = True
+            if self.watcher and self.watcher.available:
+                self.watcher.watch_skill(name, entry["dirs"])
+        if self.watcher and self.watcher.available and not self._watched:
+            # 首次刷新后为所有 Skill 加上监听
+            for name, entry in skills.items():
+                self.watcher.watch_skill(name, entry["dirs"])
+            self._watched = True
+        self.frontmatter.prune(str(self.skills_dir / name / "SKILL.md") for name in skills)
+        self.save()
+        return [skills[name] for name in sorted(skills)]
+
+    def save(self):
+        self.frontmatter.save()
+        if self.dirty:
+            atomic_write(self.index_file, json.dumps(self.index, ensure_ascii=False), lock=False)
+            self.dirty = False
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+
+
+def load_skills(full=False):
+    """刷新并返回所有 Skill（一次性使用）"""
+    return SkillInventory().refresh(full)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Skill 清单")
+    parser.add_argument("--full", action="store_true", help="逐个文件重新检查")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    skills = load_skills(args.full)
+    if args.json:
+        print(json.dumps(skills, ensure_ascii=False, indent=2))
+        return
+    for s in skills:
+        link = f" -> {s['symlink']}" if s["symlink"] else ""
+        warn = " ⚠️ 版本不一致" if s["version_conflict"] else ""
+        print(f"{s['name']:<24} {s['version'] or '-':<10} {len(s['files']):>4} 个文件{link}{warn}")
+    print(f"共 {len(skills)} 个")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,13 @@
 #!/bin/bash
 # 检查所有服务状态
 
+# 监听端口清单：只读取一次 /proc/net，按端口精确匹配
+INVENTORY="$(cd "$(dirname "$0")/.." && pwd)/port-monitor/listener_inventory.py"
+LISTENING="$(python3 "$INVENTORY" ports 2>/dev/null)"
+is_listening() {
+    echo "$LISTENING" | grep -qx "$1"
+}
+
 echo "========================================="
 echo "📊 OpenClaw 常驻服务状态"
 echo "========================================="
@@ -8,7 +15,7 @@ echo ""
 
 # Port Manager
 echo -n "📡 Port Manager (10086): "
-if ss -tuln | grep -q ":10086 "; then
+if is_listening 10086; then
     echo "✅ 运行中"
 else
     echo "❌ 未运行"
@@ -16,7 +23,7 @@ fi
 
 # OpenLLM Monitor
 echo -n "📊 OpenLLM Monitor (3000): "
-if ss -tuln | grep -q ":3000 "; then
+if is_listening 3000; then
     echo "✅ 运行中"
 else
     echo "❌ 未运行"
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Service Graph - 声明式服务依赖图
+从 services.json 读取服务定义（name / command / cwd / ready_check / depends_on），
+校验后按依赖分层：同一层的服务互不依赖，可以并发启动
+"""
+
+import os
+import json
+import shlex
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).resolve().parent
+SKILLS_DIR = SKILL_DIR.parent
+SERVICES_FILE = SKILL_DIR / "services.json"
+
+READY_KINDS = ("tcp", "unix")
+
+
+def _resolve_path(value):
+    """~ 展开为家目录，相对路径相对 skills 目录"""
+    path = Path(os.path.expanduser(str(value)))
+    return str(path if path.is_absolute() else SKILLS_DIR / path)
+
+
+def normalize_service(entry):
+    """补全并校验一条服务定义，错误时抛出 ValueError"""
+    if not isinstance(entry, dict) or not entry.get("name") or not entry.get("command"):
+        raise ValueError(f"服务定义缺少 name 或 command: {entry}")
+    name = str(entry["name"])
+
+    command = entry["command"]
+    if isinstance(command, str):
+        command = shlex.split(command)
+    if not isinstance(command, list) or not command:
+        raise ValueError(f"{name}: command 必须是字符串或列表")
+
+    ready = entry.get("ready_check")
+    if ready is not None:
+        if not isinstance(ready, dict) or not any(k in ready for k in READY_KINDS):
+            raise ValueError(f"{name}: ready_check 需要 tcp 或 unix")
+        ready = dict(ready)
+        if "unix" in ready:
+            ready["unix"] = _resolve_path(ready["unix"])
+
+    depends_on = entry.get("depends_on", [])
+    if isinstance(depends_on, str):
+        depends_on = [depends_on]
+
+    service = {
+        "name": name,
+        "command": [str(arg) for arg in command],
+        "cwd": _resolve_path(entry["cwd"]) if entry.get("cwd") else None,
+        "ready_check": ready,
+        "depends_on": [str(dep) for dep in depends_on],
+    }
+    if "ready_timeout" in entry:
+        service["ready_timeout"] = float(entry["ready_timeout"])
+    return service
+
+
+def start_waves(services):
+    """按依赖分层（Kahn 拓扑排序），返回 [[服务名, ...], ...]；有环或依赖不存在时抛出 ValueError"""
+    names = {s["name"] for s in services}
+    pending = {}
+    for service in services:
+        missing = [dep for dep in service["depends_on"] if dep not in names]
+        if missing:
+            raise ValueError(f"{service['name']}: 依赖的服务不存在: {', '.join(missing)}")
+        pending[service["name"]] = set(service["depends_on"])
+
+    waves = []
+    while pending:
+        wave = sorted(name for name, deps in pending.items() if not deps)
+        if not wave:
+            raise ValueError(f"服务依赖存在环: {', '.join(sorted(pending))}")
+        waves.append(wave)
+        for name in wave:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(wave)
+    return waves
+
+
+def load_services(path=SERVICES_FILE):
+    """读取并校验服务依赖图"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("services", []) if isinstance(data, dict) else data
+
+    services = []
+    seen = set()
+    for entry in entries:
+        service = normalize_service(entry)
+        if service["name"] in seen:
+            raise ValueError(f"服务名重复: {service['name']}")
+        seen.add(service["name"])
+        services.append(service)
+    start_waves(services)
+    return services
+
+
+def critical_path(services, timings):
+    """根据各服务就绪时刻，沿最晚就绪的依赖回溯出关键路径"""
+    by_name = {s["name"]: s for s in services}
+    done = [name for name in timings if timings[name].get("ready_at") is not None]
+    if not done:
+        return []
+    path = [max(done, key=lambda n: timings[n]["ready_at"])]
+    while True:
+        deps = [d for d in by_name[path[-1]]["depends_on"] if d in done]
+        if not deps:
+            break
+        path.append(max(deps, key=lambda n: timings[n]["ready_at"]))
+    return path[::-1]
@@ -1,19 +1,47 @@
 #!/bin/bash
 # 启动所有常驻服务
+# 默认交给 supervisor.py 管理（跟踪进程、就绪检查、退避重启）；
+# --no-supervisor 时按旧方式逐个 nohup 启动
 
 SKILL_DIR="/home/lhj/.openclaw/skills/startup-launcher"
 LOG_DIR="$SKILL_DIR/logs"
 
 mkdir -p "$LOG_DIR"
 
+# 监听端口清单：只读取一次 /proc/net，按端口精确匹配
+INVENTORY="$(cd "$(dirname "$0")/.." && pwd)/port-monitor/listener_inventory.py"
+LISTENING="$(python3 "$INVENTORY" ports 2>/dev/null)"
+is_listening() {
+    echo "$LISTENING" | grep -qx "$1"
+}
+
 echo "========================================="
 echo "🚀 启动 OpenClaw 常驻服务"
 echo "========================================="
 
+if [ "$1" != "--no-supervisor" ]; then
+    SUPERVISOR="$(cd "$(dirname "$0")" && pwd)/supervisor.py"
+    echo ""
+    if python3 "$SUPERVISOR" status | grep -q "Supervisor 运行中"; then
+        echo "✅ Supervisor 已在运行"
+    else
+        nohup python3 "$SUPERVISOR" run >> "$LOG_DIR/supervisor.log" 2>&1 &
+        echo "🚀 Supervisor 已启动 (PID: $!)，日志: $LOG_DIR/supervisor.log"
+        sleep 2
+    fi
+    echo ""
+    python3 "$SUPERVISOR" status
+    echo ""
+    echo "📋 服务地址："
+    echo "   - Port Manager: http://localhost:10086"
+    echo "   - OpenLLM Monitor: http://localhost:3000"
+    exit 0
+fi
+
 # 1. 启动 Port Manager (10086)
 echo ""
 echo "📡 启动 Port Manager (10086)..."
-if ss -tuln | grep -q ":10086 "; then
+if is_listening 10086; then
     echo "   ✅ Port Manager 已运行"
 else
     cd ~/.openclaw/workspace/port_manager
@@ -24,7 +52,7 @@ fi
 # 2. 启动 OpenLLM Monitor (3000)
 echo ""
 echo "📊 启动 OpenLLM Monitor (3000)..."
-if ss -tuln | grep -q ":3000 "; then
+if is_listening 3000; then
     echo "   ✅ OpenLLM Monitor 已运行"
 else
     cd ~/.openclaw/workspace/OpenLLM-Monitor
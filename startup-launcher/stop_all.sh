@@ -7,6 +7,11 @@ echo "========================================="
 echo "🛑 停止 OpenClaw 常驻服务"
 echo "========================================="
 
+# 0. 停止 Supervisor（会先停掉它管理的服务）
+echo ""
+echo "🛑 停止 Supervisor..."
+python3 "$(cd "$(dirname "$0")" && pwd)/supervisor.py" stop | sed 's/^/   /'
+
 # 1. 停止 Port Manager
 echo ""
 echo "🛑 停止 Port Manager..."
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""
+Supervisor - 常驻服务守护进程
+代替 start_all.sh 里的 nohup &，由本进程持有所有子进程：
+- 每个服务写 pidfile（run/<服务名>.pid），重复启动时先接管仍在运行的进程，不会起第二份
+- 端口已被其他进程占用（例如手动启动的）时不再启动，只观察，对方退出后再接管
+- 启动后等待就绪检查（TCP 端口 / Unix socket）通过才算启动成功，超时按失败处理
+- 退出或启动失败按指数退避重启；稳定运行一段时间后清零退避
+- SIGCHLD 唤醒后立即回收子进程，不留僵尸；接管的非子进程用 pidfd 监听退出
+- 服务定义在 services.json：互不依赖的服务并发启动，依赖方等依赖就绪后再启动，
+  全部就绪后输出各服务的启动耗时和关键路径
+
+用法：
+  python3 supervisor.py run     # 前台运行（start_all.sh 会放到后台）
+  python3 supervisor.py status  # 查看各服务状态
+  python3 supervisor.py plan    # 查看启动分层
+  python3 supervisor.py report  # 查看最近一次启动的耗时明细
+  python3 supervisor.py stop    # 停止守护进程及其管理的服务
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import select
+import signal
+import socket
+import argparse
+import selectors
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from service_graph import SERVICES_FILE, critical_path, load_services, start_waves
+
+SKILL_DIR = Path(__file__).resolve().parent
+RUN_DIR = SKILL_DIR / "run"
+LOG_DIR = SKILL_DIR / "logs"
+SUPERVISOR_PID = RUN_DIR / "supervisor.pid"
+STARTUP_REPORT = RUN_DIR / "startup.json"
+
+READY_TIMEOUT = 60      # 默认就绪等待时间（秒）
+READY_POLL = 0.25       # 启动中就绪检查间隔
+EXTERNAL_POLL = 5       # 外部进程占用端口时的检查间隔
+BACKOFF_BASE = 1        # 重启退避起点（秒）
+BACKOFF_MAX = 300       # 重启退避上限
+STABLE_AFTER = 60       # 就绪后稳定运行多久清零退避
+STOP_TIMEOUT = 15       # 停止时等待子进程退出的时间
+
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def pidfile(name):
+    return RUN_DIR / f"{name}.pid"
+
+
+def read_pid(path):
+    try:
+        return int(Path(path).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_pid(path, pid):
+    """原子写入 pidfile"""
+    RUN_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(f"{pid}\n")
+    os.replace(tmp, path)
+
+
+def remove_pid(path, pid=None):
+    """删除 pidfile；给出 pid 时只删除属于该进程的文件"""
+    if pid is not None and read_pid(path) != pid:
+        return
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # 僵尸进程也算已退出
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def pid_argv(pid):
+    """/proc/<pid>/cmdline 按 NUL 拆分的参数列表"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    return [arg.decode(errors="replace") for arg in data.split(b"\0")[:-1]]
+
+
+def pid_matches(pid, command):
+    """pid 仍在运行且命令行与服务一致（防止 pid 被复用后误接管）
+
+    逐个比较参数的文件名；允许前面多出解释器（脚本经 shebang 启动时 argv 以解释器开头）
+    """
+    argv = [os.path.basename(arg) for arg in pid_argv(pid)]
+    expected = [os.path.basename(arg) for arg in command]
+    return (len(argv) >= len(expected) and argv[len(argv) - len(expected):] == expected
+            and pid_alive(pid))
+
+
+def probe_ready(ready, timeout=0.5):
+    """就绪检查：能连上 TCP 端口或 Unix socket"""
+    if not ready:
+        return True
+    if "tcp" in ready:
+        family, address = socket.AF_INET, (ready.get("host", "127.0.0.1"), ready["tcp"])
+    else:
+        family, address = socket.AF_UNIX, ready["unix"]
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(address)
+        return True
+    except OSError:
+        return False
+
+
+def open_pidfd(pid):
+    """打开 pidfd（Linux 5.3+），不支持时返回 None，改为轮询"""
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+class Service:
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec["name"]
+        self.command = spec["command"]
+        self.ready = spec.get("ready_check")
+        self.ready_timeout = spec.get("ready_timeout", READY_TIMEOUT)
+        self.depends_on = spec.get("depends_on", [])
+        self.pidfile = pidfile(self.name)
+
+        self.state = "stopped"  # stopped / waiting / starting / ready / stopping / backoff / external
+        self.pid = None
+        self.proc = None  # 自己启动的子进程；接管的进程为 None
+        self.pidfd = None
+        self.exited = False
+        self.exit_code = None
+        self.failures = 0
+        self.started_at = None
+        self.ready_at = None
+        self.next_at = 0.0
+        self.stop_deadline = None  # stopping 状态下升级为 SIGKILL 的时间，已发送 SIGKILL 后为 None
+        self.timing = None  # 首次就绪的耗时 {"wait", "start", "ready_at"}
+
+
+class Supervisor:
+    def __init__(self, specs):
+        self.services = [Service(spec) for spec in specs]
+        self.by_name = {service.name: service for service in self.services}
+        self.specs = specs
+        self.running = True
+        self.boot_at = None
+        self.reported = False
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        for fd in (self._wakeup_r, self._wakeup_w):
+            os.set_blocking(fd, False)
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.FD_CLOEXEC)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+    # ---------- 进程管理 ----------
+
+    def _watch(self, service, pid, proc=None):
+        service.pid = pid
+        service.proc = proc
+        service.exited = False
+        service.exit_code = None
+        service.started_at = time.monotonic()
+        service.ready_at = None
+        service.state = "starting"
+        if proc is None:
+            # 接管的进程不是子进程，收不到 SIGCHLD，用 pidfd 等它退出
+            service.pidfd = open_pidfd(pid)
+            if service.pidfd is not None:
+                self.selector.register(service.pidfd, selectors.EVENT_READ, service)
+
+    def _unwatch(self, service):
+        if service.pidfd is not None:
+            self.selector.unregister(service.pidfd)
+            os.close(service.pidfd)
+            service.pidfd = None
+        remove_pid(service.pidfile, service.pid)
+        service.pid = None
+        service.proc = None
+
+    def adopt_or_start(self, service):
+        """已有进程在跑就接管，端口被外部占用就观察，否则启动"""
+        pid = read_pid(service.pidfile)
+        if pid and pid_matches(pid, service.command):
+            log(f"🔗 {service.name} 已在运行 (PID: {pid})，接管")
+            self._watch(service, pid)
+            return
+        remove_pid(service.pidfile)
+        if service.ready and "tcp" in service.ready and probe_ready(service.ready):
+            log(f"ℹ️ {service.name} 端口 {service.ready['tcp']} 已被其他进程占用，不重复启动")
+            service.state = "external"
+            service.next_at = time.monotonic() + EXTERNAL_POLL
+            self._record_timing(service, time.monotonic(), time.monotonic())
+            return
+        self.start(service)
+
+    def start(self, service):
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(LOG_DIR / f"{service.name}.log", "ab") as out:
+                proc = subprocess.Popen(
+                    service.command,
+                    cwd=service.spec.get("cwd"),
+                    stdin=subprocess.DEVNULL,
+                    stdout=out,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
+        except OSError as e:
+            log(f"❌ {service.name} 启动失败: {e}")
+            service.started_at = None
+            self._fail(service)
+            return
+        write_pid(service.pidfile, proc.pid)
+        self._watch(service, proc.pid, proc)
+        log(f"🚀 {service.name} 已启动 (PID: {proc.pid})，等待就绪...")
+
+    def _fail(self, service):
+        """进程退出或启动失败：按指数退避安排重启"""
+        ran_stable = service.ready_at is not None and time.monotonic() - service.ready_at >= STABLE_AFTER
+        if ran_stable:
+            service.failures = 0
+        service.failures += 1
+        delay = min(BACKOFF_BASE * 2 ** (service.failures - 1), BACKOFF_MAX)
+        self._unwatch(service)
+        service.state = "backoff"
+        service.next_at = time.monotonic() + delay
+        log(f"⏳ {service.name} {delay:g} 秒后重启（第 {service.failures} 次）")
+
+    def reap(self):
+        """回收所有已退出的子进程"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            for service in self.services:
+                if service.proc is not None and service.pid == pid:
+                    service.proc.returncode = os.waitstatus_to_exitcode(status)
+                    service.exited = True
+                    service.exit_code = service.proc.returncode
+
+    def _check_exited(self, service):
+        if service.exited:
+            return True
+        if service.proc is None and service.pid:
+            if service.pidfd is not None:
+                # 进程退出后 pidfd 可读；shutdown 不经过 selector，这里直接非阻塞检查
+                service.exited = bool(select.select([service.pidfd], [], [], 0)[0])
+            else:
+                service.exited = not pid_alive(service.pid)
+        return service.exited
+
+    def tick(self, service, now):
+        """推进单个服务的状态，返回下次需要检查的时间"""
+        if service.state in ("starting", "ready") and self._check_exited(service):
+            code = f"退出码 {service.exit_code}" if service.exit_code is not None else "已退出"
+            log(f"💥 {service.name} (PID: {service.pid}) {code}")
+            self._fail(service)
+            return service.next_at
+
+        if service.state == "starting":
+            if probe_ready(service.ready):
+                service.state = "ready"
+                service.ready_at = now
+                log(f"✅ {service.name} 就绪，用时 {now - service.started_at:.1f} 秒")
+                self._record_timing(service, now, service.started_at)
+                return None
+            if now - service.started_at > service.ready_timeout:
+                log(f"❌ {service.name} {service.ready_timeout:g} 秒内未就绪，停止后重启")
+                # 确认旧进程退出并回收后才安排重启，避免同时跑两个实例
+                self.terminate(service)
+                service.state = "stopping"
+                service.stop_deadline = now + STOP_TIMEOUT
+                return now + READY_POLL
+            return now + READY_POLL
+
+        if service.state == "stopping":
+            if self._check_exited(service):
+                if service.proc is not None:
+                    service.proc.wait()
+                self._fail(service)
+                return service.next_at
+            if service.stop_deadline is not None and now >= service.stop_deadline:
+                log(f"⚠️ {service.name} 未在 {STOP_TIMEOUT} 秒内退出，强制结束")
+                self.terminate(service, signal.SIGKILL)
+                service.stop_deadline = None
+            return now + READY_POLL
+
+        if service.state == "waiting":
+            blocked = [d for d in service.depends_on if self.by_name[d].state not in ("ready", "external")]
+            if blocked:
+                return None
+            log(f"🔓 {service.name} 依赖已就绪: {', '.join(service.depends_on)}")
+            self.adopt_or_start(service)
+            return now
+
+        if service.state == "backoff" and now >= service.next_at:
+            self.adopt_or_start(service)
+            return now
+
+        if service.state == "external" and now >= service.next_at:
+            if probe_ready(service.ready):
+                service.next_at = now + EXTERNAL_POLL
+            else:
+                log(f"ℹ️ {service.name} 外部进程已退出，接管启动")
+                self.start(service)
+                return now
+
+        if service.state in ("backoff", "external"):
+            return service.next_at
+        return None
+
+    def terminate(self, service, sig=signal.SIGTERM):
+        """向服务发送信号；自己启动的服务发给整个进程组"""
+        if not service.pid:
+            return
+        try:
+            if service.proc is not None:
+                os.killpg(service.pid, sig)
+            else:
+                os.kill(service.pid, sig)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            log(f"⚠️ 无法停止 {service.name}: {e}")
+
+    # ---------- 启动耗时 ----------
+
+    def _record_timing(self, service, now, started_at):
+        """记录首次就绪耗时：等待依赖的时间 + 自身启动到就绪的时间"""
+        if service.timing is not None or self.boot_at is None:
+            return
+        started_at = started_at or now
+        service.timing = {
+            "wait": round(started_at - self.boot_at, 3),
+            "start": round(now - started_at, 3),
+            "ready_at": round(now - self.boot_at, 3),
+        }
+        if not self.reported and all(s.timing for s in self.services):
+            self.reported = True
+            self.report_startup()
+
+    def report_startup(self):
+        """全部服务就绪后输出耗时明细和关键路径，并保存到 run/startup.json"""
+        timings = {s.name: s.timing for s in self.services}
+        path = critical_path(self.specs, timings)
+        total = max(t["ready_at"] for t in timings.values())
+        log(f"🏁 所有服务就绪，总耗时 {total:.1f} 秒")
+        for line in format_timings(timings):
+            log(line)
+        log(f"🧭 关键路径: {' → '.join(path)}")
+        report = {"time": datetime.now().isoformat(timespec="seconds"), "total": total,
+                  "critical_path": path, "services": timings}
+        try:
+            RUN_DIR.mkdir(parents=True, exist_ok=True)
+            STARTUP_REPORT.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        except OSError:
+            pass
+
+    # ---------- 主循环 ----------
+
+    def _on_signal(self, signum, frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self.running = False
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_r, 512):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def run(self):
+        other = read_pid(SUPERVISOR_PID)
+        if other and other != os.getpid() and pid_matches(other, ["supervisor.py"]):
+            log(f"ℹ️ Supervisor 已在运行 (PID: {other})")
+            return 1
+        write_pid(SUPERVISOR_PID, os.getpid())
+
+        signal.set_wakeup_fd(self._wakeup_w)
+        for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+        log("🚀 Supervisor 启动")
+        self.boot_at = time.monotonic()
+        try:
+            # 没有依赖的服务立即并发启动，其余等依赖就绪
+            for service in self.services:
+                if service.depends_on:
+                    service.state = "waiting"
+                else:
+                    self.adopt_or_start(service)
+            while self.running:
+                self.reap()
+                now = time.monotonic()
+                deadlines = [self.tick(service, now) for service in self.services]
+                deadlines = [d for d in deadlines if d is not None]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else EXTERNAL_POLL
+                for key, _ in self.selector.select(min(timeout, EXTERNAL_POLL)):
+                    if key.data is None:
+                        self._drain_wakeup()
+                    else:
+                        key.data.exited = True
+        finally:
+            self.shutdown()
+            remove_pid(SUPERVISOR_PID, os.getpid())
+        return 0
+
+    def shutdown(self):
+        """停止所有服务：先 SIGTERM，超时后 SIGKILL"""
+        active = [s for s in self.services if s.pid]
+        if not active:
+            return
+        log("🛑 正在停止所有服务...")
+        for service in active:
+            self.terminate(service)
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while time.monotonic() < deadline:
+            self.reap()
+            if all(self._check_exited(s) for s in active):
+                break
+            time.sleep(0.2)
+        for service in active:
+            if not self._check_exited(service):
+                log(f"⚠️ {service.name} 未在 {STOP_TIMEOUT} 秒内退出，强制结束")
+                self.terminate(service, signal.SIGKILL)
+        self.reap()
+        for service in active:
+            log(f"✅ {service.name} 已停止")
+            self._unwatch(service)
+            service.state = "stopped"
+
+
+def format_timings(timings):
+    lines = [f"  {'服务':<20} {'等待依赖':>8} {'启动':>8} {'就绪时刻':>8}"]
+    for name, t in sorted(timings.items(), key=lambda item: item[1]["ready_at"]):
+        lines.append(f"  {name:<20} {t['wait']:>7.1f}s {t['start']:>7.1f}s {t['ready_at']:>7.1f}s")
+    return lines
+
+
+def show_plan(specs):
+    for i, wave in enumerate(start_waves(specs), 1):
+        print(f"第 {i} 批（并发）: {', '.join(wave)}")
+
+
+def show_report():
+    try:
+        report = json.loads(STARTUP_REPORT.read_text())
+    except (OSError, ValueError):
+        print("ℹ️ 还没有启动记录")
+        return
+    print(f"🏁 {report['time']} 启动，总耗时 {report['total']:.1f} 秒")
+    for line in format_timings(report["services"]):
+        print(line)
+    print(f"🧭 关键路径: {' → '.join(report['critical_path'])}")
+
+
+def show_status(specs):
+    pid = read_pid(SUPERVISOR_PID)
+    if pid and pid_matches(pid, ["supervisor.py"]):
+        print(f"🟢 Supervisor 运行中 (PID: {pid})")
+    else:
+        print("⚪ Supervisor 未运行")
+    for spec in specs:
+        pid = read_pid(pidfile(spec["name"]))
+        alive = pid and pid_matches(pid, spec["command"])
+        ready = probe_ready(spec.get("ready_check"))
+        if alive:
+            print(f"  {'✅' if ready else '⏳'} {spec['name']}: PID {pid}" + ("" if ready else "（未就绪）"))
+        elif ready:
+            print(f"  ℹ️ {spec['name']}: 由其他进程提供")
+        else:
+            print(f"  ❌ {spec['name']}: 未运行")
+
+
+def stop_supervisor():
+    pid = read_pid(SUPERVISOR_PID)
+    if not pid or not pid_matches(pid, ["supervisor.py"]):
+        print("ℹ️ Supervisor 未运行")
+        return 1
+    os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + STOP_TIMEOUT + 5
+    while time.monotonic() < deadline and pid_alive(pid):
+        time.sleep(0.2)
+    if pid_alive(pid):
+        print(f"⚠️ Supervisor (PID: {pid}) 未退出")
+        return 1
+    print("✅ Supervisor 已停止")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervisor - 常驻服务守护进程")
+    parser.add_argument("command", choices=["run", "status", "plan", "report", "stop"], nargs="?", default="status")
+    parser.add_argument("--config", default=str(SERVICES_FILE), help="服务依赖图（默认 services.json）")
+    args = parser.parse_args()
+
+    if args.command == "stop":
+        sys.exit(stop_supervisor())
+    if args.command == "report":
+        show_report()
+        return
+
+    try:
+        specs = load_services(args.config)
+    except (OSError, ValueError) as e:
+        print(f"❌ 服务配置错误: {e}")
+        sys.exit(1)
+
+    if args.command == "run":
+        sys.exit(Supervisor(specs).run())
+    elif args.command == "plan":
+        show_plan(specs)
+    else:
+        show_status(specs)
+
+
+if __name__ == "__main__":
+    main()
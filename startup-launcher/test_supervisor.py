@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""supervisor 测试：接管 pidfile 中的进程后停止、就绪超时后先停止再重启、pid 命令行匹配"""
+
+import os
+import time
+import tempfile
+import subprocess
+import unittest
+from pathlib import Path
+
+import supervisor
+
+
+class AdoptedShutdownTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_run_dir = supervisor.RUN_DIR
+        supervisor.RUN_DIR = Path(self.tmp.name)
+        # sh 后台启动 sleep 后立即退出，sleep 不是本进程的子进程，只能接管
+        out = subprocess.run(["sh", "-c", "sleep 30 >/dev/null 2>&1 & echo $!"],
+                             capture_output=True, text=True, check=True)
+        self.pid = int(out.stdout)
+
+    def tearDown(self):
+        try:
+            os.kill(self.pid, 9)
+        except ProcessLookupError:
+            pass
+        supervisor.RUN_DIR = self.old_run_dir
+        self.tmp.cleanup()
+
+    def _adopt(self):
+        sup = supervisor.Supervisor([{"name": "sleeper", "command": ["sleep", "30"]}])
+        service = sup.by_name["sleeper"]
+        supervisor.write_pid(service.pidfile, self.pid)
+        sup.adopt_or_start(service)
+        self.assertIsNone(service.proc)
+        self.assertEqual(service.pid, self.pid)
+        return sup, service
+
+    def test_shutdown_does_not_wait_for_timeout(self):
+        sup, service = self._adopt()
+        started = time.monotonic()
+        sup.shutdown()
+        self.assertLess(time.monotonic() - started, supervisor.STOP_TIMEOUT / 2)
+        self.assertEqual(service.state, "stopped")
+        self.assertFalse(supervisor.pid_alive(self.pid))
+
+    def test_exit_detected_without_selector(self):
+        sup, service = self._adopt()
+        self.assertFalse(sup._check_exited(service))
+        os.kill(self.pid, 15)
+        deadline = time.monotonic() + 5
+        while not sup._check_exited(service) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(service.exited)
+        sup.shutdown()
+
+
+class ReadyTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (supervisor.RUN_DIR, supervisor.LOG_DIR, supervisor.STOP_TIMEOUT)
+        supervisor.RUN_DIR = supervisor.LOG_DIR = Path(self.tmp.name)
+        supervisor.STOP_TIMEOUT = 0.5
+
+    def tearDown(self):
+        supervisor.RUN_DIR, supervisor.LOG_DIR, supervisor.STOP_TIMEOUT = self.saved
+        self.tmp.cleanup()
+
+    def test_restart_waits_for_old_process(self):
+        # 忽略 SIGTERM 的服务：必须升级为 SIGKILL 并回收后才进入退避
+        spec = {"name": "stubborn", "command": ["sh", "-c", "trap '' TERM; sleep 30"],
+                "ready_check": {"unix": str(Path(self.tmp.name) / "never.sock")}, "ready_timeout": 0.2}
+        sup = supervisor.Supervisor([spec])
+        service = sup.by_name["stubborn"]
+        sup.start(service)
+        proc = service.proc
+        states = []
+        deadline = time.monotonic() + 5
+        while service.state != "backoff" and time.monotonic() < deadline:
+            sup.reap()
+            sup.tick(service, time.monotonic())
+            states.append(service.state)
+            time.sleep(0.05)
+        self.assertEqual(service.state, "backoff")
+        self.assertIn("stopping", states)
+        self.assertEqual(proc.returncode, -9)
+        self.assertFalse(os.path.exists(f"/proc/{proc.pid}"))
+        self.assertIsNone(service.pid)
+
+
+class PidMatchesTest(unittest.TestCase):
+    def test_exact_arguments(self):
+        proc = subprocess.Popen(["sleep", "30"])
+        # 等子进程 exec 完成，否则 cmdline 还是父进程的
+        deadline = time.monotonic() + 2
+        while supervisor.pid_argv(proc.pid)[:1] != ["sleep"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            self.assertTrue(supervisor.pid_matches(proc.pid, ["sleep", "30"]))
+            self.assertTrue(supervisor.pid_matches(proc.pid, ["/bin/sleep", "30"]))
+            # 以前按子串匹配，"3" 会误配 "30"
+            self.assertFalse(supervisor.pid_matches(proc.pid, ["sleep", "3"]))
+            self.assertFalse(supervisor.pid_matches(proc.pid, ["sleep", "30", "x"]))
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()